@@ -1,7 +1,13 @@
+import json
+import os
+import sys
+
 import click
-from sqlalchemy import create_engine
 
-from allstars.core.project import Project
+from allstars.core.dependency_index import EXPRESSION_KINDS
+
+# commands import what they need themselves, so that starting the CLI stays
+# fast: sqlglot, SQLAlchemy, etc. are only loaded by commands using them
 
 
 @click.group()
@@ -12,45 +18,302 @@ def cli():
 @click.command()
 @click.argument("schema")
 @click.option("--overwrite", is_flag=True, help="Overwrite existing files.")
-def extract(schema, overwrite):
+@click.option("--statistics", is_flag=True, help="Collect relation statistics.")
+def extract(schema, overwrite, statistics):
+    from allstars.core.project import Project
+    from allstars.core.statistics import StatisticsCollector
+
     click.echo(f"Extracting metadata from schema: {schema}")
 
     extracted_project = Project()
-    extracted_project.load(schema)
+    extracted_project.load(schema, build_index=False)
 
     if not overwrite:
         current_project = Project()
-        current_project.load()
-        extracted_project.semantic_layer.upsert(current_project.semantic_layer)
+        current_project.load(build_index=False)
+        current = current_project.semantic_layer
+        extracted = extracted_project.semantic_layer
+
+        # report what depends on relations that changed in the database
+        changed = [
+            r.key
+            for r in current.relations
+            if r.key not in extracted.relations
+            or extracted.relations[r.key].to_dict() != r.to_dict()
+        ]
+        impacted = current.get_dependency_index().impact(
+            ("relation", key) for key in changed
+        )
+        for key in changed:
+            click.echo(f"Changed relation: {key}")
+        for kind, key in sorted(impacted):
+            if kind != "column":
+                click.echo(f"  impacts {kind} {key}")
+
+        extracted.upsert(current)
+        # kept as they were, refreshed below if asked
+        extracted.statistics = current.statistics
+
+    if statistics:
+        collector = StatisticsCollector(extracted_project.db)
+        for key in collector.refresh(extracted_project.semantic_layer):
+            click.echo(f"Collected statistics: {key}")
 
     extracted_project.flush()
 
 
+@click.command()
+@click.option("--relation", "relation_keys", multiple=True, help="Only these.")
+@click.option("--force", is_flag=True, help="Sample every relation again.")
+@click.option("--max-age", type=float, default=None, help="Resample after hours.")
+@click.option("--sample-size", type=int, default=None, help="Rows sampled.")
+def statistics(relation_keys, force, max_age, sample_size):
+    from allstars.core.project import Project
+    from allstars.core.statistics import DEFAULT_SAMPLE_SIZE, StatisticsCollector
+
+    project = Project()
+    project.load(build_index=False)
+    semantic_layer = project.semantic_layer
+
+    collector = StatisticsCollector(project.db, sample_size or DEFAULT_SAMPLE_SIZE)
+    changed = collector.refresh(
+        semantic_layer,
+        relation_keys or None,
+        max_age=max_age * 3600 if max_age is not None else None,
+        force=force,
+    )
+    for key in changed:
+        statistics_ = semantic_layer.statistics.get(key)
+        rows = statistics_.row_count if statistics_ else "removed"
+        click.echo(f"{key}: {rows} rows")
+    click.echo(f"Refreshed statistics of {len(changed)} relation(s)")
+
+    filename = os.path.join(project.folder, "statistics.yaml")
+    semantic_layer.statistics.to_yaml_file(filename, wrap_under="statistics")
+
+
 @click.command()
 @click.option("--key", default=None)
 def read(key):
+    from allstars.core.project import Project
+
     project = Project()
-    project.load()
+    project.load(build_index=False)
     sl = project.semantic_layer
 
     print(sl.to_yaml(key=key))
 
 
 @click.command()
-@click.argument("sql")
-def sql(sql):
+@click.argument("text")
+@click.option("--limit", type=int, default=20, help="Number of results.")
+@click.option("--folder", default=None, help="Only search in this folder.")
+@click.option(
+    "--kind",
+    "kinds",
+    type=click.Choice(sorted(EXPRESSION_KINDS)),
+    multiple=True,
+    help="Only search these kinds of objects.",
+)
+def search(text, limit, folder, kinds):
+    from allstars.core.project import Project
+
+    project = Project()
+    project.load(build_index=False)
+    index = project.semantic_layer.get_search_index()
+
+    for result in index.search(text, limit, folder, kinds):
+        label = f"  {result.label}" if result.label else ""
+        click.echo(f"{result.kind:<10} {result.key}{label}")
+
+
+@click.command()
+@click.option("--processes", type=int, default=None, help="Number of processes.")
+@click.option("--no-cache", is_flag=True, help="Re-parse every expression.")
+def validate(processes, no_cache):
+    from allstars.core import validation
+    from allstars.core.project import Project
+
+    project = Project()
+    project.load(build_index=False)
+
+    cache_file = None
+    if not no_cache:
+        cache_file = os.path.join(project.folder, ".parse_cache.json")
+    report = validation.validate(project.semantic_layer, cache_file, processes)
+
+    for error in report.errors:
+        click.echo(str(error))
+    click.echo(report.summary())
+    if not report.ok:
+        sys.exit(1)
+
+
+@click.command()
+@click.argument("log_file")
+@click.option("--url", default=None, help="Database to replay against.")
+@click.option("--concurrency", type=int, default=1, help="Queries run at a time.")
+@click.option("--repeat", type=int, default=1, help="Times to replay the log.")
+@click.option("--output", default=None, help="Write the report as JSON.")
+def replay(log_file, url, concurrency, repeat, output):
+    from allstars.core.project import Project
+    from allstars.sql import querylog
+    from allstars.sql import replay as replay_
+
+    project = Project()
+    project.load()
+    report = replay_.replay(
+        querylog.read_log(log_file),
+        url or project.sqla_conn,
+        semantic_layer=project.semantic_layer,
+        concurrency=concurrency,
+        repeat=repeat,
+    )
+
+    click.echo(report.summary())
+    if output:
+        with open(output, "w") as file:
+            json.dump(report.to_dict(), file, indent=2)
+
+
+@click.command()
+@click.argument("log_file")
+@click.option("--limit", type=int, default=10, help="Maximum number of rollups.")
+@click.option("--min-queries", type=int, default=2, help="Queries a rollup serves.")
+@click.option("--write", is_flag=True, help="Write rollups.yaml even if unchanged.")
+def recommend(log_file, limit, min_queries, write):
+    from allstars.core.project import Project
+    from allstars.core.recommender import RollupRecommender, new_rollups
+    from allstars.sql import querylog
+
+    project = Project()
+    project.load()
+    semantic_layer = project.semantic_layer
+    recommender = RollupRecommender(semantic_layer)
+    recommender.add_all(querylog.read_log(log_file))
+    rollups = recommender.recommend(limit, min_queries)
+    added = new_rollups(semantic_layer.rollups, rollups)
+
+    for rollup in rollups:
+        existing = "" if rollup in added else ", already defined"
+        click.echo(
+            f"{rollup.key}: {rollup.label} on {rollup.relation_key} "
+            f"({rollup.queries} queries, {rollup.estimated_savings:.3f}s{existing})"
+        )
+    click.echo(
+        f"Recommended {len(rollups)} rollup(s), {len(added)} new, "
+        f"skipped {recommender.skipped} queries"
+    )
+
+    # existing rollups are kept as they are, they may have been edited by hand
+    if added or write:
+        semantic_layer.update("rollups", added)
+        filename = os.path.join(project.folder, "rollups.yaml")
+        semantic_layer.rollups.to_yaml_file(filename, wrap_under="rollups")
+
+
+@click.command()
+@click.argument("query")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["csv", "jsonl", "arrow"]),
+    default="csv",
+    help="Output format.",
+)
+@click.option("--batch-size", type=int, default=1000, help="Rows fetched at a time.")
+@click.option("--explain", is_flag=True, help="Print the transpiled SQL only.")
+@click.option("--timing", is_flag=True, help="Print phase timings to stderr.")
+def sql(query, output_format, batch_size, explain, timing):
+    from allstars.core.project import Project
+    from allstars.sql import output
+    from allstars.sql.dbapi import connect
+    from allstars.sql.transpile import compile_query
+
+    project = Project()
+    project.load()
+    semantic_layer = project.semantic_layer
+    connection = connect(
+        project.sqla_conn,
+        semantic_layer=semantic_layer,
+        collect_stats=timing,
+    )
+    try:
+        if explain:
+            compiled = compile_query(
+                connection.engine, query, semantic_layer=semantic_layer
+            )
+            click.echo(compiled.sql)
+            return
+
+        cursor = connection.cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(query)
+        output.write_results(cursor, sys.stdout, output_format, batch_size)
+        sys.stdout.flush()
+
+        if timing:
+            for phase, duration in cursor.stats.phases.items():
+                click.echo(f"{phase}: {duration * 1000:.3f}ms", err=True)
+            click.echo(
+                f"total: {cursor.stats.total * 1000:.3f}ms, "
+                f"{cursor.stats.rows} rows, {cursor.stats.bytes} bytes",
+                err=True,
+            )
+    finally:
+        connection.close()
+
+
+@click.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on.")
+@click.option("--port", type=int, default=8000, help="Port to listen on.")
+@click.option(
+    "--result-ttl",
+    type=float,
+    default=None,
+    help="Cache query results for this many seconds.",
+)
+@click.option("--max-rows", type=int, default=10000, help="Rows per response.")
+@click.option("--reload", is_flag=True, help="Reload files when they change.")
+def serve(host, port, result_ttl, max_rows, reload):
+    from allstars.core.project import Project
+    from allstars.core.reload import FolderWatcher
+    from allstars.server import Server
+
     project = Project()
     project.load()
-    project.semantic_layer
+    server = Server(project, result_ttl=result_ttl, max_rows=max_rows)
+    server.warm()
 
-    transpiled_sql = Transpiler.transpile(sql)
+    watcher = None
+    if reload:
+        watcher = FolderWatcher(
+            project.semantic_layer, project.folder, on_change=server.invalidate
+        )
+        watcher.start()
 
-    results = DatabaseInterface.get_df(sql)
-    print(results)
+    http_server = server.make_http_server(host, port)
+    click.echo(f"Serving on http://{host}:{http_server.server_port}", err=True)
+    try:
+        http_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        http_server.server_close()
+        if watcher:
+            watcher.stop()
+        server.close()
 
 
 cli.add_command(extract)
+cli.add_command(statistics)
 cli.add_command(read)
+cli.add_command(search)
+cli.add_command(validate)
+cli.add_command(replay)
+cli.add_command(recommend)
+cli.add_command(sql)
+cli.add_command(serve)
 
 
 def run() -> None:
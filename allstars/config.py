@@ -4,6 +4,8 @@ config_defaults = {
     "ALLSTARS_FOLDER": "/tmp/allstars",
     "ALLSTARS_SQLA_CONN": "mysql://",
     "ALLSTARS_PROJECT": "jaffleshop",
+    # file capturing every semantic query, see ``allstars.sql.querylog``
+    "ALLSTARS_QUERY_LOG": "",
 }
 
 for k in config_defaults.keys():
@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import List, Optional
 import yaml
 
@@ -71,7 +72,8 @@ class Serializable:
     def from_yaml_file(cls, filename: str, verbose: bool = True):
         """Creates an instance of the class from a YAML file, excluding properties."""
         with open(filename, "r") as file:
-            print(f"Loading file {filename}")
+            if verbose:
+                print(f"Loading file {filename}", file=sys.stderr)
             data = yaml.load(file, Loader=yaml.FullLoader)
         return cls.from_dict(data)
 
@@ -102,6 +104,7 @@ class _SqlExpression(MenuItem):
         expression: str,
         relation_key: str = None,
         relation_keys: List[str] = None,
+        folder_key: Optional[str] = None,
         *args,
         **kwargs,
     ):
@@ -113,6 +116,8 @@ class _SqlExpression(MenuItem):
 
         self.expression = expression
         self.relation_keys = relation_keys if relation_keys is not None else []
+        # the folder it's listed under in the menu, if any
+        self.folder_key = folder_key
 
         super().__init__(*args, **kwargs)
 
@@ -122,6 +127,7 @@ class _SqlExpression(MenuItem):
             {
                 "expression": self.expression,
                 "relation_keys": self.relation_keys,
+                "folder_key": self.folder_key,
             }
         )
         return d
@@ -0,0 +1,256 @@
+"""
+Reverse dependency index across the semantic layer.
+
+Objects are nodes, identified by their kind and key, e.g. ``("metric",
+"revenue")`` or ``("column", "main.sales.price")``, with edges from each
+object to what it depends on:
+
+- columns on their relation;
+- metrics, dimensions and filters on their relations, the columns of those
+  relations they reference, the other metrics, dimensions and filters they
+  reference, and their folder;
+- joins on their two relations, and the columns in their criteria;
+- folders on their parent folder;
+- query contexts on their relations and joins;
+- rollups on their relation, dimensions, metrics and filters;
+- hierarchies on their dimensions;
+- statistics on their relation.
+
+Edges are kept in both directions, so that what an object depends on, and
+what depends on it, are both dictionary lookups.
+
+References in expressions are found by scanning for identifiers instead of
+parsing them, so that the index stays cheap to build. A SQL keyword spelled
+like a column of the relation can add a spurious edge, which only makes
+impact analysis err on the safe side.
+"""
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+Node = Tuple[str, str]
+
+# kind of the objects in each collection of the semantic layer
+KINDS = {
+    "relations": "relation",
+    "metrics": "metric",
+    "dimensions": "dimension",
+    "filters": "filter",
+    "joins": "join",
+    "folders": "folder",
+    "query_contexts": "query_context",
+    "rollups": "rollup",
+    "hierarchies": "hierarchy",
+    "statistics": "statistics",
+}
+
+# collections of objects defined by an expression, filed in folders, searched
+EXPRESSION_COLLECTIONS = {
+    "metrics": "metric",
+    "dimensions": "dimension",
+    "filters": "filter",
+}
+EXPRESSION_KINDS = set(EXPRESSION_COLLECTIONS.values())
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IDENTIFIER = re.compile(r'"([^"]+)"|([A-Za-z_][\w.]*)')
+
+
+def find_identifiers(expression: str) -> Set[str]:
+    """
+    The quoted and bare identifiers in an expression, outside of strings.
+    """
+    expression = _STRING.sub("", expression or "")
+    return {quoted or bare for quoted, bare in _IDENTIFIER.findall(expression)}
+
+
+class DependencyIndex:
+    """
+    What each object of a semantic layer depends on, and what depends on it.
+    """
+
+    def __init__(self, semantic_layer):
+        self.semantic_layer = semantic_layer
+        self._dependencies: Dict[Node, Set[Node]] = {}
+        self._dependents: Dict[Node, Set[Node]] = {}
+        # kinds of metrics, dimensions and filters, by key
+        self._expression_kinds: Dict[str, str] = {}
+
+    @classmethod
+    def from_semantic_layer(cls, semantic_layer) -> "DependencyIndex":
+        index = cls(semantic_layer)
+        for collection, kind in KINDS.items():
+            if kind in EXPRESSION_KINDS:
+                for key in getattr(semantic_layer, collection).keys():
+                    index._expression_kinds[key] = kind
+        for collection, kind in KINDS.items():
+            for o in getattr(semantic_layer, collection):
+                index.add(kind, o)
+        return index
+
+    def add(self, kind: str, obj: Any) -> None:
+        """
+        Add an object, or update the edges of one already in the index.
+        """
+        node = (kind, obj.key)
+        self._clear(node)
+        if kind in EXPRESSION_KINDS:
+            self._expression_kinds[obj.key] = kind
+
+        dependencies = self._find_dependencies(kind, obj)
+        self._dependencies[node] = dependencies
+        for dependency in dependencies:
+            self._dependents.setdefault(dependency, set()).add(node)
+
+        if kind == "relation":
+            for dependent in list(self._dependents.get(node, ())):
+                if dependent[0] == "column":
+                    self._clear(dependent)
+            for name in obj.get_column_names():
+                column = ("column", f"{obj.key}.{name}")
+                self._clear(column)
+                self._dependencies[column] = {node}
+                self._dependents.setdefault(node, set()).add(column)
+            # objects referencing its columns may reference different ones now
+            for dependent in list(self._dependents.get(node, ())):
+                if dependent[0] in EXPRESSION_KINDS or dependent[0] == "join":
+                    collection = _collection(dependent[0])
+                    o = getattr(self.semantic_layer, collection).get(dependent[1])
+                    if o is not None:
+                        self.add(dependent[0], o)
+
+    def remove(self, kind: str, key: str) -> None:
+        """
+        Remove an object's own edges; what depends on it still does, so that
+        the impact of removing it can be analysed.
+        """
+        node = (kind, key)
+        if kind == "relation":
+            for dependent in list(self._dependents.get(node, ())):
+                if dependent[0] == "column":
+                    self._clear(dependent)
+        self._clear(node)
+        if kind in EXPRESSION_KINDS:
+            self._expression_kinds.pop(key, None)
+
+    def dependencies(self, kind: str, key: str) -> Set[Node]:
+        """
+        What an object directly depends on.
+        """
+        return set(self._dependencies.get((kind, key), ()))
+
+    def dependents(self, kind: str, key: str) -> Set[Node]:
+        """
+        What directly depends on an object.
+        """
+        return set(self._dependents.get((kind, key), ()))
+
+    def impact(self, nodes: Iterable[Node]) -> Set[Node]:
+        """
+        Everything depending on some objects, directly or not.
+        """
+        impacted: Set[Node] = set()
+        queue = deque(nodes)
+        while queue:
+            for dependent in self._dependents.get(queue.popleft(), ()):
+                if dependent not in impacted:
+                    impacted.add(dependent)
+                    queue.append(dependent)
+        return impacted
+
+    def impact_keys(self, keys: Iterable[str]) -> Set[str]:
+        """
+        The keys of some objects, of any kind, and of everything depending on
+        them, e.g. to invalidate caches keyed by objects.
+        """
+        keys = set(keys)
+        kinds = set(KINDS.values()) | {"column"}
+        impacted = self.impact((kind, key) for key in keys for kind in kinds)
+        return keys | {key for _, key in impacted}
+
+    def get_relation_keys(self, nodes: Iterable[Node]) -> Set[str]:
+        """
+        The relations some objects directly depend on.
+        """
+        return {
+            key
+            for node in nodes
+            for kind, key in self._dependencies.get(node, ())
+            if kind == "relation"
+        }
+
+    def _clear(self, node: Node) -> None:
+        for dependency in self._dependencies.pop(node, ()):
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(node)
+                if not dependents:
+                    del self._dependents[dependency]
+
+    def _find_dependencies(self, kind: str, obj: Any) -> Set[Node]:
+        if kind in EXPRESSION_KINDS:
+            relation_keys = list(obj.relation_keys)
+            dependencies = {("relation", k) for k in relation_keys}
+            dependencies |= self._find_references(
+                obj.expression, relation_keys, obj.key
+            )
+            if obj.folder_key:
+                dependencies.add(("folder", obj.folder_key))
+            return dependencies
+        if kind == "join":
+            relation_keys = [obj.left_relation_key, obj.right_relation_key]
+            dependencies = {("relation", k) for k in relation_keys}
+            return dependencies | self._find_references(
+                obj.join_criteria, relation_keys
+            )
+        if kind == "folder":
+            if obj.parent_folder_key:
+                return {("folder", obj.parent_folder_key)}
+            return set()
+        if kind == "query_context":
+            return {("relation", k) for k in obj.relation_keys} | {
+                ("join", k) for k in obj.join_keys
+            }
+        if kind == "rollup":
+            return (
+                {("relation", obj.relation_key)}
+                | {("dimension", k) for k in obj.dimensions}
+                | {("metric", k) for k in obj.metrics}
+                | {("filter", k) for k in obj.filters}
+            )
+        if kind == "hierarchy":
+            return {("dimension", k) for k in obj.dimensions}
+        if kind == "statistics":
+            return {("relation", obj.relation_key)}
+        return set()
+
+    def _find_references(
+        self,
+        expression: str,
+        relation_keys: List[str],
+        key: str = None,
+    ) -> Set[Node]:
+        relations = [
+            r
+            for r in (self.semantic_layer.relations.get(k) for k in relation_keys)
+            if r is not None
+        ]
+        columns = {r.key: set(r.get_column_names()) for r in relations}
+
+        references: Set[Node] = set()
+        for identifier in find_identifiers(expression):
+            if identifier != key and identifier in self._expression_kinds:
+                references.add((self._expression_kinds[identifier], identifier))
+                continue
+            prefix, _, name = identifier.rpartition(".")
+            for relation in relations:
+                if prefix and prefix not in (relation.reference, relation.key):
+                    continue
+                if name in columns[relation.key]:
+                    references.add(("column", f"{relation.key}.{name}"))
+        return references
+
+
+def _collection(kind: str) -> str:
+    return next(c for c, k in KINDS.items() if k == kind)
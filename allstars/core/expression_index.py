@@ -0,0 +1,220 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlglot import exp, parse_one
+from sqlglot.errors import ParseError
+
+from allstars.core.base import _SqlExpression
+
+
+# binding strength of operators, other operators bind like comparisons
+_PRECEDENCE = {
+    exp.Or: 1,
+    exp.And: 2,
+    exp.Not: 3,
+    exp.Add: 5,
+    exp.Sub: 5,
+    exp.Mul: 6,
+    exp.Div: 6,
+    exp.Mod: 6,
+    exp.Neg: 7,
+}
+_COMPARISON = 4
+
+
+def _precedence(node: exp.Expression) -> Optional[int]:
+    if isinstance(node, exp.Paren) or not isinstance(node, (exp.Binary, exp.Unary)):
+        return None
+    return _PRECEDENCE.get(type(node), _COMPARISON)
+
+
+def inline(column: exp.Column, tree: exp.Expression) -> exp.Expression:
+    """
+    Replace a column by an expression, in parentheses if it binds less
+    tightly than the operation around it, e.g. ``(a - b) / c``.
+    """
+    inner, outer = _precedence(tree), _precedence(column.parent)
+    if inner is not None and outer is not None:
+        # right operands of the same precedence only group with themselves
+        right = column.arg_key == "expression"
+        associative = type(tree) is type(column.parent) and isinstance(
+            tree, (exp.And, exp.Or)
+        )
+        if inner < outer or (inner == outer and right and not associative):
+            tree = exp.Paren(this=tree)
+    return column.replace(tree)
+
+
+class ExpressionIndex:
+    """
+    In-memory index of the semantic layer's pre-parsed expressions
+
+    Metrics, dimensions and filters are parsed once into sqlglot ASTs, so that
+    resolving one of their keys in a query is a dictionary lookup plus a
+    copy of the AST, instead of parsing the expression string every time.
+    """
+
+    def __init__(self, relations=None):
+        self.relations = relations or {}
+        # relation keys by table name, to map physical columns to relations
+        self.references = {r.reference: r.key for r in self.relations.values()}
+        self.metric_keys: Set[str] = set()
+        self.filter_keys: Set[str] = set()
+        self.expressions: Dict[str, exp.Expression] = {}
+        self.relation_keys: Dict[str, List[str]] = {}
+        # keys of the metrics inlined in each expression, transitively
+        self.dependencies: Dict[str, Set[str]] = {}
+        # names of the columns each expression left as is, since no key had
+        # them yet; resolved again if a key with that name is added
+        self.unresolved: Dict[str, Set[str]] = {}
+        # keys whose expression failed to parse, see ``allstars validate``
+        self.errors: Dict[str, str] = {}
+        self._sources: Dict[str, _SqlExpression] = {}
+
+    @classmethod
+    def from_semantic_layer(cls, semantic_layer) -> "ExpressionIndex":
+        index = cls(semantic_layer.relations)
+        index.metric_keys = set(semantic_layer.metrics.keys())
+        index.filter_keys = set(semantic_layer.filters.keys())
+        index.add_all(semantic_layer.metrics)
+        index.add_all(semantic_layer.dimensions)
+        index.add_all(semantic_layer.filters)
+        return index
+
+    def refresh(self, semantic_layer, changed: Set[str]) -> "ExpressionIndex":
+        """
+        Returns a copy of the index where the changed keys, and everything
+        inlining, referencing or qualified by them, are parsed again from the
+        semantic layer. The other expressions are shared with this index.
+        """
+        index = ExpressionIndex(semantic_layer.relations)
+        index.metric_keys = set(semantic_layer.metrics.keys())
+        index.filter_keys = set(semantic_layer.filters.keys())
+        index.expressions = dict(self.expressions)
+        index.relation_keys = dict(self.relation_keys)
+        index.dependencies = dict(self.dependencies)
+        index.unresolved = dict(self.unresolved)
+        index.errors = dict(self.errors)
+        index._sources = dict(self._sources)
+
+        # expressions that failed before may work now, so retry them too
+        affected = set(changed) | set(self.errors)
+        for key, dependencies in self.dependencies.items():
+            relation_keys = self.relation_keys[key]
+            if (
+                dependencies & changed
+                or self.unresolved[key] & changed
+                or changed.intersection(relation_keys)
+            ):
+                affected.add(key)
+        for key in affected:
+            index.remove(key)
+
+        collections = [
+            semantic_layer.metrics,
+            semantic_layer.dimensions,
+            semantic_layer.filters,
+        ]
+        index.add_all(
+            collection[key]
+            for collection in collections
+            for key in affected
+            if key in collection
+        )
+        return index
+
+    def add_all(self, objects: Iterable[_SqlExpression]):
+        objects = list(objects)
+        for o in objects:
+            self._sources[o.key] = o
+        for o in objects:
+            if o.key not in self.expressions and o.key not in self.errors:
+                self.add(o)
+
+    def add(self, obj: _SqlExpression, resolving: Optional[Set[str]] = None):
+        """Parses an object's expression and stores it under its key"""
+        self._sources[obj.key] = obj
+        resolving = (resolving or set()) | {obj.key}
+
+        try:
+            tree = parse_one(obj.expression)
+        except ParseError as ex:
+            self.errors[obj.key] = str(ex).splitlines()[0]
+            return
+        relation_keys = list(obj.relation_keys)
+        dependencies: Set[str] = set()
+        unresolved: Set[str] = set()
+
+        # metrics can reference other metrics, inline them once here
+        for column in list(tree.find_all(exp.Column)):
+            key = column.name
+            if key in resolving:
+                continue
+            if key not in self._sources:
+                unresolved.add(key)
+                continue
+            if key not in self.expressions and key not in self.errors:
+                self.add(self._sources[key], resolving)
+            if key in self.errors:
+                self.errors[obj.key] = f"references invalid expression {key}"
+                return
+            replacement = self.expressions[key].copy()
+            dependencies.add(key)
+            dependencies |= self.dependencies[key]
+            if column is tree:
+                tree = replacement
+            else:
+                inline(column, replacement)
+            for relation_key in self.relation_keys[key]:
+                if relation_key not in relation_keys:
+                    relation_keys.append(relation_key)
+
+        qualifier = self.qualifier(obj.relation_keys)
+        if qualifier is not None:
+            self._qualify(tree, qualifier)
+
+        self.expressions[obj.key] = tree
+        self.relation_keys[obj.key] = relation_keys
+        self.dependencies[obj.key] = dependencies
+        self.unresolved[obj.key] = unresolved
+
+    def remove(self, key: str):
+        self._sources.pop(key, None)
+        self.errors.pop(key, None)
+        self.expressions.pop(key, None)
+        self.relation_keys.pop(key, None)
+        self.dependencies.pop(key, None)
+        self.unresolved.pop(key, None)
+
+    def resolve(self, key: str) -> Optional[Tuple[exp.Expression, List[str]]]:
+        """Returns a copy of the AST for a key, ready to be spliced in a query"""
+        tree = self.expressions.get(key)
+        if tree is None:
+            return None
+        return tree.copy(), self.relation_keys[key]
+
+    def qualifier(self, relation_keys: List[str]) -> Optional[Tuple[str, str]]:
+        """
+        The schema and table bare columns of an expression on some relations
+        are qualified with, if they can only come from one known relation
+        """
+        if len(relation_keys) != 1:
+            return None
+        relation = self.relations.get(relation_keys[0])
+        if relation is None:
+            return None
+        return relation.database_schema, relation.reference
+
+    @staticmethod
+    def _qualify(tree: exp.Expression, qualifier: Tuple[str, str]):
+        """Qualifies bare columns with the only relation they can come from"""
+        schema, reference = qualifier
+        for column in tree.find_all(exp.Column):
+            if not column.table:
+                column.set("table", exp.to_identifier(reference))
+                column.set("db", exp.to_identifier(schema))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.expressions
+
+    def __len__(self) -> int:
+        return len(self.expressions)
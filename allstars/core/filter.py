@@ -2,6 +2,6 @@ from allstars.core.base import _SqlExpression
 
 
 class Filter(_SqlExpression):
-    """Just a good old metric"""
+    """A reusable, named predicate"""
 
     pass
@@ -16,11 +16,16 @@ class Folder(MenuItem):
         self._folders = folders or []
 
     def flatten(self, l):
-        l.append(self)
-        for f in self._folders:
-            f["parent_folder_key"] = self.key
-            f = Folder.from_dict(f)
-            f.flatten(l)
+        # depth first, without recursing, for deeply nested folders
+        stack = [self]
+        while stack:
+            folder = stack.pop()
+            l.append(folder)
+            children = []
+            for f in folder._folders:
+                f["parent_folder_key"] = folder.key
+                children.append(Folder.from_dict(f))
+            stack.extend(reversed(children))
 
     def to_dict(self):
         return {
@@ -0,0 +1,266 @@
+"""
+The folders of a semantic layer as an indexed tree.
+
+Folders only know their parent, and metrics, dimensions and filters only
+know the folder they're filed in. The tree indexes the other direction: the
+children of each folder, the items filed in it, and each folder's path from
+the root, so that rendering a level of the tree or listing what's under a
+folder never scans the whole catalog:
+
+    tree = semantic_layer.get_folder_tree()
+    tree.children("finance")
+    tree.path("finance.revenue")            # ["finance", "finance.revenue"]
+    tree.items("finance", recursive=True)   # [("metric", "revenue"), ...]
+
+Folders whose parent isn't known (yet) are listed with the roots, and so are
+folders whose parent would make a cycle, until the cycle is broken; see
+``cycles()``, reported by ``allstars validate``. Edits are incremental, see
+``SemanticLayer.update``.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from allstars.core.dependency_index import EXPRESSION_COLLECTIONS
+from allstars.core.folder import Folder
+
+Item = Tuple[str, str]
+
+
+class FolderTree:
+    """
+    Children, ancestors and items of each folder, kept up to date.
+    """
+
+    def __init__(self, folders: Iterable[Folder] = ()):
+        self._parents: Dict[str, Optional[str]] = {}
+        # children by parent key, in order; dictionaries as ordered sets
+        self._children: Dict[Optional[str], Dict[str, None]] = {None: {}}
+        # folders whose parent isn't in the tree
+        self._orphans: Dict[str, None] = {}
+        # declared parents of the folders that would make a cycle
+        self._cyclic: Dict[str, Optional[str]] = {}
+        self._items: Dict[Optional[str], Dict[Item, None]] = {}
+        self._item_folders: Dict[Item, Optional[str]] = {}
+        # paths from the root, computed on first use
+        self._paths: Dict[str, Tuple[str, ...]] = {}
+
+        for folder in folders:
+            self.add(folder)
+
+    @classmethod
+    def from_semantic_layer(cls, semantic_layer) -> "FolderTree":
+        tree = cls(semantic_layer.folders)
+        for collection, kind in EXPRESSION_COLLECTIONS.items():
+            for o in getattr(semantic_layer, collection):
+                tree.add_item(kind, o)
+        return tree
+
+    def add(self, folder: Folder) -> None:
+        """
+        Add a folder, or move it if its parent changed.
+        """
+        key, parent = folder.key, folder.parent_folder_key
+        if key in self._parents:
+            self._relink(key, parent)
+            return
+
+        self._link(key, parent)
+        # folders added before their parent aren't orphans anymore
+        for child in self._children.get(key, {}):
+            self._orphans.pop(child, None)
+            self._forget_paths(child)
+        self._retry_cycles()
+
+    def remove(self, key: str) -> None:
+        """
+        Remove a folder; its subfolders are listed with the roots until it's
+        added back, and its items stay filed under its key.
+        """
+        if key not in self._parents:
+            return
+        self._forget_paths(key)
+        self._unlink(key)
+        for child in self._children.get(key, {}):
+            self._orphans[child] = None
+        self._retry_cycles()
+
+    def move(self, key: str, parent: Optional[str]) -> None:
+        """
+        Move a folder, with its subtree, under another parent.
+        """
+        if self._makes_cycle(key, parent):
+            raise ValueError(f"Folder {key} cannot be its own ancestor")
+        self._relink(key, parent)
+
+    def cycles(self) -> Dict[str, Optional[str]]:
+        """
+        The folders listed with the roots because their parent would make a
+        cycle, with that parent.
+        """
+        return dict(self._cyclic)
+
+    def _relink(self, key: str, parent: Optional[str]) -> None:
+        current = self._cyclic.get(key, self._parents[key])
+        if parent == current:
+            return
+        self._forget_paths(key)
+        self._unlink(key)
+        self._link(key, parent)
+        self._retry_cycles()
+
+    def _link(self, key: str, parent: Optional[str]) -> None:
+        if self._makes_cycle(key, parent):
+            self._cyclic[key] = parent
+            self._parents[key] = None
+            self._orphans[key] = None
+            return
+        self._parents[key] = parent
+        self._children.setdefault(parent, {})[key] = None
+        if parent is not None and parent not in self._parents:
+            self._orphans[key] = None
+
+    def _unlink(self, key: str) -> None:
+        parent = self._parents.pop(key)
+        self._orphans.pop(key, None)
+        if key in self._cyclic:
+            del self._cyclic[key]
+            return
+        children = self._children[parent]
+        del children[key]
+        if not children and parent is not None:
+            del self._children[parent]
+
+    def _makes_cycle(self, key: str, parent: Optional[str]) -> bool:
+        # parents in the tree never make cycles, so this always ends
+        while parent is not None:
+            if parent == key:
+                return True
+            parent = self._parents.get(parent)
+        return False
+
+    def _retry_cycles(self) -> None:
+        """
+        Move folders back under their parent once it doesn't make a cycle.
+        """
+        retry = bool(self._cyclic)
+        while retry:
+            retry = False
+            for key, parent in list(self._cyclic.items()):
+                if not self._makes_cycle(key, parent):
+                    self._forget_paths(key)
+                    self._unlink(key)
+                    self._link(key, parent)
+                    retry = True
+
+    def _forget_paths(self, key: str) -> None:
+        if not self._paths:
+            return
+        for folder in self.subtree(key):
+            self._paths.pop(folder, None)
+
+    def add_item(self, kind: str, obj) -> None:
+        """
+        File a metric, dimension or filter under its folder, if it has one.
+        """
+        self.remove_item(kind, obj.key)
+        if obj.folder_key is None:
+            return
+        item = (kind, obj.key)
+        self._item_folders[item] = obj.folder_key
+        self._items.setdefault(obj.folder_key, {})[item] = None
+
+    def remove_item(self, kind: str, key: str) -> None:
+        item = (kind, key)
+        if item not in self._item_folders:
+            return
+        folder_key = self._item_folders.pop(item)
+        items = self._items[folder_key]
+        del items[item]
+        if not items:
+            del self._items[folder_key]
+
+    def parent(self, key: str) -> Optional[str]:
+        return self._parents[key]
+
+    def roots(self) -> List[str]:
+        """
+        The top-level folders, followed by those whose parent is unknown.
+        """
+        return list(self._children[None]) + list(self._orphans)
+
+    def children(self, key: Optional[str]) -> List[str]:
+        return list(self._children.get(key, ()))
+
+    def path(self, key: str) -> List[str]:
+        """
+        The keys of the folders from the root down to a folder, included.
+        """
+        return list(self._path(key))
+
+    def _path(self, key: str) -> Tuple[str, ...]:
+        path = self._paths.get(key)
+        if path is not None:
+            return path
+        if key not in self._parents:
+            raise KeyError(key)
+
+        # walk up to the root, or to the closest folder with a known path
+        chain = []
+        folder: Optional[str] = key
+        while folder in self._parents and folder not in self._paths:
+            chain.append(folder)
+            folder = self._parents[folder]
+        path = self._paths.get(folder, ()) if folder is not None else ()
+        for folder in reversed(chain):
+            path += (folder,)
+            self._paths[folder] = path
+        return path
+
+    def ancestors(self, key: str) -> List[str]:
+        """
+        The keys of a folder's ancestors, from its parent up to the root.
+        """
+        return list(reversed(self._path(key)[:-1]))
+
+    def depth(self, key: str) -> int:
+        return len(self._path(key)) - 1
+
+    def is_ancestor(self, ancestor: str, key: str) -> bool:
+        return ancestor != key and ancestor in self._path(key)
+
+    def subtree(self, key: str) -> Iterator[str]:
+        """
+        A folder followed by all of its subfolders, depth first.
+        """
+        stack = [key]
+        while stack:
+            folder = stack.pop()
+            yield folder
+            stack.extend(reversed(self._children.get(folder, ())))
+
+    def items(
+        self,
+        key: str,
+        recursive: bool = False,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> List[Item]:
+        """
+        The ``(kind, key)`` of the items filed in a folder, or in its subtree.
+        """
+        kinds = set(kinds) if kinds else None
+        folders = self.subtree(key) if recursive else [key]
+        return [
+            item
+            for folder in folders
+            for item in self._items.get(folder, ())
+            if kinds is None or item[0] in kinds
+        ]
+
+    def folder_of(self, kind: str, key: str) -> Optional[str]:
+        return self._item_folders.get((kind, key))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._parents
+
+    def __len__(self) -> int:
+        return len(self._parents)
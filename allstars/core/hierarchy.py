@@ -1,9 +1,22 @@
 from dataclasses import dataclass, field
-from typing import List
-from allstars.core.dimension import Dimension
+from typing import List, Optional
+
+from allstars.core.base import Serializable
 
 
 @dataclass
-class Hierarchy:
+class Hierarchy(Serializable):
+    """
+    Dimensions ordered from the coarsest level to the finest, e.g. country,
+    region and city, to drill down and roll up along, see
+    ``allstars.sql.drilldown``.
+    """
+
     key: str
-    dimensions: List[Dimension] = field(default_factory=list)
+    # keys of the dimensions, one per level
+    dimensions: List[str] = field(default_factory=list)
+    label: Optional[str] = None
+    description: Optional[str] = None
+
+    def level(self, dimension_key: str) -> int:
+        return self.dimensions.index(dimension_key)
@@ -0,0 +1,97 @@
+import math
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlglot import exp, parse_one
+
+from allstars.core.join import Join
+
+# the join term to use when following a join from its right relation
+REVERSED_JOIN_TERMS = {
+    "LEFT JOIN": "RIGHT JOIN",
+    "RIGHT JOIN": "LEFT JOIN",
+}
+
+
+class JoinGraph:
+    """
+    Relations linked by joins, used to plan how to join a set of relations
+
+    Built once per query context, so planning a query only ever searches the
+    subgraph of its context.
+    """
+
+    def __init__(self, joins: Iterable[Join]):
+        self.adjacency: Dict[str, List[Tuple[str, Join]]] = defaultdict(list)
+        self._conditions: Dict[str, exp.Expression] = {}
+        for j in joins:
+            self.adjacency[j.left_relation_key].append((j.right_relation_key, j))
+            self.adjacency[j.right_relation_key].append((j.left_relation_key, j))
+
+    def condition(self, join: Join) -> exp.Expression:
+        """Returns a copy of the join criteria, parsed only once"""
+        if join.key not in self._conditions:
+            self._conditions[join.key] = parse_one(join.join_criteria)
+        return self._conditions[join.key].copy()
+
+    def plan(
+        self,
+        root: str,
+        relation_keys: Set[str],
+        row_counts: Optional[Dict[str, int]] = None,
+    ) -> List[Tuple[str, str, Join]]:
+        """
+        Finds the joins connecting the root to all the other relations
+
+        Returns (relation_key, join_term, join) tuples in the order they need
+        to be joined: closest to the root first, and among those the smallest
+        relations first when their row counts are known. Raises ValueError if
+        some relations can't be reached.
+        """
+        targets = set(relation_keys) - {root}
+        parents: Dict[str, Tuple[str, Join]] = {}
+        seen = {root}
+        queue = deque([root])
+        remaining = set(targets)
+        while queue and remaining:
+            current = queue.popleft()
+            for other, j in self.adjacency.get(current, []):
+                if other in seen:
+                    continue
+                seen.add(other)
+                parents[other] = (current, j)
+                remaining.discard(other)
+                queue.append(other)
+
+        if remaining:
+            raise ValueError(
+                f"{', '.join(sorted(remaining))} cannot be joined with {root}"
+            )
+
+        # walk back from each target to the root, keeping BFS order
+        needed = set()
+        for target in targets:
+            while target != root and target not in needed:
+                needed.add(target)
+                target = parents[target][0]
+
+        plan = []
+        order = self._depth(parents, root, row_counts or {})
+        for relation_key in sorted(needed, key=order):
+            parent, j = parents[relation_key]
+            join_term = j.join_term
+            if j.left_relation_key != parent:
+                join_term = REVERSED_JOIN_TERMS.get(join_term, join_term)
+            plan.append((relation_key, join_term, j))
+        return plan
+
+    @staticmethod
+    def _depth(parents, root, row_counts):
+        def depth(relation_key):
+            d, current = 0, relation_key
+            while current != root:
+                current = parents[current][0]
+                d += 1
+            return (d, row_counts.get(relation_key, math.inf), relation_key)
+
+        return depth
@@ -1,21 +1,34 @@
 from dataclasses import dataclass
 import os
+from typing import TYPE_CHECKING, Optional
 
 from allstars import config
 from allstars.core.semantic_layer import SemanticLayer
-from allstars.database_interface import DatabaseInterface
+
+if TYPE_CHECKING:
+    from allstars.database_interface import DatabaseInterface
 
 
 class Project:
     semantic_layer: SemanticLayer
 
-    def __init__(self, folder=None, sqla_conn=None, *args, **kwargs):
+    def __init__(self, folder=None, sqla_conn=None, *args, db=None, **kwargs):
         self.folder = folder or config.ALLSTARS_FOLDER
         self.sqla_conn = sqla_conn or config.ALLSTARS_SQLA_CONN
 
-        self.db = DatabaseInterface(self.sqla_conn)
+        # a database interface can be shared by projects, see ``registry``
+        self._db: Optional["DatabaseInterface"] = db
+
+    @property
+    def db(self) -> "DatabaseInterface":
+        """only create an engine for commands that use the database"""
+        if self._db is None:
+            from allstars.database_interface import DatabaseInterface
 
-    def load(self, database_schema=None):
+            self._db = DatabaseInterface(self.sqla_conn)
+        return self._db
+
+    def load(self, database_schema=None, build_index=True):
         if database_schema:
             self.semantic_layer = SemanticLayer()
             self.semantic_layer.load_relations_from_schema(database_schema, self.db)
@@ -23,5 +36,12 @@ class Project:
             relation_folder = self.folder
             self.semantic_layer = SemanticLayer.from_folder(relation_folder)
 
+        # parse all metrics and dimensions once, up front, when the project
+        # is going to be queried
+        if build_index:
+            self.semantic_layer.get_expression_index()
+            self.semantic_layer.get_dependency_index()
+            self.semantic_layer.get_search_index()
+
     def flush(self):
         self.semantic_layer.compile_to_files(self.folder)
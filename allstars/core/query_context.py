@@ -1,7 +1,19 @@
-from typing import List
-from allstars.core.join import Join
+from dataclasses import dataclass, field
+from typing import List, Optional
 
+from allstars.core.base import Serializable
+
+
+@dataclass
+class QueryContext(Serializable):
+    """
+    A named set of relations and joins that can safely be used together,
+    typically one star schema. Each one is exposed as its own virtual table.
+    """
 
-class QueryContext:
     key: str
-    joins: List[Join] = []
+    relation_keys: List[str] = field(default_factory=list)
+    # keys of the joins to follow; defaults to all joins between its relations
+    join_keys: List[str] = field(default_factory=list)
+    label: Optional[str] = None
+    description: Optional[str] = None
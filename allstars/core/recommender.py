@@ -0,0 +1,259 @@
+"""
+Rollup recommendations mined from captured queries.
+
+Every logged query using metrics is reduced to a pattern: the fact relation
+its metrics come from, along with the dimensions, metrics and named filters
+it references. Patterns are then picked greedily as rollups, each one
+covering the queries it can answer, ranked by the backend time those queries
+spent scanning the warehouse, an estimate of what the rollup would save.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional
+
+from sqlglot import exp, parse
+from sqlglot.errors import ParseError
+
+from allstars.core.base import SerializableCollection
+from allstars.core.rollup import Rollup
+from allstars.sql.dbapi.utils import escape_parameter
+
+# aggregates that can be computed from a finer grained pre-aggregation
+ADDITIVE_AGGREGATES = (exp.Sum, exp.Count, exp.Min, exp.Max)
+
+# phases a rollup would mostly save, by not scanning the fact relation
+BACKEND_PHASES = ("execute", "fetch")
+
+# rollups estimated to keep more than this fraction of the rows of their
+# relation aren't worth pre-aggregating, see ``allstars.core.statistics``
+MAX_ROLLUP_RATIO = 0.5
+
+
+@dataclass(frozen=True)
+class QueryPattern:
+    relation_key: str
+    dimensions: FrozenSet[str]
+    metrics: FrozenSet[str]
+    filters: FrozenSet[str]
+    # whether all metrics can be rolled up from a finer grain
+    additive: bool
+
+    def covered_by(self, other: "QueryPattern") -> bool:
+        """
+        Return if a rollup built from another pattern can answer this one.
+        """
+        if (self.relation_key, self.filters) != (other.relation_key, other.filters):
+            return False
+        if not self.metrics <= other.metrics:
+            return False
+        if self.additive:
+            return self.dimensions <= other.dimensions
+        return self.dimensions == other.dimensions
+
+
+class RollupRecommender:
+    """Accumulates query patterns from logs, then recommends rollups"""
+
+    def __init__(self, semantic_layer):
+        self.semantic_layer = semantic_layer
+        self.index = semantic_layer.get_expression_index()
+        # number of queries and backend seconds spent, per pattern
+        self.counts: Dict[QueryPattern, int] = {}
+        self.seconds: Dict[QueryPattern, float] = {}
+        # queries that aren't candidates for a rollup
+        self.skipped = 0
+
+    def add_all(self, entries: Iterable[Dict[str, Any]]):
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: Dict[str, Any]):
+        """Adds a query log entry, see ``allstars.sql.querylog``"""
+        query = entry["query"]
+        parameters = entry.get("parameters")
+        try:
+            if parameters:
+                query %= {k: escape_parameter(v) for k, v in parameters.items()}
+            pattern = self.pattern(query)
+        except (ParseError, KeyError, TypeError, ValueError):
+            pattern = None
+        if pattern is None:
+            self.skipped += 1
+            return
+
+        phases = entry.get("phases") or {}
+        seconds = sum(phases.get(p, 0.0) for p in BACKEND_PHASES)
+        self.counts[pattern] = self.counts.get(pattern, 0) + 1
+        self.seconds[pattern] = self.seconds.get(pattern, 0.0) + (
+            seconds or sum(phases.values())
+        )
+
+    def pattern(self, query: str) -> Optional[QueryPattern]:
+        """Reduces a semantic query to its pattern, if it can be rolled up"""
+        statements = [s for s in parse(query) if s is not None]
+        if len(statements) != 1:
+            return None
+        statement = statements[0]
+
+        aliases = {alias.alias for alias in statement.find_all(exp.Alias)}
+        dimensions, metrics, filters = set(), set(), set()
+        for column in statement.find_all(exp.Column):
+            key = column.name
+            if key in self.index.metric_keys:
+                metrics.add(key)
+            elif key in self.index.filter_keys:
+                filters.add(key)
+            elif key in self.semantic_layer.dimensions:
+                dimensions.add(key)
+            elif key not in aliases:
+                # ad-hoc columns can't be mapped to a rollup
+                return None
+
+        if not metrics or any(key not in self.index for key in metrics):
+            return None
+        relation_keys = set()
+        for key in metrics:
+            relation_keys.update(self.index.relation_keys[key])
+
+        return QueryPattern(
+            relation_key=min(relation_keys),
+            dimensions=frozenset(dimensions),
+            metrics=frozenset(metrics),
+            filters=frozenset(filters),
+            additive=all(self._is_additive(key) for key in metrics),
+        )
+
+    def _is_additive(self, metric_key: str) -> bool:
+        aggregates = list(self.index.expressions[metric_key].find_all(exp.AggFunc))
+        return bool(aggregates) and all(
+            isinstance(a, ADDITIVE_AGGREGATES) and not isinstance(a.this, exp.Distinct)
+            for a in aggregates
+        )
+
+    def recommend(
+        self, limit: int = 10, min_queries: int = 2
+    ) -> SerializableCollection[Rollup]:
+        """Picks the rollups saving the most, covering at least ``min_queries``"""
+        remaining = set(self.counts)
+        rollups = SerializableCollection()
+
+        while remaining and len(rollups) < limit:
+            best, best_covered, best_savings = None, [], 0.0
+            for candidate in sorted(remaining, key=self._sort_key):
+                if not self.worth_building(candidate):
+                    continue
+                covered = [p for p in remaining if p.covered_by(candidate)]
+                savings = sum(self.seconds[p] for p in covered)
+                if savings > best_savings:
+                    best, best_covered, best_savings = candidate, covered, savings
+            if best is None:
+                break
+            remaining -= set(best_covered)
+
+            queries = sum(self.counts[p] for p in best_covered)
+            if queries < min_queries:
+                continue
+            rollup = self._to_rollup(best, queries, best_savings)
+            rollup.estimated_rows = self.estimate_rows(best)
+            rollups.append(rollup)
+
+        return rollups
+
+    def estimate_rows(self, pattern: QueryPattern) -> Optional[int]:
+        """
+        The rows of a rollup, from the statistics of its dimensions' columns
+        """
+        row_count = self.semantic_layer.get_row_count(pattern.relation_key)
+        if row_count is None:
+            return None
+        rows = 1
+        for key in pattern.dimensions:
+            distinct_count = self._distinct_count(key)
+            if distinct_count is None:
+                return None
+            rows *= max(distinct_count, 1)
+        return min(rows, row_count)
+
+    def worth_building(self, pattern: QueryPattern) -> bool:
+        """Whether a rollup would be much smaller than its relation, if known"""
+        rows = self.estimate_rows(pattern)
+        if rows is None:
+            return True
+        row_count = self.semantic_layer.get_row_count(pattern.relation_key)
+        return rows <= MAX_ROLLUP_RATIO * row_count
+
+    def _distinct_count(self, dimension_key: str) -> Optional[int]:
+        # only dimensions that are a plain column can be estimated
+        tree = self.index.expressions.get(dimension_key)
+        relation_keys = self.index.relation_keys.get(dimension_key, [])
+        if not isinstance(tree, exp.Column) or len(relation_keys) != 1:
+            return None
+        statistics = self.semantic_layer.statistics.get(relation_keys[0])
+        return statistics.distinct_count(tree.name) if statistics else None
+
+    @staticmethod
+    def _sort_key(pattern: QueryPattern):
+        # fewer dimensions first, so that ties go to the smaller rollup
+        return (
+            len(pattern.dimensions),
+            pattern.relation_key,
+            sorted(pattern.dimensions),
+            sorted(pattern.metrics),
+            sorted(pattern.filters),
+        )
+
+    @staticmethod
+    def _to_rollup(pattern: QueryPattern, queries: int, savings: float) -> Rollup:
+        dimensions = sorted(pattern.dimensions)
+        metrics = sorted(pattern.metrics)
+        filters = sorted(pattern.filters)
+        definition = "|".join(
+            [
+                pattern.relation_key,
+                ",".join(dimensions),
+                ",".join(metrics),
+                ",".join(filters),
+            ]
+        )
+        digest = hashlib.sha1(definition.encode("utf-8")).hexdigest()[:8]
+        return Rollup(
+            key=f"rollup_{digest}",
+            relation_key=pattern.relation_key,
+            dimensions=dimensions,
+            metrics=metrics,
+            filters=filters,
+            queries=queries,
+            estimated_savings=round(savings, 6),
+            label=f"{', '.join(metrics)} by {', '.join(dimensions) or 'nothing'}",
+        )
+
+
+def recommend(semantic_layer, entries, limit=10, min_queries=2):
+    recommender = RollupRecommender(semantic_layer)
+    recommender.add_all(entries)
+    return recommender.recommend(limit, min_queries)
+
+
+def new_rollups(
+    rollups: SerializableCollection[Rollup], recommended: Iterable[Rollup]
+) -> List[Rollup]:
+    """
+    Recommended rollups that aren't defined yet, by key or by definition.
+    Existing rollups may have been edited by hand and are left as they are.
+    """
+    defined = {_definition(rollup) for rollup in rollups}
+    return [
+        rollup
+        for rollup in recommended
+        if rollup.key not in rollups and _definition(rollup) not in defined
+    ]
+
+
+def _definition(rollup: Rollup):
+    return (
+        rollup.relation_key,
+        frozenset(rollup.dimensions),
+        frozenset(rollup.metrics),
+        frozenset(rollup.filters),
+    )
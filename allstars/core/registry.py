@@ -0,0 +1,232 @@
+"""
+A process-level registry of projects.
+
+Serving many projects from one process, e.g. one per business unit on top of
+the same warehouse, mostly duplicates what they have in common. Projects in
+a registry share:
+
+- a ``DatabaseInterface`` per URL, so its engine, pool and inspector (the
+  schema catalog) are created once;
+- identical ``Relation`` and ``Column`` objects, so that a relation described
+  the same way in 50 projects is only held in memory once;
+- the parsed trees of identical expressions, e.g. of inferred dimensions,
+  since the expression index only ever hands out copies of them.
+
+Shared objects must not be mutated in place: semantic layers swap objects
+instead, see ``SemanticLayer.update``.
+
+    registry = ProjectRegistry()
+    registry.register("finance", "projects/finance", "postgresql://...")
+    connection = registry.connect("finance")
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterator, Optional
+
+from allstars import config
+from allstars.core.base import SerializableCollection
+from allstars.core.project import Project
+from allstars.core.relation import Column, Relation
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.database_interface import DatabaseInterface
+
+if TYPE_CHECKING:
+    from allstars.core.expression_index import ExpressionIndex
+
+
+class ProjectRegistry:
+    """
+    Projects by name, sharing databases and relation metadata.
+    """
+
+    def __init__(self, **engine_kwargs: Any):
+        self.engine_kwargs = engine_kwargs
+
+        self._projects: Dict[str, Project] = {}
+        self._databases: Dict[str, DatabaseInterface] = {}
+        self._relations: Dict[Hashable, Relation] = {}
+        self._columns: Dict[Hashable, Column] = {}
+        self._expressions: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def database(self, sqla_conn: str) -> DatabaseInterface:
+        """
+        Return the database interface shared by projects using a URL.
+        """
+        with self._lock:
+            if sqla_conn not in self._databases:
+                self._databases[sqla_conn] = DatabaseInterface(
+                    sqla_conn, **self.engine_kwargs
+                )
+            return self._databases[sqla_conn]
+
+    def register(
+        self,
+        name: str,
+        folder: str,
+        sqla_conn: Optional[str] = None,
+        build_index: bool = True,
+    ) -> Project:
+        """
+        Load a project from its folder, replacing any project of that name.
+        """
+        sqla_conn = sqla_conn or config.ALLSTARS_SQLA_CONN
+        project = Project(folder, sqla_conn, db=self.database(sqla_conn))
+        project.load(build_index=False)
+        self.intern(project.semantic_layer)
+        if build_index:
+            self.intern_index(project.semantic_layer.get_expression_index())
+
+        with self._lock:
+            self._projects[name] = project
+        return project
+
+    def intern(self, semantic_layer: SemanticLayer) -> None:
+        """
+        Replace the relations of a semantic layer by shared, identical ones.
+        """
+        relations = SerializableCollection(
+            [self.intern_relation(relation) for relation in semantic_layer.relations]
+        )
+        semantic_layer.relations = relations
+        semantic_layer._expression_index = None
+
+    def intern_relation(self, relation: Relation) -> Relation:
+        key = (
+            relation.database_schema,
+            relation.reference,
+            relation.relation_type,
+            relation.include_count_metric,
+            relation.include_columns_as_dimensions,
+            tuple(
+                (column.key, column.name, column.data_type)
+                for column in relation.columns
+            ),
+        )
+        with self._lock:
+            if key not in self._relations:
+                self._relations[key] = Relation(
+                    database_schema=relation.database_schema,
+                    reference=relation.reference,
+                    relation_type=relation.relation_type,
+                    columns=SerializableCollection(
+                        [self._intern_column(column) for column in key[-1]]
+                    ),
+                    include_count_metric=relation.include_count_metric,
+                    include_columns_as_dimensions=(
+                        relation.include_columns_as_dimensions
+                    ),
+                )
+            return self._relations[key]
+
+    def intern_index(self, index: "ExpressionIndex") -> None:
+        """
+        Replace the parsed expressions of an index by shared, identical ones.
+        """
+        with self._lock:
+            for key, tree in index.expressions.items():
+                # the same expression, on the same relations qualified the
+                # same way, inlining the same metrics parses into the same tree
+                signature = (
+                    self._signature(index, key),
+                    tuple(
+                        sorted(
+                            (dependency, self._signature(index, dependency))
+                            for dependency in index.dependencies[key]
+                        )
+                    ),
+                )
+                index.expressions[key] = self._expressions.setdefault(signature, tree)
+
+    @staticmethod
+    def _signature(index: "ExpressionIndex", key: str) -> Hashable:
+        source = index._sources[key]
+        # bare columns are only qualified when the project has the relation
+        return (
+            source.expression,
+            tuple(source.relation_keys),
+            index.qualifier(source.relation_keys),
+        )
+
+    def _intern_column(self, key: Hashable) -> Column:
+        if key not in self._columns:
+            self._columns[key] = Column(*key)
+        return self._columns[key]
+
+    def get(self, name: str) -> Project:
+        with self._lock:
+            return self._projects[name]
+
+    def remove(self, name: str) -> None:
+        """
+        Forget a project; its relations stay shared until ``compact``.
+        """
+        with self._lock:
+            del self._projects[name]
+
+    def compact(self) -> None:
+        """
+        Drop the shared objects no registered project uses anymore.
+        """
+        with self._lock:
+            used = {
+                id(relation)
+                for project in self._projects.values()
+                for relation in project.semantic_layer.relations
+            }
+            self._relations = {
+                key: relation
+                for key, relation in self._relations.items()
+                if id(relation) in used
+            }
+            columns = {
+                id(column)
+                for relation in self._relations.values()
+                for column in relation.columns
+            }
+            self._columns = {
+                key: column
+                for key, column in self._columns.items()
+                if id(column) in columns
+            }
+            trees = {
+                id(tree)
+                for project in self._projects.values()
+                if project.semantic_layer._expression_index is not None
+                for tree in project.semantic_layer._expression_index.expressions.values()
+            }
+            self._expressions = {
+                key: tree
+                for key, tree in self._expressions.items()
+                if id(tree) in trees
+            }
+
+    def connect(self, name: str, **kwargs: Any):
+        """
+        A DB API connection to a project, using the shared engine.
+        """
+        from allstars.sql.dbapi import connect
+
+        project = self.get(name)
+        return connect(
+            project.sqla_conn,
+            semantic_layer=project.semantic_layer,
+            engine=project.db.engine,
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            for db in self._databases.values():
+                db.engine.dispose()
+            self._databases.clear()
+            self._projects.clear()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._projects
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._projects))
+
+    def __len__(self) -> int:
+        return len(self._projects)
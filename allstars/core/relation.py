@@ -24,10 +24,23 @@ class Relation(Serializable):
     include_count_metric: bool = True
     include_columns_as_dimensions: bool = True
 
+    def __post_init__(self):
+        # columns read from files are dictionaries
+        if not isinstance(self.columns, SerializableCollection):
+            self.columns = SerializableCollection(
+                [
+                    c if isinstance(c, Column) else Column.from_dict(c)
+                    for c in self.columns or []
+                ]
+            )
+
     @property
     def key(self):
         return f"{self.database_schema}.{self.reference}"
 
+    def get_column_names(self) -> List[str]:
+        return [c.name for c in self.columns]
+
     def find_common_columns(self, relation):
         matches = []
         col_name_set = {c.name for c in relation.columns}
@@ -0,0 +1,170 @@
+"""
+Hot reload of a project folder.
+
+A ``FolderWatcher`` polls the YAML files of a project, and when some change
+re-parses only those into the live semantic layer (see
+``SemanticLayer.update``). The keys of the changed objects are passed to a
+callback, e.g. to invalidate the cached queries depending on them:
+
+    watcher = FolderWatcher(semantic_layer, folder, on_change=server.invalidate)
+    watcher.start()
+"""
+
+import glob
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import yaml
+
+from allstars.core.dimension import Dimension
+from allstars.core.filter import Filter
+from allstars.core.folder import Folder
+from allstars.core.hierarchy import Hierarchy
+from allstars.core.join import Join
+from allstars.core.metric import Metric
+from allstars.core.query_context import QueryContext
+from allstars.core.relation import Relation
+from allstars.core.rollup import Rollup
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.core.statistics import RelationStatistics
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 1.0
+
+# files holding a whole collection, see ``SemanticLayer.compile_to_files``
+COLLECTION_FILES = {
+    "joins.yaml": ("joins", Join),
+    "metrics.yaml": ("metrics", Metric),
+    "dimensions.yaml": ("dimensions", Dimension),
+    "filters.yaml": ("filters", Filter),
+    "folders.yaml": ("folders", Folder),
+    "query_contexts.yaml": ("query_contexts", QueryContext),
+    "rollups.yaml": ("rollups", Rollup),
+    "hierarchies.yaml": ("hierarchies", Hierarchy),
+    "statistics.yaml": ("statistics", RelationStatistics),
+}
+
+
+def load_file(filename: str, key: str) -> List[dict]:
+    """
+    Read the objects of a collection file, raising on invalid YAML instead
+    of returning nothing, so that a half-written file doesn't wipe out the
+    collection. A missing file is an empty collection.
+    """
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "r") as file:
+        data = yaml.load(file, Loader=yaml.FullLoader)
+    return (data or {}).get(key) or []
+
+
+class FolderWatcher:
+    """
+    Keeps a semantic layer in sync with its project folder.
+    """
+
+    def __init__(
+        self,
+        semantic_layer: SemanticLayer,
+        folder: str,
+        on_change: Optional[Callable[[Set[str]], None]] = None,
+        interval: float = DEFAULT_INTERVAL,
+    ):
+        self.semantic_layer = semantic_layer
+        self.folder = os.path.normpath(folder)
+        self.on_change = on_change
+        self.interval = interval
+
+        self._stats = self._scan()
+        # relation files are named after their relation, until they're edited
+        self._relation_keys: Dict[str, str] = {
+            filename: os.path.splitext(os.path.basename(filename))[0]
+            for filename in self._stats
+            if os.path.dirname(filename) != self.folder
+        }
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        filenames = glob.glob(os.path.join(self.folder, "relations", "*.yaml"))
+        filenames += [os.path.join(self.folder, name) for name in COLLECTION_FILES]
+        stats = {}
+        for filename in filenames:
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            stats[filename] = (stat.st_mtime, stat.st_size)
+        return stats
+
+    def poll(self) -> Set[str]:
+        """
+        Reload the files changed since the last poll, returning the keys of
+        the objects that changed.
+        """
+        stats = self._scan()
+        filenames = {
+            filename
+            for filename in set(stats) | set(self._stats)
+            if stats.get(filename) != self._stats.get(filename)
+        }
+        self._stats = stats
+
+        changed: Set[str] = set()
+        for filename in sorted(filenames):
+            try:
+                changed |= self.reload_file(filename)
+            except Exception:  # pylint: disable=broad-except
+                _logger.exception("Could not reload %s", filename)
+
+        if changed and self.on_change:
+            self.on_change(changed)
+        return changed
+
+    def reload_file(self, filename: str) -> Set[str]:
+        name = os.path.basename(filename)
+        if os.path.dirname(filename) == self.folder:
+            collection, object_class = COLLECTION_FILES[name]
+            data = load_file(filename, collection)
+            objects = [object_class.from_dict(o) for o in data]
+            if collection == "folders":
+                flattened: List[Folder] = []
+                for folder in objects:
+                    folder.flatten(flattened)
+                objects = flattened
+            keys = {o.key for o in objects}
+            current = getattr(self.semantic_layer, collection)
+            removed = [key for key in current.keys() if key not in keys]
+            return self.semantic_layer.update(collection, objects, removed)
+
+        # relations, one per file
+        previous = self._relation_keys.pop(filename, None)
+        relations = []
+        if os.path.exists(filename):
+            relations = [Relation.from_yaml_file(filename, verbose=False)]
+            self._relation_keys[filename] = relations[0].key
+        removed = []
+        if previous and previous not in self._relation_keys.values():
+            removed.append(previous)
+        return self.semantic_layer.update("relations", relations, removed)
+
+    def start(self) -> None:
+        """
+        Poll in a background thread, until ``stop`` is called.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,26 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from allstars.core.base import Serializable
+
+
+@dataclass
+class Rollup(Serializable):
+    """
+    A pre-aggregation of metrics on a fact relation, grouped by dimensions
+    and restricted by filters. It can answer queries using a subset of its
+    dimensions and metrics, with the same filters.
+    """
+
+    key: str
+    relation_key: str
+    dimensions: List[str] = field(default_factory=list)
+    metrics: List[str] = field(default_factory=list)
+    filters: List[str] = field(default_factory=list)
+    # usage it was recommended from, see ``allstars recommend``
+    queries: int = 0
+    estimated_savings: float = 0.0
+    # from the relation's statistics, if any
+    estimated_rows: Optional[int] = None
+    label: Optional[str] = None
+    description: Optional[str] = None
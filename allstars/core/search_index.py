@@ -0,0 +1,276 @@
+"""
+Search over the semantic layer's menu.
+
+Metrics, dimensions and filters are indexed by the tokens of their key, label
+and description, e.g. ``main.sales.unit_price`` has the tokens ``main``,
+``sales``, ``unit`` and ``price``. Every word of a search is a prefix of some
+token, so that partial input autocompletes:
+
+    >>> index.search("sal pri", limit=5)
+
+Matches on keys rank above matches on labels, which rank above matches on
+descriptions, and whole tokens above prefixes. Searches can be restricted to
+a folder, including its subfolders.
+"""
+
+import bisect
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from allstars.core.dependency_index import EXPRESSION_COLLECTIONS
+from allstars.core.folder_tree import FolderTree
+
+# weight of a token, by the field it was found in
+FIELD_WEIGHTS = {"key": 3, "label": 2, "description": 1}
+
+DEFAULT_LIMIT = 20
+
+# candidates looked at before searching words rarely found together by
+# intersecting all of their matches instead
+MAX_SCANNED = 500
+
+# letters and digits in any script; underscores separate words
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN.findall(text.casefold()) if text else []
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    key: str
+    label: Optional[str]
+    folder_key: Optional[str]
+    score: float
+
+
+class SearchIndex:
+    """
+    An inverted index from tokens to objects, with a sorted vocabulary for
+    prefix lookups.
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Tuple[str, str, Optional[str], Optional[str]]] = {}
+        self._ids: Dict[Tuple[str, str], int] = {}
+        # weight of each object a token is found in, by token
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._ranked_postings: Dict[str, List[int]] = {}
+        self._tokens: Dict[int, Set[str]] = {}
+        self._next_id = 0
+
+        # tokens in order, for binary search, re-sorted after changes
+        self._vocabulary: List[str] = []
+        self._dirty = False
+
+        # to search the subfolders of a folder, shared with the semantic layer
+        self.folder_tree = FolderTree()
+
+    @classmethod
+    def from_semantic_layer(cls, semantic_layer) -> "SearchIndex":
+        index = cls()
+        for collection, kind in EXPRESSION_COLLECTIONS.items():
+            for o in getattr(semantic_layer, collection):
+                index.add(kind, o)
+        index.folder_tree = semantic_layer.get_folder_tree()
+        return index
+
+    def add(self, kind: str, obj) -> None:
+        """
+        Index an object, or re-index it if it was already.
+        """
+        self.remove(kind, obj.key)
+        id_ = self._next_id
+        self._next_id += 1
+        self._ids[(kind, obj.key)] = id_
+        self._entries[id_] = (kind, obj.key, obj.label, obj.folder_key)
+
+        weights: Dict[str, int] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(getattr(obj, field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            postings = self._postings.setdefault(token, {})
+            if not postings:
+                self._dirty = True
+            postings[id_] = weight
+            self._ranked_postings.pop(token, None)
+        self._tokens[id_] = set(weights)
+
+    def remove(self, kind: str, key: str) -> None:
+        id_ = self._ids.pop((kind, key), None)
+        if id_ is None:
+            return
+        del self._entries[id_]
+        for token in self._tokens.pop(id_):
+            postings = self._postings[token]
+            del postings[id_]
+            self._ranked_postings.pop(token, None)
+            if not postings:
+                del self._postings[token]
+                self._dirty = True
+
+    def _expand(self, prefix: str) -> List[str]:
+        """
+        The tokens starting with a prefix.
+        """
+        if self._dirty:
+            self._vocabulary = sorted(self._postings)
+            self._dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff", start)
+        return self._vocabulary[start:end]
+
+    def _folders(self, folder_key: str) -> Set[str]:
+        """
+        A folder and all of its subfolders.
+        """
+        return set(self.folder_tree.subtree(folder_key))
+
+    def _rank(self, id_: int) -> Tuple[int, str]:
+        """
+        How objects with the same score are ordered: shorter keys first.
+        """
+        key = self._entries[id_][1]
+        return len(key), key
+
+    def _ranked(self, token: str) -> List[int]:
+        """
+        The objects a token is found in, best first, sorted on first use.
+        """
+        ranked = self._ranked_postings.get(token)
+        if ranked is None:
+            postings = self._postings[token]
+            ranked = sorted(postings, key=lambda i: (-postings[i], self._rank(i)))
+            self._ranked_postings[token] = ranked
+        return ranked
+
+    def _stream(self, word: str) -> Iterator[Tuple[int, int]]:
+        """
+        The objects matching a word, as ``(score, id)``, best first.
+        """
+
+        def scored(token: str) -> Iterator[Tuple[int, Tuple[int, str], int]]:
+            bonus = 2 if token == word else 1
+            postings = self._postings[token]
+            for id_ in self._ranked(token):
+                yield -postings[id_] * bonus, self._rank(id_), id_
+
+        seen = set()
+        streams = [scored(token) for token in self._expand(word)]
+        for score, _, id_ in heapq.merge(*streams):
+            if id_ not in seen:
+                seen.add(id_)
+                yield -score, id_
+
+    def _score(self, id_: int, word: str) -> int:
+        """
+        The score of an object for a word, 0 if it doesn't match.
+        """
+        best = 0
+        for token in self._tokens[id_]:
+            if token.startswith(word):
+                score = self._postings[token][id_] * (2 if token == word else 1)
+                best = max(best, score)
+        return best
+
+    def _intersect(self, words: List[str]) -> Dict[int, int]:
+        """
+        The objects matching all words, with their scores.
+        """
+        ids: Optional[Set[int]] = None
+        for word in words:
+            tokens = self._expand(word)
+            matches = set().union(*(self._postings[t].keys() for t in tokens))
+            ids = matches if ids is None else ids & matches
+
+        totals = dict.fromkeys(ids or (), 0)
+        for word in words:
+            word_scores: Dict[int, int] = {}
+            for token in self._expand(word):
+                bonus = 2 if token == word else 1
+                postings = self._postings[token]
+                for id_ in totals.keys() & postings.keys():
+                    score = postings[id_] * bonus
+                    if score > word_scores.get(id_, 0):
+                        word_scores[id_] = score
+            for id_, score in word_scores.items():
+                totals[id_] += score
+        return totals
+
+    def _matches(
+        self,
+        id_: int,
+        folders: Optional[Set[str]],
+        kinds: Optional[Set[str]],
+    ) -> bool:
+        kind, _, _, folder = self._entries[id_]
+        return (folders is None or folder in folders) and (
+            kinds is None or kind in kinds
+        )
+
+    def search(
+        self,
+        text: str,
+        limit: int = DEFAULT_LIMIT,
+        folder_key: Optional[str] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> List[SearchResult]:
+        words = list(dict.fromkeys(tokenize(text)))
+        if not words or limit <= 0:
+            return []
+        folders = self._folders(folder_key) if folder_key else None
+        kinds = set(kinds) if kinds else None
+
+        # candidates come from the rarest word, best first; the others can
+        # only add so much to their score, so once the results can't be
+        # beaten anymore there's no need to look further (candidates that
+        # could at best tie are ranked after those already found)
+        def frequency(word: str) -> int:
+            return sum(len(self._postings[t]) for t in self._expand(word))
+
+        rarest = min(words, key=frequency)
+        others = [word for word in words if word != rarest]
+        bound = sum(
+            max(FIELD_WEIGHTS.values()) * (2 if word in self._postings else 1)
+            for word in others
+        )
+
+        best: List[Tuple[int, Tuple[int, str], int]] = []
+        for scanned, (score, id_) in enumerate(self._stream(rarest)):
+            if len(best) == limit and -best[-1][0] >= score + bound:
+                break
+            if others and scanned == MAX_SCANNED:
+                # words rarely found together, narrow down with sets instead
+                totals = self._intersect(words)
+                best = heapq.nsmallest(
+                    limit,
+                    (
+                        (-total, self._rank(id_), id_)
+                        for id_, total in totals.items()
+                        if self._matches(id_, folders, kinds)
+                    ),
+                )
+                break
+            if not self._matches(id_, folders, kinds):
+                continue
+            total = score
+            for word in others:
+                word_score = self._score(id_, word)
+                if not word_score:
+                    break
+                total += word_score
+            else:
+                bisect.insort(best, (-total, self._rank(id_), id_))
+                del best[limit:]
+
+        return [
+            SearchResult(*self._entries[id_], score=-score) for score, _, id_ in best
+        ]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -2,9 +2,9 @@ import glob
 import os
 import yaml
 
-from typing import Any, List, Literal, Optional
+from typing import TYPE_CHECKING, Any, Iterable, List, Literal, Optional, Set
 from dataclasses import dataclass, field, asdict
-from itertools import combinations
+from itertools import combinations, count
 
 from allstars.core.relation import Column, Relation
 from allstars.core.base import Serializable, SerializableCollection
@@ -15,6 +15,20 @@ from allstars.core.filter import Filter
 from allstars.core.folder import Folder
 from allstars.core.query_context import QueryContext
 from allstars.core.join import Join
+from allstars.core.rollup import Rollup
+from allstars.core.dependency_index import (
+    EXPRESSION_KINDS,
+    KINDS,
+    DependencyIndex,
+)
+from allstars.core.folder_tree import FolderTree
+from allstars.core.search_index import SearchIndex
+from allstars.core.statistics import RelationStatistics
+
+if TYPE_CHECKING:
+    # both need sqlglot, only imported once queries need to be planned
+    from allstars.core.expression_index import ExpressionIndex
+    from allstars.core.join_graph import JoinGraph
 
 
 @dataclass
@@ -44,6 +58,111 @@ class SemanticLayer(Serializable):
     hierarchies: SerializableCollection[Hierarchy] = field(
         default_factory=SerializableCollection
     )
+    rollups: SerializableCollection[Rollup] = field(
+        default_factory=SerializableCollection
+    )
+    # row counts and column estimates, by relation key, see ``statistics``
+    statistics: SerializableCollection[RelationStatistics] = field(
+        default_factory=SerializableCollection
+    )
+
+    # pre-parsed expressions, join graphs and dependencies, built on first use
+    _expression_index = None
+    _join_graphs = None
+    _dependency_index = None
+    _search_index = None
+    _folder_tree = None
+
+    # identifies the semantic layer in caches shared between projects
+    _identities = count()
+    _identity = None
+
+    def get_identity(self) -> int:
+        """returns a number unique to this semantic layer within the process"""
+        if self._identity is None:
+            self._identity = next(SemanticLayer._identities)
+        return self._identity
+
+    def get_expression_index(self) -> "ExpressionIndex":
+        """returns the index of pre-parsed metrics, dimensions and filters"""
+        if self._expression_index is None:
+            from allstars.core.expression_index import ExpressionIndex
+
+            self._expression_index = ExpressionIndex.from_semantic_layer(self)
+        return self._expression_index
+
+    def get_dependency_index(self) -> DependencyIndex:
+        """returns the index of what depends on what, kept up to date"""
+        if self._dependency_index is None:
+            self._dependency_index = DependencyIndex.from_semantic_layer(self)
+        return self._dependency_index
+
+    def get_search_index(self) -> SearchIndex:
+        """returns the index to search metrics, dimensions and filters"""
+        if self._search_index is None:
+            self._search_index = SearchIndex.from_semantic_layer(self)
+        return self._search_index
+
+    def get_row_count(self, relation_key: str) -> Optional[int]:
+        """returns the estimated rows of a relation, if known"""
+        statistics = self.statistics.get(relation_key)
+        return statistics.row_count if statistics is not None else None
+
+    def get_folder_tree(self) -> FolderTree:
+        """returns the folders as a tree, with the items filed in each"""
+        if self._folder_tree is None:
+            self._folder_tree = FolderTree.from_semantic_layer(self)
+        return self._folder_tree
+
+    def _sync_indexes(self, collection, objects, removed=()):
+        """updates the dependency, search and folder indexes, if built"""
+        kind = KINDS[collection]
+        if self._dependency_index is not None:
+            for key in removed:
+                self._dependency_index.remove(kind, key)
+            for o in objects:
+                self._dependency_index.add(kind, o)
+        if self._folder_tree is not None:
+            if collection == "folders":
+                for key in removed:
+                    self._folder_tree.remove(key)
+                for o in objects:
+                    self._folder_tree.add(o)
+            elif kind in EXPRESSION_KINDS:
+                for key in removed:
+                    self._folder_tree.remove_item(kind, key)
+                for o in objects:
+                    self._folder_tree.add_item(kind, o)
+        # the search index shares the folder tree
+        if self._search_index is not None:
+            if kind in EXPRESSION_KINDS:
+                for key in removed:
+                    self._search_index.remove(kind, key)
+                for o in objects:
+                    self._search_index.add(kind, o)
+
+    def get_join_graph(self, query_context_key: Optional[str] = None) -> "JoinGraph":
+        """returns the join graph of a query context, or of the whole layer"""
+        if self._join_graphs is None:
+            self._join_graphs = {}
+        if query_context_key not in self._join_graphs:
+            from allstars.core.join_graph import JoinGraph
+
+            joins = list(self.joins)
+            if query_context_key:
+                qc = self.query_contexts[query_context_key]
+                if qc.join_keys:
+                    joins = [self.joins[k] for k in qc.join_keys]
+                else:
+                    relation_keys = set(qc.relation_keys)
+                    joins = [
+                        j
+                        for j in joins
+                        if j.left_relation_key in relation_keys
+                        and j.right_relation_key in relation_keys
+                    ]
+            self._join_graphs[query_context_key] = JoinGraph(joins)
+        return self._join_graphs[query_context_key]
 
     def create_relation(self, name, relation_type, columns, schema):
         return Relation(
@@ -80,6 +199,10 @@ class SemanticLayer(Serializable):
         self.infer_joins()
         self.infer_metrics()
         self.infer_dimensions()
+        self._expression_index = None
+        self._dependency_index = None
+        self._search_index = None
+        self._folder_tree = None
 
     def compile_to_files(self, folder):
         # relations
@@ -100,6 +223,26 @@ class SemanticLayer(Serializable):
         filename = os.path.join(folder, "dimensions.yaml")
         self.dimensions.to_yaml_file(filename, wrap_under="dimensions")
 
+        # filters
+        filename = os.path.join(folder, "filters.yaml")
+        self.filters.to_yaml_file(filename, wrap_under="filters")
+
+        # query contexts
+        filename = os.path.join(folder, "query_contexts.yaml")
+        self.query_contexts.to_yaml_file(filename, wrap_under="query_contexts")
+
+        # rollups
+        filename = os.path.join(folder, "rollups.yaml")
+        self.rollups.to_yaml_file(filename, wrap_under="rollups")
+
+        # hierarchies
+        filename = os.path.join(folder, "hierarchies.yaml")
+        self.hierarchies.to_yaml_file(filename, wrap_under="hierarchies")
+
+        # statistics
+        filename = os.path.join(folder, "statistics.yaml")
+        self.statistics.to_yaml_file(filename, wrap_under="statistics")
+
     @classmethod
     def from_folder(cls, folder_path=None):
         # Relations
@@ -123,6 +266,10 @@ class SemanticLayer(Serializable):
             f, Dimension, key="dimensions"
         )
 
+        # Filters
+        f = os.path.join(folder_path, "filters.yaml")
+        filters = SerializableCollection.from_yaml_file(f, Filter, key="filters")
+
         # Folders
         f = os.path.join(folder_path, "folders.yaml")
         folders = SerializableCollection.from_yaml_file(f, Folder, key="folders")
@@ -130,20 +277,110 @@ class SemanticLayer(Serializable):
         for folder in folders:
             folder.flatten(expanded_folders)
 
+        # Query contexts
+        f = os.path.join(folder_path, "query_contexts.yaml")
+        query_contexts = SerializableCollection.from_yaml_file(
+            f, QueryContext, key="query_contexts"
+        )
+
+        # Rollups
+        f = os.path.join(folder_path, "rollups.yaml")
+        rollups = SerializableCollection.from_yaml_file(f, Rollup, key="rollups")
+
+        # Hierarchies
+        f = os.path.join(folder_path, "hierarchies.yaml")
+        hierarchies = SerializableCollection.from_yaml_file(
+            f, Hierarchy, key="hierarchies"
+        )
+
+        # Statistics
+        f = os.path.join(folder_path, "statistics.yaml")
+        statistics = SerializableCollection.from_yaml_file(
+            f, RelationStatistics, key="statistics"
+        )
+
         return cls(
             relations=relations,
             joins=joins,
             dimensions=dimensions,
             metrics=metrics,
+            filters=filters,
             folders=expanded_folders,
+            query_contexts=query_contexts,
+            rollups=rollups,
+            hierarchies=hierarchies,
+            statistics=statistics,
         )
 
     def upsert(self, semantic_layer):
         """Insert new keys and update existing ones"""
-        for collection in ["relations", "metrics", "dimensions"]:
+        collections = [
+            "relations",
+            "metrics",
+            "dimensions",
+            "filters",
+            "query_contexts",
+            "rollups",
+            "hierarchies",
+        ]
+        for collection in collections:
             d1 = getattr(self, collection)
             d2 = getattr(semantic_layer, collection)
             d1.upsert(d2)
+            self._sync_indexes(collection, d2)
+        self._expression_index = None
+        self._join_graphs = None
+
+    def update(
+        self,
+        collection: str,
+        objects: Iterable[Any] = (),
+        removed: Iterable[str] = (),
+    ) -> Set[str]:
+        """
+        Upserts and removes objects of a collection, keeping the indexes and
+        join graphs in sync without rebuilding them.
+
+        The collection is swapped as a whole, so that concurrent queries see
+        either the old or the new version. Returns the keys of everything
+        that changed, including the relations of changed joins, for caches
+        to invalidate what depends on them.
+        """
+        current = getattr(self, collection)
+        updated = SerializableCollection(list(current))
+        changed = set()
+        for key in removed:
+            if updated.pop(key, None) is not None:
+                changed.add(key)
+        for o in objects:
+            existing = updated.get(o.key)
+            if existing is None or existing.to_dict() != o.to_dict():
+                updated[o.key] = o
+                changed.add(o.key)
+        if not changed:
+            return changed
+
+        setattr(self, collection, updated)
+        self._sync_indexes(
+            collection,
+            [updated[key] for key in changed if key in updated],
+            [key for key in changed if key not in updated],
+        )
+        if collection == "joins":
+            for key in changed:
+                join = updated.get(key) or current[key]
+                changed |= {join.left_relation_key, join.right_relation_key}
+            self._join_graphs = None
+        elif collection == "query_contexts" and self._join_graphs is not None:
+            self._join_graphs = {
+                k: v for k, v in self._join_graphs.items() if k not in changed
+            }
+        elif collection in {"metrics", "dimensions", "filters", "relations"}:
+            if self._expression_index is not None:
+                self._expression_index = self._expression_index.refresh(
+                    self, changed
+                )
+        return changed
 
     def get_relation_keys_for_objects(self, objects):
         relation_keys = set()
@@ -165,6 +402,9 @@ class SemanticLayer(Serializable):
                 )
             )
         self.metrics = metrics
+        self._dependency_index = None
+        self._search_index = None
+        self._folder_tree = None
 
     def infer_dimensions(self):
         """populates self.metrics with Dimensions objects!"""
@@ -179,6 +419,9 @@ class SemanticLayer(Serializable):
                     )
                 )
         self.dimensions = dims
+        self._dependency_index = None
+        self._search_index = None
+        self._folder_tree = None
 
     def infer_joins(self, exclude_views=True):
         """
@@ -209,6 +452,8 @@ class SemanticLayer(Serializable):
                     joins.append(r.gen_join(fr, cols))
 
         self.joins = SerializableCollection(joins)
+        self._join_graphs = None
+        self._dependency_index = None
 
     def augment_joins(self):
         """read the local project to find joins"""
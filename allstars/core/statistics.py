@@ -0,0 +1,290 @@
+"""
+Statistics about relations, for cost-based decisions.
+
+Row counts, and for each column an estimate of its number of distinct values
+and of its fraction of NULLs, are collected by ``allstars extract
+--statistics`` or ``allstars statistics`` and stored in ``statistics.yaml``
+along with the relations. They're estimates, collected cheaply:
+
+- from the database's own catalog, when it keeps statistics (PostgreSQL);
+- otherwise with a ``COUNT(*)``, and from a random sample of the relation's
+  rows where the database can draw one (``TABLESAMPLE`` or ``ORDER BY``
+  a random function). Elsewhere the sample is the first rows the database
+  returns, often clustered by insertion order, which tends to underestimate
+  the distinct values of columns correlated with it.
+
+They're used to join from the largest relation, to order joins, and to skip
+rollups that wouldn't be much smaller than the relation they aggregate.
+
+Refreshing is incremental: relations are only sampled again when their
+columns changed, when their row count moved by more than a threshold, or
+when their statistics are older than some age.
+"""
+
+import hashlib
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from allstars.core.base import Serializable
+from allstars.core.relation import Relation
+
+# rows sampled to estimate the statistics of columns
+DEFAULT_SAMPLE_SIZE = 10000
+
+# relative change in row count above which columns are sampled again
+REFRESH_THRESHOLD = 0.1
+
+# names of the functions returning random numbers, to sample rows by dialect
+RANDOM_FUNCTIONS = {
+    "sqlite": "random",
+    "duckdb": "random",
+    "mysql": "rand",
+    "mariadb": "rand",
+    "mssql": "newid",
+}
+
+
+@dataclass
+class RelationStatistics(Serializable):
+    relation_key: str
+    row_count: Optional[int] = None
+    # ``distinct_count`` and ``null_fraction``, by column name
+    columns: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    # rows the column statistics were estimated from, 0 for the catalog's
+    sample_size: int = 0
+    # of the relation's columns when collected, to notice when they change
+    signature: str = ""
+    # as a UNIX timestamp
+    collected_at: float = 0.0
+
+    @property
+    def key(self):
+        return self.relation_key
+
+    def distinct_count(self, column_name: str) -> Optional[int]:
+        return self.columns.get(column_name, {}).get("distinct_count")
+
+    def null_fraction(self, column_name: str) -> Optional[float]:
+        return self.columns.get(column_name, {}).get("null_fraction")
+
+
+def get_signature(relation: Relation) -> str:
+    definition = "|".join(f"{c.name}:{c.data_type}" for c in relation.columns)
+    return hashlib.sha1(definition.encode("utf-8")).hexdigest()[:12]
+
+
+def estimate_distinct(values: List[Any], row_count: Optional[int]) -> int:
+    """
+    Estimate the distinct values of a column from a sample of its values.
+
+    Uses the Duj1 estimator of Haas and Stokes, like PostgreSQL's ``ANALYZE``:
+    values seen only once in the sample hint at how many were never seen.
+    """
+    counts = Counter(_hashable(value) for value in values if value is not None)
+    sampled = sum(counts.values())
+    distinct = len(counts)
+    if not sampled or not row_count or len(values) >= row_count:
+        return distinct
+
+    # non-NULL values in the whole relation
+    total = row_count * sampled / len(values)
+    singletons = sum(1 for count in counts.values() if count == 1)
+    unseen = sampled - singletons + singletons * sampled / total
+    estimate = sampled * distinct / unseen
+    return int(round(min(max(estimate, distinct), total)))
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+class StatisticsCollector:
+    """
+    Collects the statistics of relations from their database.
+    """
+
+    def __init__(self, db, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.db = db
+        self.sample_size = sample_size
+
+    def _table(self, relation: Relation, names: Iterable[str] = ()):
+        from sqlalchemy import column, table
+
+        return table(
+            relation.reference,
+            *(column(name) for name in names),
+            schema=relation.database_schema,
+        )
+
+    def row_count(self, relation: Relation) -> Optional[int]:
+        catalog = self._catalog(relation, columns=False)
+        if catalog is not None:
+            return catalog[0]
+        from sqlalchemy import func, select
+
+        with self.db.engine.connect() as connection:
+            query = select(func.count()).select_from(self._table(relation))
+            return connection.execute(query).scalar()
+
+    def collect(
+        self,
+        relation: Relation,
+        row_count: Optional[int] = None,
+    ) -> RelationStatistics:
+        """
+        Collect the statistics of a relation, reusing its row count if known.
+        """
+        statistics = RelationStatistics(
+            relation_key=relation.key,
+            signature=get_signature(relation),
+            collected_at=time.time(),
+        )
+        names = relation.get_column_names()
+        catalog = self._catalog(relation, columns=True)
+        if catalog is not None and set(catalog[1]) >= set(names):
+            statistics.row_count, statistics.columns = catalog
+            return statistics
+
+        if row_count is None:
+            row_count = self.row_count(relation)
+        statistics.row_count = row_count
+        if not names:
+            return statistics
+
+        with self.db.engine.connect() as connection:
+            query = self._sample(relation, names, row_count)
+            rows = connection.execute(query).fetchall()
+        statistics.sample_size = len(rows)
+        for name, values in zip(names, zip(*rows) if rows else [()] * len(names)):
+            values = list(values)
+            nulls = sum(1 for value in values if value is None)
+            statistics.columns[name] = {
+                "distinct_count": estimate_distinct(values, row_count),
+                "null_fraction": round(nulls / len(values), 6) if values else None,
+            }
+        return statistics
+
+    def _sample(self, relation: Relation, names: List[str], row_count: Optional[int]):
+        """
+        A query for a random sample of rows, where the dialect can draw one.
+        """
+        from sqlalchemy import func, select, tablesample
+
+        source = self._table(relation, names)
+        if row_count is not None and row_count <= self.sample_size:
+            return select(source)
+
+        dialect = self.db.engine.dialect.name
+        if dialect == "postgresql" and row_count:
+            # row level sampling, with some margin for the LIMIT
+            percent = min(100.0, 200.0 * self.sample_size / row_count)
+            sample = tablesample(source, func.bernoulli(percent))
+            return select(sample).limit(self.sample_size)
+        if dialect in RANDOM_FUNCTIONS:
+            random = getattr(func, RANDOM_FUNCTIONS[dialect])()
+            return select(source).order_by(random).limit(self.sample_size)
+        return select(source).limit(self.sample_size)
+
+    def _catalog(
+        self,
+        relation: Relation,
+        columns: bool,
+    ) -> Optional[Tuple[int, Dict[str, Dict[str, Any]]]]:
+        """
+        Statistics the database keeps itself, if it keeps any.
+        """
+        if self.db.engine.dialect.name != "postgresql":
+            return None
+        from sqlalchemy import text
+
+        parameters = {"schema": relation.database_schema, "name": relation.reference}
+        with self.db.engine.connect() as connection:
+            row = connection.execute(
+                text(
+                    "SELECT c.reltuples, c.relpages FROM pg_class c "
+                    "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = :schema AND c.relname = :name"
+                ),
+                parameters,
+            ).first()
+            # never analyzed: -1 since PostgreSQL 14, no rows nor pages before
+            if row is None or row[0] < 0 or (row[0] == 0 and row[1] == 0):
+                return None
+            row_count = int(row[0])
+
+            stats: Dict[str, Dict[str, Any]] = {}
+            if columns:
+                rows = connection.execute(
+                    text(
+                        "SELECT attname, n_distinct, null_frac FROM pg_stats "
+                        "WHERE schemaname = :schema AND tablename = :name"
+                    ),
+                    parameters,
+                )
+                for name, n_distinct, null_fraction in rows:
+                    # negative values are a fraction of the rows
+                    if n_distinct < 0:
+                        n_distinct = -n_distinct * row_count
+                    stats[name] = {
+                        "distinct_count": int(round(n_distinct)),
+                        "null_fraction": round(float(null_fraction), 6),
+                    }
+        return row_count, stats
+
+    def refresh(
+        self,
+        semantic_layer,
+        relation_keys: Optional[Iterable[str]] = None,
+        max_age: Optional[float] = None,
+        force: bool = False,
+        threshold: float = REFRESH_THRESHOLD,
+    ) -> List[str]:
+        """
+        Bring the statistics of a semantic layer up to date, returning the
+        keys of the relations whose statistics changed.
+
+        Relations are sampled again when new, when their columns changed,
+        when their row count changed by more than ``threshold``, or when
+        their statistics are older than ``max_age`` seconds; otherwise only
+        their row count is updated.
+        """
+        keys = set(relation_keys or semantic_layer.relations.keys())
+        now = time.time()
+        updated = []
+        for relation in semantic_layer.relations:
+            if relation.key not in keys:
+                continue
+            current = semantic_layer.statistics.get(relation.key)
+            if (
+                force
+                or current is None
+                or current.signature != get_signature(relation)
+                or (max_age is not None and now - current.collected_at > max_age)
+            ):
+                updated.append(self.collect(relation))
+                continue
+
+            row_count = self.row_count(relation)
+            previous = current.row_count or 0
+            if abs(row_count - previous) > threshold * max(previous, 1):
+                updated.append(self.collect(relation, row_count))
+            elif row_count != current.row_count:
+                updated.append(
+                    RelationStatistics.from_dict(
+                        {**current.to_dict(), "row_count": row_count}
+                    )
+                )
+
+        removed = [
+            key
+            for key in semantic_layer.statistics.keys()
+            if key not in semantic_layer.relations
+        ]
+        changed = semantic_layer.update("statistics", updated, removed)
+        return sorted(changed)
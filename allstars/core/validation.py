@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp, parse_one
+
+from allstars.core.folder_tree import FolderTree
+
+# below this many expressions to parse, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+
+
+@dataclass
+class ValidationError:
+    object_type: str
+    key: str
+    message: str
+    # what's wrong, one of "syntax", "unknown_relation", "unknown_column",
+    # "unjoinable" and "folder_cycle"
+    code: str
+    # the relation, column or folder at fault, if any
+    reference: Optional[str] = None
+
+    def __str__(self):
+        return f"[{self.object_type}] {self.key}: {self.message}"
+
+
+@dataclass
+class ValidationReport:
+    errors: List[ValidationError] = field(default_factory=list)
+    # seconds spent in each phase
+    timings: Dict[str, float] = field(default_factory=dict)
+    objects: int = 0
+    # distinct expressions parsed, or found in the cache
+    parsed: int = 0
+    cached: int = 0
+    # expressions shared with another object, checked once
+    duplicates: int = 0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        phases = ", ".join(f"{k}: {v:.3f}s" for k, v in self.timings.items())
+        return (
+            f"Validated {self.objects} objects, {len(self.errors)} error(s) "
+            f"({self.parsed} parsed, {self.cached} cached, "
+            f"{self.duplicates} duplicates) [{phases}]"
+        )
+
+
+def content_hash(expression: str) -> str:
+    return hashlib.sha1(expression.encode("utf-8")).hexdigest()
+
+
+def parse_expressions(expressions: List[str]) -> List[Tuple[Optional[str], list]]:
+    """
+    Parses expressions, returning for each the error if any and the columns
+    it references as (table, name) pairs. Runs in worker processes.
+    """
+    results = []
+    for expression in expressions:
+        try:
+            tree = parse_one(expression)
+        except Exception as ex:
+            results.append((str(ex).splitlines()[0], []))
+            continue
+        columns = [
+            (".".join(p for p in (c.text("db"), c.table) if p), c.name)
+            for c in tree.find_all(exp.Column)
+        ]
+        results.append((None, columns))
+    return results
+
+
+class ParseCache:
+    """Parse results keyed by the hash of the expression's content"""
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename = filename
+        self.entries: Dict[str, list] = {}
+        if filename and os.path.exists(filename):
+            with open(filename, "r") as file:
+                data = json.load(file)
+            # results may differ across sqlglot versions
+            if data.get("sqlglot") == sqlglot.__version__:
+                self.entries = data.get("entries", {})
+
+    def get(self, expression: str):
+        return self.entries.get(content_hash(expression))
+
+    def set(self, expression: str, result):
+        self.entries[content_hash(expression)] = list(result)
+
+    def flush(self):
+        if not self.filename:
+            return
+        with open(self.filename, "w") as file:
+            json.dump({"sqlglot": sqlglot.__version__, "entries": self.entries}, file)
+
+
+class Validator:
+    """Validates a semantic layer before it gets deployed"""
+
+    def __init__(
+        self,
+        semantic_layer,
+        cache_file: Optional[str] = None,
+        processes: Optional[int] = None,
+    ):
+        self.semantic_layer = semantic_layer
+        self.cache = ParseCache(cache_file)
+        self.processes = processes
+
+    def _expressions(self) -> Iterator[Tuple[str, object, str]]:
+        sl = self.semantic_layer
+        for object_type in ["metrics", "dimensions", "filters"]:
+            for o in getattr(sl, object_type):
+                yield object_type, o, o.expression
+        for j in sl.joins:
+            yield "joins", j, j.join_criteria
+
+    def parse_all(self, expressions: List[str], report: ValidationReport):
+        """Parses whatever isn't cached yet, in a process pool if worth it"""
+        distinct = set(expressions)
+        todo = [e for e in distinct if self.cache.get(e) is None]
+        report.duplicates = len(expressions) - len(distinct)
+        report.cached = len(distinct) - len(todo)
+        report.parsed = len(todo)
+
+        chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+        if len(todo) >= PARALLEL_THRESHOLD and self.processes != 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                results = executor.map(parse_expressions, chunks)
+                for chunk, chunk_results in zip(chunks, results):
+                    for e, result in zip(chunk, chunk_results):
+                        self.cache.set(e, result)
+        else:
+            for chunk in chunks:
+                for e, result in zip(chunk, parse_expressions(chunk)):
+                    self.cache.set(e, result)
+
+    def validate(self) -> ValidationReport:
+        report = ValidationReport()
+        sl = self.semantic_layer
+        start = time.perf_counter()
+
+        items = list(self._expressions())
+        report.objects = len(items) + len(sl.relations)
+        self.parse_all([e for _, _, e in items], report)
+        report.timings["parse"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        columns_by_table = {}
+        for r in sl.relations:
+            names = set(r.get_column_names())
+            columns_by_table[r.key] = names
+            columns_by_table[r.reference] = names
+        menu_keys = set(sl.metrics.keys()) | set(sl.dimensions.keys())
+        components = self.join_components()
+
+        for object_type, o, expression in items:
+            error, columns = self.cache.get(expression)
+            if error:
+                report.errors.append(
+                    ValidationError(object_type, o.key, error, "syntax")
+                )
+                continue
+            if object_type == "joins":
+                relation_keys = [o.left_relation_key, o.right_relation_key]
+            else:
+                relation_keys = o.relation_keys
+            missing = [k for k in relation_keys if k not in sl.relations]
+            for k in missing:
+                report.errors.append(
+                    ValidationError(
+                        object_type,
+                        o.key,
+                        f"unknown relation {k}",
+                        "unknown_relation",
+                        k,
+                    )
+                )
+            if missing:
+                continue
+
+            for table, name in columns:
+                if not table and name in menu_keys:
+                    continue
+                if table:
+                    known = columns_by_table.get(table)
+                else:
+                    known = set().union(*(columns_by_table[k] for k in relation_keys))
+                if known is not None and name not in known:
+                    column = ".".join(p for p in (table, name) if p)
+                    report.errors.append(
+                        ValidationError(
+                            object_type,
+                            o.key,
+                            f"unknown column {column}",
+                            "unknown_column",
+                            column,
+                        )
+                    )
+
+            if len({components[k] for k in relation_keys}) > 1:
+                report.errors.append(
+                    ValidationError(
+                        object_type,
+                        o.key,
+                        f"relations {', '.join(relation_keys)} can't be joined",
+                        "unjoinable",
+                    )
+                )
+
+        for key, parent in FolderTree(sl.folders).cycles().items():
+            report.errors.append(
+                ValidationError(
+                    "folders",
+                    key,
+                    f"parent folder {parent} makes a cycle",
+                    "folder_cycle",
+                    parent,
+                )
+            )
+        report.timings["check"] = time.perf_counter() - start
+
+        self.cache.flush()
+        return report
+
+    def join_components(self) -> Dict[str, str]:
+        """Maps every relation to a representative of its join component"""
+        parents = {k: k for k in self.semantic_layer.relations.keys()}
+
+        def find(k):
+            while parents[k] != k:
+                parents[k] = parents[parents[k]]
+                k = parents[k]
+            return k
+
+        for j in self.semantic_layer.joins:
+            if j.left_relation_key in parents and j.right_relation_key in parents:
+                parents[find(j.left_relation_key)] = find(j.right_relation_key)
+
+        return {k: find(k) for k in parents}
+
+
+def validate(semantic_layer, cache_file=None, processes=None) -> ValidationReport:
+    return Validator(semantic_layer, cache_file, processes).validate()
@@ -1,13 +1,112 @@
-from sqlalchemy import create_engine, MetaData, Table, inspect
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, MetaData, Table, inspect, text
+
+DEFAULT_CHUNKSIZE = 10000
+
+# pandas dtypes for what ``infer_dtype`` makes of the first chunk of a column;
+# nullable ones, so that a column keeps its dtype whether or not a chunk has
+# NULLs. Anything else is kept as Python objects.
+PANDAS_DTYPES = {
+    "boolean": "boolean",
+    "integer": "Int64",
+    "floating": "float64",
+    "mixed-integer-float": "float64",
+}
 
 
 class DatabaseInterface:
-    def __init__(self, sqla_conn):
+    def __init__(self, sqla_conn, **engine_kwargs):
         self.sqla_conn = sqla_conn
-        self.engine = create_engine(
-            self.sqla_conn, credentials_path="/Users/max/.dbt/dev-dbt.json"
-        )
-        self.inspector = inspect(self.engine)
+        # driver specific options, eg: credentials_path for BigQuery
+        self.engine = create_engine(self.sqla_conn, **engine_kwargs)
+        self._inspector = None
+
+    @property
+    def inspector(self):
+        """only connect to inspect the database when needed"""
+        if self._inspector is None:
+            self._inspector = inspect(self.engine)
+        return self._inspector
+
+    def get_df(self, sql, chunksize=None, arrow=False):
+        """
+        get a dataframe!
+
+        Returns a pandas DataFrame, or a pyarrow Table when ``arrow`` is set.
+        With a ``chunksize``, returns an iterator of DataFrames (or of
+        RecordBatches) of at most that many rows instead, fetching them as
+        they're consumed so that large results don't need to fit in memory.
+        """
+        chunks = self._iter_chunks(sql, chunksize or DEFAULT_CHUNKSIZE)
+        converter = _ArrowConverter() if arrow else _PandasConverter()
+        frames = (converter.convert(names, rows) for names, rows in chunks)
+        if chunksize:
+            return frames
+        return converter.concat(list(frames))
+
+    def _iter_chunks(
+        self, sql: str, chunksize: int
+    ) -> Iterator[Tuple[List[str], List[Tuple[Any, ...]]]]:
+        with self.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=chunksize
+            ).execute(text(sql))
+            names = list(result.keys())
+            empty = True
+            for rows in result.partitions(chunksize):
+                empty = False
+                yield names, rows
+            if empty:
+                yield names, []
+
+
+class _PandasConverter:
+    def __init__(self):
+        # from the first chunk, later ones are cast to it
+        self.dtypes: Optional[Dict[str, str]] = None
+
+    def convert(self, names, rows):
+        import pandas as pd
+        from pandas.api.types import infer_dtype
+
+        columns = list(zip(*rows)) if rows else [() for _ in names]
+        if self.dtypes is None:
+            self.dtypes = {
+                name: PANDAS_DTYPES.get(infer_dtype(values, skipna=True), "object")
+                for name, values in zip(names, columns)
+            }
+        data = {}
+        for name, values in zip(names, columns):
+            dtype = self.dtypes[name]
+            try:
+                data[name] = pd.Series(values, dtype=dtype)
+            except (TypeError, ValueError) as ex:
+                message = f"Column {name} can't be converted as {dtype}: {ex}"
+                raise ValueError(message) from ex
+        return pd.DataFrame(data, columns=names)
+
+    def concat(self, frames):
+        import pandas as pd
+
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+
+class _ArrowConverter:
+    def __init__(self):
+        # from the first chunk, later ones are cast to it
+        self.schema = None
+
+    def convert(self, names, rows):
+        from allstars.sql.output import arrow_schema, record_batch
+
+        if self.schema is None:
+            self.schema = arrow_schema(record_batch(names, rows))
+        return record_batch(names, rows, self.schema)
+
+    def concat(self, batches):
+        import pyarrow as pa
 
-    def get_df(self, sql):
-        """get a dataframe!"""
+        return pa.Table.from_batches(batches, schema=self.schema)
@@ -0,0 +1,344 @@
+"""
+A long-running HTTP/JSON interface to a project, see ``allstars serve``.
+
+The project is loaded once, and everything that can be kept warm between
+requests is: the pre-parsed expressions and join graphs, the connection
+pool, transpiled queries, the serialized metadata, and optionally results.
+
+Endpoints:
+
+    GET  /health
+    GET  /metadata                       collections and their sizes
+    GET  /metadata/<collection>          e.g. /metadata/metrics
+    GET  /metadata/<collection>/<key>
+    GET  /search?q=...&limit=20&folder=...&kind=metric
+    GET  /folders                        the top-level folders
+    GET  /folders/<key>                  its path, subfolders and items
+    POST /transpile  {"query": "..."}
+    POST /sql        {"query": "...", "parameters": {...}, "timeout": 10}
+
+Requests are handled concurrently, one thread each.
+"""
+
+import json
+import logging
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+from sqlglot.errors import ParseError
+
+from allstars.core.dependency_index import EXPRESSION_KINDS
+from allstars.core.search_index import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+from allstars.sql.cache import DEFAULT_MAXSIZE, QueryCache
+from allstars.sql.dbapi import connect
+from allstars.sql.dbapi.exceptions import OperationalError, ProgrammingError
+from allstars.sql.transpile import compile_query
+
+if TYPE_CHECKING:
+    from allstars.core.project import Project
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8000
+
+# most rows returned by a single request
+DEFAULT_MAX_ROWS = 10000
+
+METADATA_COLLECTIONS = [
+    "metrics",
+    "dimensions",
+    "filters",
+    "folders",
+    "relations",
+    "joins",
+    "query_contexts",
+    "rollups",
+    "hierarchies",
+    "statistics",
+]
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Server:
+    """
+    Answers semantic SQL and metadata requests for a loaded project.
+    """
+
+    def __init__(
+        self,
+        project: "Project",
+        plan_cache_size: int = DEFAULT_MAXSIZE,
+        result_ttl: Optional[float] = None,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ):
+        self.project = project
+        self.max_rows = max_rows
+
+        self.plan_cache = QueryCache(plan_cache_size)
+        # results can go stale, so they're only cached for a while if asked
+        self.result_cache = (
+            QueryCache(plan_cache_size, result_ttl) if result_ttl else None
+        )
+        self.connection = connect(
+            project.sqla_conn,
+            semantic_layer=project.semantic_layer,
+            plan_cache=self.plan_cache,
+        )
+
+        # serialized metadata collections, by name
+        self._metadata: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def semantic_layer(self):
+        return self.project.semantic_layer
+
+    def warm(self) -> None:
+        """
+        Build everything the first requests would otherwise pay for.
+        """
+        self.semantic_layer.get_expression_index()
+        self.semantic_layer.get_join_graph()
+        self.semantic_layer.get_search_index()
+        self.semantic_layer.get_folder_tree()
+        for query_context in self.semantic_layer.query_contexts:
+            self.semantic_layer.get_join_graph(query_context.key)
+        for collection in METADATA_COLLECTIONS:
+            self.metadata(collection)
+        with self.connection.engine.connect():
+            pass
+
+    def invalidate(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Drop cached queries and results depending on some semantic layer
+        objects, directly or not, or everything when no keys are given, along
+        with the serialized metadata.
+        """
+        if keys is not None:
+            dependency_index = self.semantic_layer.get_dependency_index()
+            keys = dependency_index.impact_keys(keys)
+        caches = [c for c in (self.plan_cache, self.result_cache) if c is not None]
+        for cache in caches:
+            if keys is None:
+                cache.clear()
+            else:
+                cache.invalidate(keys)
+        with self._lock:
+            self._metadata.clear()
+
+    def metadata(self, collection: Optional[str] = None, key: Optional[str] = None):
+        if collection is None:
+            return {
+                name: len(getattr(self.semantic_layer, name))
+                for name in METADATA_COLLECTIONS
+            }
+        if collection not in METADATA_COLLECTIONS:
+            raise RequestError(
+                HTTPStatus.NOT_FOUND, f"Unknown collection {collection}"
+            )
+        objects = getattr(self.semantic_layer, collection)
+        if key is not None:
+            if key not in objects:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown {collection} {key}")
+            return objects[key].to_dict()
+        return objects.to_serializable()
+
+    def metadata_json(self, collection: str) -> bytes:
+        """
+        Return a whole collection as JSON, serialized once.
+        """
+        with self._lock:
+            data = self._metadata.get(collection)
+        if data is None:
+            data = dumps(self.metadata(collection))
+            with self._lock:
+                self._metadata[collection] = data
+        return data
+
+    def search(
+        self,
+        text: str,
+        limit: int = DEFAULT_SEARCH_LIMIT,
+        folder_key: Optional[str] = None,
+        kinds: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        unknown = set(kinds or ()) - EXPRESSION_KINDS
+        if unknown:
+            raise RequestError(
+                HTTPStatus.BAD_REQUEST,
+                f"Unknown kind {', '.join(sorted(unknown))}, expected one of "
+                f"{', '.join(sorted(EXPRESSION_KINDS))}",
+            )
+        index = self.semantic_layer.get_search_index()
+        return [vars(result) for result in index.search(text, limit, folder_key, kinds)]
+
+    def folder(self, key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        A level of the folder tree, for clients to render it lazily.
+        """
+        tree = self.semantic_layer.get_folder_tree()
+        if key is None:
+            return {"children": tree.roots()}
+        if key not in tree:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown folder {key}")
+        return {
+            "key": key,
+            "path": tree.path(key),
+            "children": tree.children(key),
+            "items": [{"kind": kind, "key": k} for kind, k in tree.items(key)],
+        }
+
+    def transpile(self, query: str) -> Dict[str, Any]:
+        compiled = compile_query(
+            self.connection.engine,
+            query,
+            semantic_layer=self.semantic_layer,
+            cache=self.plan_cache,
+        )
+        return {
+            "sql": compiled.sql,
+            "error_bounds": {
+                name: vars(bound) for name, bound in compiled.error_bounds.items()
+            },
+        }
+
+    def sql(
+        self,
+        query: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        cache_key = (query, json.dumps(parameters, sort_keys=True, default=str))
+        if self.result_cache is not None:
+            result = self.result_cache.get(cache_key)
+            if result is not None:
+                return result
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, parameters, timeout)
+            rows = cursor.fetchmany(self.max_rows + 1)
+            result = {
+                "columns": [column[0] for column in cursor.description or []],
+                "rows": [list(row) for row in rows[: self.max_rows]],
+                "truncated": len(rows) > self.max_rows,
+            }
+            # metadata tables are answered in memory, not worth caching
+            compiled = cursor.compiled
+        finally:
+            cursor.close()
+
+        if self.result_cache is not None and compiled is not None:
+            dependencies = compiled.dependencies
+            self.result_cache.set(cache_key, result, dependencies)
+        return result
+
+    def make_http_server(
+        self, host: str = "127.0.0.1", port: int = DEFAULT_PORT
+    ) -> "HTTPServer":
+        return HTTPServer((host, port), make_handler(self))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops connections from busier clients
+    request_queue_size = 128
+
+
+def dumps(data: Any) -> bytes:
+    return json.dumps(data, default=str).encode("utf-8")
+
+
+def make_handler(server: Server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self._handle(self._get)
+
+        def do_POST(self):
+            self._handle(self._post)
+
+        def _get(self) -> Tuple[HTTPStatus, bytes]:
+            url = urlparse(self.path)
+            parts = [unquote(p) for p in url.path.split("/") if p]
+            if parts == ["health"]:
+                return HTTPStatus.OK, dumps({"status": "ok"})
+            if parts == ["search"]:
+                query = parse_qs(url.query)
+                try:
+                    limit = int(query.get("limit", [DEFAULT_SEARCH_LIMIT])[0])
+                except ValueError as ex:
+                    raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid limit") from ex
+                results = server.search(
+                    query.get("q", [""])[0],
+                    limit,
+                    query.get("folder", [None])[0],
+                    query.get("kind"),
+                )
+                return HTTPStatus.OK, dumps(results)
+            if parts[:1] == ["folders"] and len(parts) <= 2:
+                return HTTPStatus.OK, dumps(server.folder(*parts[1:]))
+            if parts[:1] == ["metadata"] and len(parts) <= 3:
+                if len(parts) == 2:
+                    return HTTPStatus.OK, server.metadata_json(parts[1])
+                return HTTPStatus.OK, dumps(server.metadata(*parts[1:]))
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+        def _post(self) -> Tuple[HTTPStatus, bytes]:
+            path = urlparse(self.path).path.rstrip("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as ex:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid JSON") from ex
+            if not isinstance(payload, dict) or "query" not in payload:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Missing query")
+
+            if path == "/transpile":
+                return HTTPStatus.OK, dumps(server.transpile(payload["query"]))
+            if path == "/sql":
+                result = server.sql(
+                    payload["query"],
+                    payload.get("parameters"),
+                    payload.get("timeout"),
+                )
+                return HTTPStatus.OK, dumps(result)
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Not found: {self.path}")
+
+        def _handle(self, method) -> None:
+            try:
+                status, body = method()
+            except RequestError as ex:
+                status, body = ex.status, dumps({"error": str(ex)})
+            except (ParseError, ProgrammingError, NotImplementedError) as ex:
+                status, body = HTTPStatus.BAD_REQUEST, dumps({"error": str(ex)})
+            except OperationalError as ex:
+                status = HTTPStatus.SERVICE_UNAVAILABLE
+                body = dumps({"error": str(ex)})
+            except Exception as ex:  # pylint: disable=broad-except
+                _logger.exception("Error handling %s", self.path)
+                status = HTTPStatus.INTERNAL_SERVER_ERROR
+                body = dumps({"error": str(ex)})
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            _logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
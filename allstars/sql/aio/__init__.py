@@ -0,0 +1,8 @@
+"""
+An asyncio counterpart of the DB API 2.0 implementation.
+"""
+
+from allstars.sql.aio.connection import AsyncConnection, connect
+from allstars.sql.aio.cursor import AsyncCursor
+
+__all__ = ["AsyncConnection", "AsyncCursor", "connect"]
@@ -0,0 +1,149 @@
+"""
+An asyncio connection.
+"""
+
+import asyncio
+import weakref
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from allstars import config
+from allstars.sql.aio.cursor import AsyncCursor
+from allstars.sql.dbapi.connection import Connection
+from allstars.sql.dbapi.decorators import check_closed
+from allstars.sql.querylog import enable as enable_query_log
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+
+# size of the thread pool shared by all connections, used for transpiling and
+# for running queries on backends without an async driver
+MAX_WORKERS = 8
+
+_executor: Optional[Executor] = None
+
+
+def get_executor() -> Executor:
+    """
+    Return the shared, bounded thread pool.
+    """
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS,
+            thread_name_prefix="allstars",
+        )
+    return _executor
+
+
+class AsyncConnection:
+
+    """
+    Asyncio connection.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        semantic_layer: Optional["SemanticLayer"] = None,
+        approximate: bool = False,
+        sample_percent: Optional[float] = None,
+        executor: Optional[Executor] = None,
+        timeout: Optional[float] = None,
+        collect_stats: bool = False,
+        **kwargs: Any,
+    ):
+        self.database_url = database_url
+        self.kwargs = kwargs
+        self.semantic_layer = semantic_layer
+        self.approximate = approximate
+        self.sample_percent = sample_percent
+        self.executor = executor or get_executor()
+
+        # default timeout for queries, in seconds
+        self.timeout = timeout
+
+        # record per-phase timings in ``cursor.stats``
+        self.collect_stats = collect_stats
+        if config.ALLSTARS_QUERY_LOG:
+            enable_query_log(config.ALLSTARS_QUERY_LOG)
+
+        self.closed = False
+        # cursors are tracked weakly, so that discarded ones can be collected
+        self.cursors: "weakref.WeakSet[AsyncCursor]" = weakref.WeakSet()
+
+        # use the backend's async driver when it has one, otherwise a regular
+        # connection driven from the thread pool
+        self.async_engine = None
+        self.sync_connection = None
+        if make_url(database_url).get_dialect().is_async:
+            self.async_engine = create_async_engine(database_url, connect_args=kwargs)
+        else:
+            self.sync_connection = Connection(
+                database_url,
+                semantic_layer=semantic_layer,
+                approximate=approximate,
+                sample_percent=sample_percent,
+                timeout=timeout,
+                collect_stats=collect_stats,
+                **kwargs,
+            )
+
+    @check_closed
+    async def close(self) -> None:
+        """Close the connection now."""
+        self.closed = True
+        for cursor in list(self.cursors):
+            if not cursor.closed:
+                await cursor.close()
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        if self.sync_connection is not None and not self.sync_connection.closed:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.sync_connection.close)
+
+    @check_closed
+    async def commit(self) -> None:
+        """Commit any pending transaction to the database."""
+
+    @check_closed
+    async def rollback(self) -> None:
+        """Rollback any transactions."""
+
+    @check_closed
+    def cursor(self) -> AsyncCursor:
+        """Return a new cursor using the connection."""
+        cursor = AsyncCursor(self)
+        self.cursors.add(cursor)
+
+        return cursor
+
+    @check_closed
+    async def execute(
+        self,
+        operation: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncCursor:
+        """
+        Execute a query on a cursor.
+        """
+        cursor = self.cursor()
+        return await cursor.execute(operation, parameters, timeout)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if not self.closed:
+            await self.close()
+
+
+async def connect(database_uri: str, **kwargs: Any) -> AsyncConnection:
+    """
+    Create an asyncio connection to the database.
+    """
+    return AsyncConnection(database_uri, **kwargs)
@@ -0,0 +1,340 @@
+"""
+An asyncio cursor.
+"""
+
+import asyncio
+from functools import partial
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import MissingGreenlet
+
+from allstars.sql.dbapi.decorators import check_closed, check_result
+from allstars.sql.dbapi.exceptions import NotSupportedError, OperationalError
+from allstars.sql.dbapi.typing import ColumnDescription, Description
+from allstars.sql.dbapi.utils import cancel_async_query, escape_parameter
+from allstars.sql.stats import QueryStats, has_hooks, notify
+
+if TYPE_CHECKING:
+    from allstars.sql.aio.connection import AsyncConnection
+
+# rows fetched at a time from async drivers
+FETCH_SIZE = 100
+
+
+def _ignore_result(task: "asyncio.Future[Any]") -> None:
+    # a cancelled query fails, there's no one left to tell
+    if not task.cancelled():
+        task.exception()
+
+
+class AsyncCursor:
+
+    """
+    Asyncio connection cursor.
+
+    Transpilation always runs in the connection's thread pool, off the event
+    loop. Queries then run on the backend's async driver when there is one;
+    otherwise a regular cursor is driven from the thread pool.
+
+    Either way queries get the same metadata tables, stats, hooks, timeouts
+    and cancellation as with the regular cursor.
+    """
+
+    def __init__(self, connection: "AsyncConnection"):
+        self.connection = connection
+
+        self.arraysize = 1
+        self.closed = False
+        self.description: Description = None
+
+        # sync cursor, for backends without an async driver
+        self._cursor = None
+        # async driver connection, its streaming result, and the rows read from it
+        self._async_connection = None
+        self._stream: Optional[Any] = None
+        self._results: Optional[Any] = None
+
+        # default timeout for queries, in seconds
+        self.timeout = connection.timeout
+        self._deadline: Optional[float] = None
+        self._timed_out = ""
+        self._interrupt: Optional["asyncio.Future[None]"] = None
+        self._cancelled: Optional[str] = None
+
+        # per-phase timings of the last query, see ``allstars.sql.stats``
+        self.stats: Optional[QueryStats] = None
+
+    async def _run(self, function, *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.connection.executor,
+            partial(function, *args, **kwargs),
+        )
+
+    async def _wait(self, awaitable: Any) -> Any:
+        """
+        Wait on the async driver, until the query times out or is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = None
+        if self._deadline is not None:
+            timeout = max(0.0, self._deadline - loop.time())
+        task = asyncio.ensure_future(awaitable)
+        self._interrupt = loop.create_future()
+        try:
+            await asyncio.wait(
+                {task, self._interrupt},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            self._interrupt = None
+        if task.done():
+            return task.result()
+
+        self._cancelled = self._cancelled or self._timed_out
+        # the query is stopped by the driver when it can, the task otherwise
+        raw_connection = await self._async_connection.get_raw_connection()
+        if not await cancel_async_query(raw_connection.driver_connection):
+            task.cancel()
+        task.add_done_callback(_ignore_result)
+        raise OperationalError(self._cancelled)
+
+    async def _close_results(self) -> None:
+        self._deadline = None
+        if self._results is not None and self._cursor is None:
+            await self._results.aclose()
+        if self._stream is not None:
+            await self._stream.close()
+            self._stream = None
+
+    @check_closed
+    async def close(self) -> None:
+        """
+        Close the cursor.
+        """
+        self.closed = True
+        if self._cursor is not None:
+            await self._run(self._cursor.close)
+            return
+        await self._close_results()
+        if self._async_connection is not None:
+            await self._async_connection.close()
+
+    def cancel(self) -> None:
+        """
+        Cancel the running query.
+
+        Call it from the event loop; the task running or fetching the query
+        gets an ``OperationalError``.
+        """
+        if self._cursor is not None:
+            self._cursor.cancel()
+            return
+        if self._cancelled or (self._stream is None and self._interrupt is None):
+            return
+        self._cancelled = "Query was cancelled"
+        if self._interrupt is not None:
+            self._interrupt.set_result(None)
+
+    async def _batches(self) -> AsyncIterator[List[Any]]:
+        while True:
+            if self._cancelled:
+                raise OperationalError(self._cancelled)
+            rows = await self._wait(self._stream.fetchmany(FETCH_SIZE))
+            if not rows:
+                return
+            yield rows
+
+    async def _fetch(self, batches: AsyncIterator[List[Any]]) -> AsyncIterator[Any]:
+        stats = self.stats
+        try:
+            async for rows in batches:
+                for row in rows:
+                    row = tuple(row)
+                    if stats:
+                        stats.add_row(row)
+                    yield row
+        finally:
+            self._deadline = None
+            if stats:
+                stats.lap("fetch")
+                notify(stats)
+
+    @check_closed
+    async def execute(
+        self,
+        operation: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> "AsyncCursor":
+        """
+        Execute a query.
+
+        The query is cancelled if it hasn't finished running and being
+        fetched after ``timeout`` seconds, defaulting to the cursor's timeout.
+        """
+        self.description = None
+        timeout = timeout if timeout is not None else self.timeout
+
+        if self.connection.async_engine is None:
+            if self._cursor is None:
+                self._cursor = await self._run(self.connection.sync_connection.cursor)
+            await self._run(self._cursor.execute, operation, parameters, timeout)
+            self.description = self._cursor.description
+            self._results = self._cursor
+            self.stats = self._cursor.stats
+            return self
+
+        from allstars.sql.metadata import query_metadata
+        from allstars.sql.transpile import compile_query
+
+        await self._close_results()
+        self._results = None
+        self._cancelled = None
+        stats = self.stats = (
+            QueryStats(operation, parameters)
+            if self.connection.collect_stats or has_hooks()
+            else None
+        )
+
+        if parameters:
+            escaped_parameters = {
+                key: escape_parameter(value) for key, value in parameters.items()
+            }
+            operation %= escaped_parameters
+
+        # metadata tables are answered from the semantic layer, in memory
+        metadata = query_metadata(operation, self.connection.semantic_layer)
+        if metadata is not None:
+            self.description, rows = metadata
+
+            async def batches():
+                yield rows
+
+            if stats:
+                stats.lap("execute")
+            self._results = self._fetch(batches())
+            return self
+
+        if self._async_connection is None:
+            self._async_connection = await self.connection.async_engine.connect()
+
+        compile_ = partial(
+            compile_query,
+            query=operation,
+            semantic_layer=self.connection.semantic_layer,
+            approximate_mode=self.connection.approximate,
+            sample_percent=self.connection.sample_percent,
+            stats=stats,
+        )
+        try:
+            compiled = await self._run(
+                compile_, self.connection.async_engine.sync_engine
+            )
+        except MissingGreenlet:
+            # joins the semantic layer can't plan need to inspect the database,
+            # which async drivers only allow from the event loop
+            compiled = await self._async_connection.run_sync(compile_)
+
+        if timeout:
+            self._deadline = asyncio.get_running_loop().time() + timeout
+            self._timed_out = f"Query timed out after {timeout} seconds"
+        try:
+            self._stream = await self._wait(
+                self._async_connection.stream(text(compiled.sql))
+            )
+        except Exception:
+            self._deadline = None
+            raise
+        if stats:
+            stats.lap("execute")
+
+        self._results = self._fetch(self._batches())
+        self.description = [
+            ColumnDescription(
+                (name, None, None, None, None, None, None),
+                compiled.error_bounds.get(name),
+            )
+            for name in self._stream.keys()
+        ]
+
+        return self
+
+    @check_closed
+    async def executemany(
+        self,
+        operation: str,
+        seq_of_parameters: Optional[List[Dict[str, Any]]] = None,
+    ) -> "AsyncCursor":
+        """
+        Execute multiple statements.
+
+        Currently not supported.
+        """
+        raise NotSupportedError(
+            "``executemany`` is not supported, use ``execute`` instead",
+        )
+
+    @check_result
+    @check_closed
+    async def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        """
+        Fetch the next row of a query result set, returning a single sequence,
+        or ``None`` when no more data is available.
+        """
+        if self._cursor is not None:
+            return await self._run(self._cursor.fetchone)
+        try:
+            return await self._results.__anext__()
+        except StopAsyncIteration:
+            return None
+
+    @check_result
+    @check_closed
+    async def fetchmany(self, size=None) -> List[Tuple[Any, ...]]:
+        """
+        Fetch the next set of rows of a query result, returning a sequence of
+        sequences (e.g. a list of tuples). An empty sequence is returned when
+        no more rows are available.
+        """
+        size = size or self.arraysize
+        if self._cursor is not None:
+            return await self._run(self._cursor.fetchmany, size)
+        rows = []
+        async for row in self._results:
+            rows.append(row)
+            if len(rows) == size:
+                break
+        return rows
+
+    @check_result
+    @check_closed
+    async def fetchall(self) -> List[Tuple[Any, ...]]:
+        """
+        Fetch all (remaining) rows of a query result.
+        """
+        if self._cursor is not None:
+            return await self._run(self._cursor.fetchall)
+        return [row async for row in self._results]
+
+    @check_result
+    @check_closed
+    async def __aiter__(self) -> AsyncIterator[Tuple[Any, ...]]:
+        # rows are fetched in batches, to avoid a round trip through the
+        # thread pool for each row
+        batch_size = max(self.arraysize, 100)
+        while True:
+            rows = await self.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield row
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        if not self.closed:
+            await self.close()
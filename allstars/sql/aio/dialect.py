@@ -0,0 +1,149 @@
+"""
+Asyncio SQLAlchemy dialect.
+
+Adapts the asyncio driver to the synchronous DB API SQLAlchemy expects, the
+same way SQLAlchemy adapts drivers like ``asyncpg`` or ``aiosqlite``. Use it
+with ``create_async_engine("allstars+async://", database_uri=...)``.
+"""
+
+from collections import deque
+from types import ModuleType
+from typing import Any, Deque, Dict, Optional, Sequence
+
+from sqlalchemy import pool
+from sqlalchemy.engine import AdaptedConnection
+from sqlalchemy.engine.url import URL
+from sqlalchemy.util.concurrency import await_only
+
+from allstars.sql import aio, dbapi
+from allstars.sql.aio.connection import AsyncConnection
+from allstars.sql.dialect import allstarsDialect
+
+
+class AsyncAdapt_allstars_cursor:  # pylint: disable=invalid-name
+    """
+    Sync facade over an ``AsyncCursor``, buffering the results.
+    """
+
+    def __init__(self, adapt_connection: "AsyncAdapt_allstars_connection"):
+        self._connection = adapt_connection._connection
+        self.arraysize = 1
+        self.rowcount = -1
+        self.description = None
+        self._rows: Deque[Any] = deque()
+
+    def close(self) -> None:
+        self._rows.clear()
+
+    async def _async_soft_close(self) -> None:
+        return
+
+    def execute(
+        self,
+        operation: str,
+        parameters: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        cursor = self._connection.cursor()
+        await_only(cursor.execute(operation, parameters))
+        self.description = cursor.description
+        self._rows = deque(await_only(cursor.fetchall()))
+        await_only(cursor.close())
+
+    def executemany(self, operation: str, seq_of_parameters: Any) -> None:
+        raise dbapi.NotSupportedError(
+            "``executemany`` is not supported, use ``execute`` instead",
+        )
+
+    def setinputsizes(self, *inputsizes: Any) -> None:
+        pass
+
+    def __iter__(self):
+        while self._rows:
+            yield self._rows.popleft()
+
+    def fetchone(self) -> Optional[Any]:
+        return self._rows.popleft() if self._rows else None
+
+    def fetchmany(self, size: Optional[int] = None) -> Sequence[Any]:
+        size = size or self.arraysize
+        return [self._rows.popleft() for _ in range(min(size, len(self._rows)))]
+
+    def fetchall(self) -> Sequence[Any]:
+        rows = list(self._rows)
+        self._rows.clear()
+        return rows
+
+
+class AsyncAdapt_allstars_connection(AdaptedConnection):  # pylint: disable=invalid-name
+    """
+    Sync facade over an ``AsyncConnection``.
+    """
+
+    def __init__(self, connection: AsyncConnection):
+        self._connection = connection
+
+    def cursor(self) -> AsyncAdapt_allstars_cursor:
+        return AsyncAdapt_allstars_cursor(self)
+
+    def commit(self) -> None:
+        await_only(self._connection.commit())
+
+    def rollback(self) -> None:
+        await_only(self._connection.rollback())
+
+    def close(self) -> None:
+        if not self._connection.closed:
+            await_only(self._connection.close())
+
+
+class AsyncAdapt_allstars_dbapi:  # pylint: disable=invalid-name
+    """
+    Module-like object exposing the asyncio driver as a DB API 2.0 module.
+    """
+
+    def __init__(self, dbapi_module: ModuleType):
+        for name in [
+            "apilevel",
+            "threadsafety",
+            "paramstyle",
+            "Warning",
+            "Error",
+            "InterfaceError",
+            "DatabaseError",
+            "DataError",
+            "OperationalError",
+            "IntegrityError",
+            "InternalError",
+            "ProgrammingError",
+            "NotSupportedError",
+        ]:
+            setattr(self, name, getattr(dbapi_module, name))
+
+    def connect(self, *args: Any, **kwargs: Any) -> AsyncAdapt_allstars_connection:
+        return AsyncAdapt_allstars_connection(await_only(aio.connect(*args, **kwargs)))
+
+
+class allstarsAsyncDialect(allstarsDialect):
+    """
+    An asyncio SQLAlchemy dialect for SQL All ⭐ Stars.
+    """
+
+    driver = "async"
+    is_async = True
+    supports_statement_cache = True
+
+    @classmethod
+    def import_dbapi(cls) -> AsyncAdapt_allstars_dbapi:  # pylint: disable=method-hidden
+        """
+        Return the adapted DB API module.
+        """
+        return AsyncAdapt_allstars_dbapi(dbapi)
+
+    dbapi = import_dbapi
+
+    @classmethod
+    def get_pool_class(cls, url: URL) -> type:
+        return pool.AsyncAdaptedQueuePool
+
+    def get_driver_connection(self, connection: Any) -> AsyncConnection:
+        return connection._connection  # pylint: disable=protected-access
@@ -0,0 +1,189 @@
+"""
+Approximate query mode.
+
+Rewrites exact aggregations into cheaper approximate ones for interactive
+exploration: ``COUNT(DISTINCT ...)`` becomes the backend's HyperLogLog based
+function, and the fact relation can be sampled, with additive aggregates
+scaled back up to the full population.
+
+Sampled columns get a relative standard error when the row count of the
+fact relation is known, see ``sampling_error``.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from sqlglot import exp
+
+# Backend function used in place of ``COUNT(DISTINCT ...)``, along with its
+# documented relative standard error (``None`` when not documented).
+APPROX_DISTINCT_FUNCTIONS: Dict[str, Tuple[str, Optional[float]]] = {
+    "bigquery": ("APPROX_COUNT_DISTINCT", None),
+    "databricks": ("APPROX_COUNT_DISTINCT", 0.05),
+    "duckdb": ("APPROX_COUNT_DISTINCT", None),
+    "presto": ("APPROX_DISTINCT", 0.023),
+    "snowflake": ("APPROX_COUNT_DISTINCT", 0.01625),
+    "spark": ("APPROX_COUNT_DISTINCT", 0.05),
+    "trino": ("APPROX_DISTINCT", 0.023),
+}
+
+# Sampling method for backends supporting ``TABLESAMPLE``-like clauses, and
+# whether the sample size needs to be expressed as a percent
+TABLESAMPLE_METHODS: Dict[str, Tuple[Optional[str], bool]] = {
+    "bigquery": ("SYSTEM", True),
+    "databricks": (None, True),
+    "presto": ("BERNOULLI", False),
+    "snowflake": (None, False),
+    "spark": (None, True),
+    "trino": ("BERNOULLI", False),
+}
+
+# ``/*+ APPROXIMATE */`` or ``/*+ APPROXIMATE(10) */`` to sample 10% of the facts
+HINT_RE = re.compile(
+    r"/\*\+\s*APPROX(?:IMATE)?\s*(?:\(\s*(\d+(?:\.\d+)?)\s*\))?\s*\*/",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class ErrorBound:
+    """
+    Describes how an approximated column was computed.
+
+    ``relative_error`` is the relative standard error of the column, when it
+    can be known ahead of time. For sampled columns it's the error of an
+    aggregate over every row of the fact relation: aggregates over a fraction
+    ``f`` of its rows, through filters or groups, are ``1 / sqrt(f)`` times
+    less accurate.
+    """
+
+    method: str
+    relative_error: Optional[float] = None
+    sample_percent: Optional[float] = None
+
+
+def extract_hint(query: str) -> Tuple[str, bool, Optional[float]]:
+    """
+    Remove the approximate hint from a query.
+
+    Returns the query without the hint, whether it asked to be approximated,
+    and the sample percent.
+    """
+    match = HINT_RE.search(query)
+    if not match:
+        return query, False, None
+    sample_percent = float(match.group(1)) if match.group(1) else None
+    start, end = match.span()
+    query = query[:start] + query[end:]
+    return query, True, sample_percent
+
+
+def sampling_error(sample_percent: float, row_count: int) -> Optional[float]:
+    """
+    Relative standard error of a ``COUNT`` scaled up from a Bernoulli sample
+    of ``sample_percent`` of ``row_count`` rows: ``sqrt((1 - p) / (p * N))``.
+
+    The count of sampled rows is binomial, so this is exact for counts. For
+    sums it's a lower bound, reached when every value is the same; values
+    spread around their mean add to the error.
+    """
+    if row_count <= 0:
+        return None
+    fraction = sample_percent / 100
+    return math.sqrt((1 - fraction) / (fraction * row_count))
+
+
+def _combine(*errors: Optional[float]) -> Optional[float]:
+    """
+    Relative error of independent errors compounding, unknown if any is.
+    """
+    if any(error is None for error in errors):
+        return None
+    return math.sqrt(sum(error**2 for error in errors))
+
+
+def _output_name(node: exp.Expression) -> Optional[str]:
+    """
+    Return the name of the output column a node contributes to, if any.
+    """
+    while node.parent is not None and not isinstance(node.parent, exp.Select):
+        node = node.parent
+    if node.parent is None or node.arg_key != "expressions":
+        return None
+    return node.alias_or_name or node.sql()
+
+
+def approximate(
+    statement: exp.Expression,
+    dialect: str,
+    fact_table: Optional[exp.Table] = None,
+    sample_percent: Optional[float] = None,
+    row_count: Optional[int] = None,
+) -> Dict[str, ErrorBound]:
+    """
+    Rewrite a statement in place into its approximate form.
+
+    Returns the error bounds of the output columns that were approximated,
+    with the error of sampled columns computed from the row count of the fact
+    relation, when given. Rewrites the backend doesn't support are skipped,
+    leaving the exact computation in place.
+    """
+    error_bounds: Dict[str, ErrorBound] = {}
+
+    sampling = (
+        fact_table is not None
+        and sample_percent is not None
+        and 0 < sample_percent < 100
+        and dialect in TABLESAMPLE_METHODS
+    )
+
+    distinct_counts = {}
+    relative_error = None
+    if dialect in APPROX_DISTINCT_FUNCTIONS:
+        function, relative_error = APPROX_DISTINCT_FUNCTIONS[dialect]
+        for count in list(statement.find_all(exp.Count)):
+            if not isinstance(count.this, exp.Distinct):
+                continue
+            approx = exp.Anonymous(this=function, expressions=count.this.expressions)
+            count.replace(approx)
+            distinct_counts[id(approx)] = approx
+            name = _output_name(approx)
+            if name:
+                error_bounds[name] = ErrorBound("hll", relative_error)
+
+    if not sampling:
+        return error_bounds
+
+    method, as_percent = TABLESAMPLE_METHODS[dialect]
+    size = exp.Literal.number(sample_percent)
+    sample = exp.TableSample(
+        this=fact_table.copy(),
+        method=exp.Var(this=method) if method else None,
+        percent=size if as_percent else None,
+        size=None if as_percent else size,
+        kind="SAMPLE" if dialect == "snowflake" else "TABLESAMPLE",
+    )
+    fact_table.replace(sample)
+
+    # additive aggregates are scaled back to the whole population; distinct
+    # counts over a sample can't be scaled and are lower bounds
+    factor = exp.Literal.number(100 / sample_percent)
+    error = sampling_error(sample_percent, row_count) if row_count else None
+    aggregates = list(statement.find_all(exp.Sum, exp.Count))
+    for aggregate in aggregates + list(distinct_counts.values()):
+        name = _output_name(aggregate)
+        distinct = id(aggregate) in distinct_counts or isinstance(
+            aggregate.this, exp.Distinct
+        )
+        if not distinct:
+            aggregate.replace(exp.Mul(this=aggregate.copy(), expression=factor.copy()))
+        if name:
+            error_bounds[name] = ErrorBound(
+                "hll+sample" if distinct else "sample",
+                _combine(relative_error, error) if distinct else error,
+                sample_percent,
+            )
+
+    return error_bounds
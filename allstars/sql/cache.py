@@ -0,0 +1,97 @@
+"""
+Caches of transpiled queries and their results.
+
+Entries remember the semantic layer objects they were built from (metrics,
+dimensions, filters, relations and query contexts, by key), so that when
+some of them change only the entries depending on them are invalidated.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+DEFAULT_MAXSIZE = 1024
+
+
+class QueryCache:
+    """
+    A thread-safe LRU cache, with optional expiration of entries.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        # seconds after which entries expire, if any
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._dependencies: Dict[Hashable, Set[str]] = {}
+        self._dependents: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() - entry[1] > self.ttl:
+                    self._remove(key)
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        dependencies: Iterable[str] = (),
+    ) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.monotonic())
+            self._dependencies[key] = set(dependencies)
+            for dependency in self._dependencies[key]:
+                self._dependents.setdefault(dependency, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, dependencies: Iterable[str]) -> int:
+        """
+        Remove the entries depending on any of the given keys, returning how
+        many were removed.
+        """
+        with self._lock:
+            keys = set()
+            for dependency in dependencies:
+                keys |= self._dependents.get(dependency, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._dependencies.clear()
+            self._dependents.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        for dependency in self._dependencies.pop(key, ()):
+            dependents = self._dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(key)
+                if not dependents:
+                    del self._dependents[dependency]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
@@ -2,10 +2,27 @@
 An implementation of a DB API 2.0 connection.
 """
 
-from typing import Any, Dict, List, Optional
+import weakref
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
 
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from allstars import config
 from allstars.sql.dbapi.cursor import Cursor
 from allstars.sql.dbapi.decorators import check_closed
+from allstars.sql.dbapi.executor import (
+    DEFAULT_MAX_CONCURRENCY,
+    QueryExecutor,
+    get_executor,
+    release_executor,
+)
+from allstars.sql.querylog import enable as enable_query_log
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+    from allstars.sql.cache import QueryCache
 
 
 class Connection:
@@ -14,20 +31,62 @@ class Connection:
     Connection.
     """
 
-    def __init__(self, database_url: str, **kwargs: Any):
+    def __init__(
+        self,
+        database_url: str,
+        semantic_layer: Optional["SemanticLayer"] = None,
+        approximate: bool = False,
+        sample_percent: Optional[float] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: Optional[float] = None,
+        collect_stats: bool = False,
+        plan_cache: Optional["QueryCache"] = None,
+        engine: Optional[Engine] = None,
+        **kwargs: Any,
+    ):
         self.database_url = database_url
         self.kwargs = kwargs
+        self.semantic_layer = semantic_layer
+
+        # cursors share the connection's engine, and its pool; engines passed
+        # in are shared with other connections, and not disposed on close
+        self._owns_engine = engine is None
+        self.engine = engine or create_engine(database_url, connect_args=kwargs)
+        # for the backend, set by the first connection submitting queries to it
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[QueryExecutor] = None
+
+        # default timeout for queries, in seconds
+        self.timeout = timeout
+
+        # record per-phase timings in ``cursor.stats``
+        self.collect_stats = collect_stats
+        if config.ALLSTARS_QUERY_LOG:
+            enable_query_log(config.ALLSTARS_QUERY_LOG)
+
+        # cache of transpiled queries, see ``allstars.sql.cache``
+        self.plan_cache = plan_cache
+
+        # session setting for approximate mode
+        self.approximate = approximate
+        self.sample_percent = sample_percent
 
         self.closed = False
-        self.cursors: List[Cursor] = []
+        # cursors are tracked weakly, so that discarded ones can be collected
+        self.cursors: "weakref.WeakSet[Cursor]" = weakref.WeakSet()
 
     @check_closed
     def close(self) -> None:
         """Close the connection now."""
         self.closed = True
-        for cursor in self.cursors:
+        for cursor in list(self.cursors):
             if not cursor.closed:
                 cursor.close()
+        if self._executor is not None:
+            self._executor = None
+            release_executor(self.database_url)
+        if self._owns_engine:
+            self.engine.dispose()
 
     @check_closed
     def commit(self) -> None:
@@ -40,8 +99,18 @@ class Connection:
     @check_closed
     def cursor(self) -> Cursor:
         """Return a new Cursor Object using the connection."""
-        cursor = Cursor(self.database_url, **self.kwargs)
-        self.cursors.append(cursor)
+        cursor = Cursor(
+            self.database_url,
+            semantic_layer=self.semantic_layer,
+            approximate=self.approximate,
+            sample_percent=self.sample_percent,
+            engine=self.engine,
+            timeout=self.timeout,
+            collect_stats=self.collect_stats,
+            plan_cache=self.plan_cache,
+            **self.kwargs,
+        )
+        self.cursors.add(cursor)
 
         return cursor
 
@@ -50,12 +119,67 @@ class Connection:
         self,
         operation: str,
         parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
     ) -> Cursor:
         """
         Execute a query on a cursor.
         """
         cursor = self.cursor()
-        return cursor.execute(operation, parameters)
+        return cursor.execute(operation, parameters, timeout)
+
+    @check_closed
+    def submit(
+        self,
+        operation: str,
+        parameters: Optional[Dict[str, Any]] = None,
+        priority: int = 0,
+        timeout: Optional[float] = None,
+    ) -> "Future[Cursor]":
+        """
+        Execute a query in the background, returning a future for its cursor.
+
+        Queries submitted to the same backend run concurrently, up to
+        ``max_concurrency`` at a time, higher priority ones first. The
+        cursor's rows are fetched, and its database connection returned to
+        the pool, before the future resolves.
+        """
+        if self._executor is None:
+            self._executor = get_executor(self.database_url, self.max_concurrency)
+        return self._executor.submit(
+            self._execute_and_fetch,
+            operation,
+            parameters,
+            timeout,
+            priority=priority,
+        )
+
+    @check_closed
+    def submit_all(
+        self,
+        operations: Iterable[Union[str, Tuple[str, Optional[Dict[str, Any]]]]],
+        priority: int = 0,
+    ) -> "List[Future[Cursor]]":
+        """
+        Submit many independent queries, returning their futures in order.
+
+        Each operation is either a query, or a ``(query, parameters)`` tuple.
+        """
+        futures = []
+        for operation in operations:
+            if isinstance(operation, str):
+                operation = (operation, None)
+            futures.append(self.submit(*operation, priority=priority))
+        return futures
+
+    def _execute_and_fetch(
+        self,
+        operation: str,
+        parameters: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+    ) -> Cursor:
+        cursor = self.execute(operation, parameters, timeout)
+        cursor.buffer()
+        return cursor
 
     def __enter__(self):
         return self
@@ -3,14 +3,22 @@ An implementation of a DB API 2.0 cursor.
 """
 
 import itertools
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 
 from allstars.sql.dbapi.decorators import check_closed, check_result
-from allstars.sql.dbapi.exceptions import NotSupportedError
-from allstars.sql.dbapi.typing import Description
-from allstars.sql.dbapi.utils import escape_parameter
+from allstars.sql.dbapi.exceptions import NotSupportedError, OperationalError
+from allstars.sql.dbapi.typing import ColumnDescription, Description
+from allstars.sql.dbapi.utils import cancel_query, escape_parameter
+from allstars.sql.stats import QueryStats, has_hooks, notify
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+    from allstars.sql.cache import QueryCache
+    from allstars.sql.transpile import CompiledQuery
 
 
 class Cursor:
@@ -19,18 +27,54 @@ class Cursor:
     Connection cursor.
     """
 
-    def __init__(self, database_url: str, **kwargs: Any):
-        # store a cursor from the actual database
-        self.engine = create_engine(database_url, connect_args=kwargs)
-        self.dbapi_connection = self.engine.raw_connection()
+    def __init__(
+        self,
+        database_url: str,
+        semantic_layer: Optional["SemanticLayer"] = None,
+        approximate: bool = False,
+        sample_percent: Optional[float] = None,
+        engine: Optional[Engine] = None,
+        timeout: Optional[float] = None,
+        collect_stats: bool = False,
+        plan_cache: Optional["QueryCache"] = None,
+        **kwargs: Any,
+    ):
+        # metrics and dimensions are resolved through the semantic layer
+        self.semantic_layer = semantic_layer
+
+        # transpiled queries, shared by the connection's cursors if set
+        self.plan_cache = plan_cache
+
+        # approximate mode, see ``allstars.sql.approximate``
+        self.approximate = approximate
+        self.sample_percent = sample_percent
+
+        # store a cursor from the actual database, using the connection's pool;
+        # a connection is only checked out from the pool once a query runs
+        self._owns_engine = engine is None
+        self.engine = engine or create_engine(database_url, connect_args=kwargs)
+        self.dbapi_connection: Optional[Any] = None
 
         self.arraysize = 1
         self.closed = False
         self.description: Description = None
+        # the last query, as transpiled
+        self.compiled: Optional["CompiledQuery"] = None
 
         self._results: Optional[Iterator[Tuple[Any, ...]]] = None
         self._rowcount = -1
 
+        # default timeout for queries, in seconds
+        self.timeout = timeout
+        self._timer: Optional[threading.Timer] = None
+        self._cancel_lock = threading.Lock()
+        self._cancelled: Optional[str] = None
+        self._driver_cursor: Optional[Any] = None
+
+        # per-phase timings of the last query, see ``allstars.sql.stats``
+        self.collect_stats = collect_stats
+        self.stats: Optional[QueryStats] = None
+
     @property  # type: ignore
     @check_closed
     def rowcount(self) -> int:
@@ -50,22 +94,103 @@ class Cursor:
     def close(self) -> None:
         """
         Close the cursor.
+
+        The driver cursor is closed and the connection returned to the pool.
         """
+        self._release()
+        self._results = None
+        if self.dbapi_connection is not None:
+            self.dbapi_connection.close()
+            self.dbapi_connection = None
+        if self._owns_engine:
+            self.engine.dispose()
         self.closed = True
 
+    def cancel(self) -> None:
+        """
+        Cancel the running query.
+
+        Safe to call from any thread; the thread running or fetching the
+        query gets an ``OperationalError``.
+        """
+        self._cancel("Query was cancelled")
+
+    def _cancel(self, reason: str) -> None:
+        with self._cancel_lock:
+            if self._driver_cursor is None or self._cancelled:
+                return
+            self._cancelled = reason
+            cancel_query(self.dbapi_connection.driver_connection)
+
+    def _stop_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _release(self) -> None:
+        """
+        Release the driver cursor, once results are exhausted or cancelled.
+        """
+        self._stop_timer()
+        with self._cancel_lock:
+            if self._driver_cursor is not None:
+                try:
+                    self._driver_cursor.close()
+                except Exception:  # pylint: disable=broad-except
+                    pass
+                self._driver_cursor = None
+
+    def _fetch(self, cursor: Any) -> Iterator[Tuple[Any, ...]]:
+        stats = self.stats
+        try:
+            for row in cursor:
+                if self._cancelled:
+                    break
+                row = tuple(row)
+                if stats:
+                    stats.add_row(row)
+                yield row
+        except Exception as ex:  # pylint: disable=broad-except
+            if not self._cancelled:
+                raise
+            raise OperationalError(self._cancelled) from ex
+        finally:
+            self._release()
+            if stats:
+                stats.lap("fetch")
+                notify(stats)
+
+        if self._cancelled:
+            raise OperationalError(self._cancelled)
+
     @check_closed
     def execute(
         self,
         operation: str,
         parameters: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
     ) -> "Cursor":
         """
         Execute a query using a cursor from the actual database
+
+        The query is cancelled if it hasn't finished running and being
+        fetched after ``timeout`` seconds, defaulting to the cursor's timeout.
         """
-        from allstars.sql.transpile import transpile
+        from allstars.sql.metadata import query_metadata
+        from allstars.sql.transpile import compile_query
 
+        self._release()
         self.description = None
+        self.compiled = None
         self._rowcount = -1
+        self._cancelled = None
+        timeout = timeout if timeout is not None else self.timeout
+
+        stats = self.stats = (
+            QueryStats(operation, parameters)
+            if self.collect_stats or has_hooks()
+            else None
+        )
 
         # we need to do the escaping ourselves because differnet drivers use different
         # styles, but have to declare a single one
@@ -75,18 +200,75 @@ class Cursor:
             }
             operation %= escaped_parameters
 
+        # metadata tables are answered from the semantic layer, in memory
+        metadata = query_metadata(operation, self.semantic_layer)
+        if metadata is not None:
+            self.description, rows = metadata
+            if stats:
+                stats.lap("execute")
+            self._results = self._fetch(rows)
+            return self
+
         # transpile the query from a semantic layer query to an actual database query
-        operation = transpile(self.engine, operation)
+        compiled = self.compiled = compile_query(
+            self.engine,
+            operation,
+            semantic_layer=self.semantic_layer,
+            approximate_mode=self.approximate,
+            sample_percent=self.sample_percent,
+            stats=stats,
+            cache=self.plan_cache,
+        )
 
         # execute query
+        if self.dbapi_connection is None:
+            self.dbapi_connection = self.engine.raw_connection()
         cursor = self.dbapi_connection.cursor()
-        cursor.execute(operation)
-
-        self._results = (tuple(row) for row in cursor)
+        self._driver_cursor = cursor
+        if timeout:
+            self._timer = threading.Timer(
+                timeout,
+                self._cancel,
+                [f"Query timed out after {timeout} seconds"],
+            )
+            self._timer.daemon = True
+            self._timer.start()
+        try:
+            cursor.execute(compiled.sql)
+        except Exception as ex:
+            self._release()
+            if self._cancelled:
+                raise OperationalError(self._cancelled) from ex
+            raise
+        if self._cancelled:
+            self._release()
+            raise OperationalError(self._cancelled)
+        if stats:
+            stats.lap("execute")
+
+        self._results = self._fetch(cursor)
         self.description = cursor.description
+        if self.description and compiled.error_bounds:
+            self.description = [
+                ColumnDescription(column, compiled.error_bounds.get(column[0]))
+                for column in self.description
+            ]
 
         return self
 
+    @check_result
+    @check_closed
+    def buffer(self) -> None:
+        """
+        Fetch all remaining rows from the actual database, keeping them in memory.
+
+        The database connection is returned to the pool once they're fetched.
+        """
+        self._results = iter(list(self._results))  # type: ignore
+        if self.dbapi_connection is not None:
+            self.dbapi_connection.close()
+            self.dbapi_connection = None
+
     @check_closed
     def executemany(
         self,
@@ -0,0 +1,147 @@
+"""
+Concurrent execution of independent queries.
+
+Connections to the same backend share one executor, and with it the limit on
+how many of their queries run at the same time. The executor is shut down
+when the last connection using it closes, or at exit.
+"""
+
+import atexit
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+# how many queries can run at the same time against a given backend
+DEFAULT_MAX_CONCURRENCY = 8
+
+# executors by backend, with the number of connections using them
+_executors: Dict[str, Tuple["QueryExecutor", int]] = {}
+_executors_lock = threading.Lock()
+
+
+class QueryExecutor:
+
+    """
+    Runs submitted queries on a fixed number of worker threads.
+
+    Queries waiting for a worker are picked by priority (highest first), then
+    in submission order.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_workers = max_workers
+
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def submit(
+        self,
+        function: Callable[..., Any],
+        *args: Any,
+        priority: int = 0,
+        **kwargs: Any,
+    ) -> Future:
+        """
+        Schedule a function, returning a future for its result.
+        """
+        future: Future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("Cannot submit queries after shutdown")
+            self._queue.put(
+                (-priority, next(self._counter), future, function, args, kwargs)
+            )
+            self._start_worker()
+        return future
+
+    def _start_worker(self) -> None:
+        if len(self._workers) >= self.max_workers:
+            return
+        worker = threading.Thread(
+            target=self._work,
+            name=f"allstars-query-{len(self._workers)}",
+            daemon=True,
+        )
+        self._workers.append(worker)
+        worker.start()
+
+    def shutdown(self) -> None:
+        """
+        Cancel the queries still waiting, and stop the workers once they're
+        done with the queries they're running.
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._stopped = True
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[2] is not None:
+                item[2].cancel()
+        # a worker stops when it gets an item without a future
+        for _ in workers:
+            self._queue.put((0, next(self._counter), None, None, (), {}))
+
+    def _work(self) -> None:
+        while True:
+            _, _, future, function, args, kwargs = self._queue.get()
+            if future is None:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = function(*args, **kwargs)
+            except BaseException as ex:  # pylint: disable=broad-except
+                future.set_exception(ex)
+            else:
+                future.set_result(result)
+
+
+def get_executor(
+    database_url: str,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+) -> QueryExecutor:
+    """
+    Return the executor shared by all connections to a given backend,
+    creating it with ``max_concurrency`` workers if there's none yet.
+
+    The executor is used until ``release_executor`` is called for it.
+    """
+    with _executors_lock:
+        executor, users = _executors.get(database_url, (None, 0))
+        if executor is None:
+            executor = QueryExecutor(max_concurrency)
+        _executors[database_url] = (executor, users + 1)
+        return executor
+
+
+def release_executor(database_url: str) -> None:
+    """
+    Stop using the executor of a backend, shutting it down if it was the
+    last user.
+    """
+    with _executors_lock:
+        if database_url not in _executors:
+            return
+        executor, users = _executors[database_url]
+        if users > 1:
+            _executors[database_url] = (executor, users - 1)
+            return
+        del _executors[database_url]
+    executor.shutdown()
+
+
+@atexit.register
+def shutdown_executors() -> None:
+    with _executors_lock:
+        executors = [executor for executor, _ in _executors.values()]
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown()
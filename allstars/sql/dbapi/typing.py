@@ -3,7 +3,7 @@ Type annotations for the DB API 2.0 implementation.
 """
 
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import Any, List, Optional, Tuple
 
 
 class ColumnType(str, Enum):
@@ -56,3 +56,19 @@ Description = Optional[
         ]
     ]
 ]
+
+
+class ColumnDescription(tuple):
+    """
+    A column in the cursor description.
+
+    Behaves as the standard 7-item sequence, with an additional ``error_bound``
+    attribute describing how the column was approximated, if it was.
+    """
+
+    error_bound: Optional[Any] = None
+
+    def __new__(cls, column: Tuple[Any, ...], error_bound: Optional[Any] = None):
+        instance = super().__new__(cls, column)
+        instance.error_bound = error_bound
+        return instance
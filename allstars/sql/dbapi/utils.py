@@ -2,6 +2,7 @@
 Helper functions et al.
 """
 
+import inspect
 from typing import Any
 
 
@@ -22,3 +23,34 @@ def escape_parameter(value: Any) -> str:
     if isinstance(value, (int, float)):
         return str(value)
     return f"'{value}'"
+
+
+def cancel_query(driver_connection: Any) -> bool:
+    """
+    Cancel the query running on a driver connection, from any thread.
+
+    Uses whatever mechanism the driver offers (``cancel()`` for psycopg2 and
+    most servers, ``interrupt()`` for sqlite3). Returns if the driver could be
+    asked to cancel.
+    """
+    for method in ("cancel", "interrupt"):
+        if callable(getattr(driver_connection, method, None)):
+            getattr(driver_connection, method)()
+            return True
+    return False
+
+
+async def cancel_async_query(driver_connection: Any) -> bool:
+    """
+    Cancel the query running on an async driver connection.
+
+    Same as ``cancel_query``, for drivers whose methods may be coroutines
+    (``interrupt()`` for aiosqlite).
+    """
+    for method in ("cancel", "interrupt"):
+        if callable(getattr(driver_connection, method, None)):
+            result = getattr(driver_connection, method)()
+            if inspect.isawaitable(result):
+                await result
+            return True
+    return False
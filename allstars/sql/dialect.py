@@ -3,7 +3,7 @@ SQLAlchemy dialect.
 """
 
 from types import ModuleType
-from typing import Any, Dict, List, Optional, Tuple, TypedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, TypedDict
 
 import sqlalchemy.types
 from sqlalchemy import inspect
@@ -17,6 +17,10 @@ from sqlalchemy.sql.type_api import TypeEngine
 from allstars.sql import dbapi
 from allstars.sql.dbapi.connection import Connection
 from allstars.sql.dbapi.typing import ColumnType
+from allstars.sql.metadata import METADATA_SCHEMA, METADATA_TABLES
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
 
 
 class SQLAlchemyColumn(TypedDict):
@@ -54,7 +58,18 @@ def get_sqla_type(type_: ColumnType) -> TypeEngine:
     return type_map[type_]()
 
 
-class SQL All ⭐ StarsDialect(DefaultDialect):
+def _get_sqla_type_from_string(data_type: Optional[str]) -> TypeEngine:
+    """
+    Convert from a type name, as stored in relations, to SQLA type.
+    """
+    name = (data_type or "").split("(")[0].strip().upper()
+    type_ = getattr(sqlalchemy.types, name, None)
+    if isinstance(type_, type) and issubclass(type_, TypeEngine):
+        return type_()
+    return sqlalchemy.types.NullType()
+
+
+class allstarsDialect(DefaultDialect):
     """
     A SQLAlchemy dialect for SQL All ⭐ Stars.
     """
@@ -84,9 +99,23 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
 
     supports_is_distinct_from = False
 
-    def __init__(self, database_uri: str, **kwargs: Any) -> None:
+    def __init__(
+        self,
+        database_uri: str,
+        semantic_layer: Optional["SemanticLayer"] = None,
+        **kwargs: Any,
+    ) -> None:
         super().__init__(**kwargs)
         self.database_uri = database_uri
+        self.semantic_layer = semantic_layer
+
+    def _get_virtual_tables(self) -> List[str]:
+        """
+        Return the superstar table, followed by one table per query context.
+        """
+        if not self.semantic_layer:
+            return ["super"]
+        return ["super"] + list(self.semantic_layer.query_contexts.keys())
 
     @classmethod
     def import_dbapi(cls) -> ModuleType:  # pylint: disable=method-hidden
@@ -101,7 +130,7 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
         self,
         url: URL,
     ) -> Tuple[Tuple[str], Dict[str, Any]]:
-        return (self.database_uri,), {}
+        return (self.database_uri,), {"semantic_layer": self.semantic_layer}
 
     def do_ping(self, dbapi_connection: Connection) -> bool:
         """
@@ -125,7 +154,9 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
         """
         Return if a given table exists.
         """
-        return table_name == "super"
+        if schema == METADATA_SCHEMA:
+            return table_name in METADATA_TABLES
+        return table_name in self._get_virtual_tables()
 
     def get_table_names(
         self,
@@ -135,8 +166,12 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
     ) -> List[str]:
         """
         Return a list of table names.
+
+        The metadata tables are listed under the ``⭐`` schema.
         """
-        return ["super"]
+        if schema == METADATA_SCHEMA:
+            return list(METADATA_TABLES)
+        return self._get_virtual_tables()
 
     def get_view_names(
         self,
@@ -158,7 +193,18 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
     ) -> List[SQLAlchemyColumn]:
         """
         Return all columns from all tables.
+
+        The columns of a query context are read from the semantic layer: the
+        columns of its relations, followed by its metrics and dimensions.
         """
+        if schema == METADATA_SCHEMA:
+            return [
+                self._get_column(name, get_sqla_type(type_))
+                for name, type_ in METADATA_TABLES[table_name].columns
+            ]
+        if self.semantic_layer and table_name in self.semantic_layer.query_contexts:
+            return self._get_query_context_columns(table_name)
+
         engine = create_engine(
             self.database_uri,
             connect_args=connection.engine.raw_connection().kwargs,
@@ -171,6 +217,42 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
                 out.append(column)
         return out
 
+    def _get_query_context_columns(
+        self,
+        query_context_key: str,
+    ) -> List[SQLAlchemyColumn]:
+        """
+        Return the columns exposed by a query context.
+        """
+        sl = self.semantic_layer
+        query_context = sl.query_contexts[query_context_key]
+        relation_keys = set(query_context.relation_keys)
+
+        names = []
+        for relation_key in query_context.relation_keys:
+            relation = sl.relations[relation_key]
+            for column in relation.columns:
+                names.append((f"{relation.reference}.{column.name}", column.data_type))
+        for o in list(sl.metrics) + list(sl.dimensions):
+            if set(o.relation_keys) <= relation_keys:
+                names.append((o.key, None))
+
+        return [
+            self._get_column(name, _get_sqla_type_from_string(data_type))
+            for name, data_type in names
+        ]
+
+    @staticmethod
+    def _get_column(name: str, type_: TypeEngine) -> SQLAlchemyColumn:
+        return {
+            "name": name,
+            "type": type_,
+            "nullable": True,
+            "default": None,
+            "autoincrement": "auto",
+            "primary_key": 0,
+        }
+
     def do_rollback(self, dbapi_connection: Connection) -> None:
         """
         SQL All ⭐ Stars doesn't support rollbacks.
@@ -180,7 +262,7 @@ class SQL All ⭐ StarsDialect(DefaultDialect):
         """
         Return the list of schemas.
         """
-        return ["main"]
+        return ["main", METADATA_SCHEMA]
 
     def get_pk_constraint(
         self,
@@ -0,0 +1,267 @@
+"""
+Drill-down and roll-up along hierarchies.
+
+A ``DrillDown`` explores some metrics along the levels of a hierarchy, e.g.
+country, region and city, with level ``n`` grouping by the first ``n + 1``
+dimensions:
+
+    with DrillDown(connection, "geo", metrics=["revenue"]) as drilldown:
+        drilldown.query(1)             # revenue by country and region
+        drilldown.query(2, ["US"])     # by city, within the US
+        drilldown.query(0)             # by country
+
+Each level is queried whole, and kept. Querying a level prefetches the next
+one in the background, at a lower priority than interactive queries, so that
+drilling down is usually answered from memory; drilling into a member
+filters the level locally. Coarser levels are computed by re-aggregating a
+finer level already fetched, instead of querying the warehouse again, when
+every metric is a plain ``SUM``, ``COUNT``, ``MIN`` or ``MAX``.
+"""
+
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from sqlglot import exp
+
+from allstars.core.hierarchy import Hierarchy
+
+if TYPE_CHECKING:
+    from allstars.sql.dbapi.connection import Connection
+    from allstars.sql.dbapi.cursor import Cursor
+
+# priority of the background queries, below interactive ones
+PREFETCH_PRIORITY = -1
+
+# how each aggregate is computed again from finer grained values of itself
+REAGGREGATES: Dict[type, Callable[[List[Any]], Any]] = {
+    exp.Sum: sum,
+    exp.Count: sum,
+    exp.Min: min,
+    exp.Max: max,
+}
+
+Row = Tuple[Any, ...]
+
+
+@dataclass
+class DrillResult:
+    columns: List[str]
+    rows: List[Row]
+    # where the rows came from: "query", "prefetch", "cache" or "rollup"
+    source: str
+
+
+class DrillDown:
+    """
+    Queries some metrics at the levels of a hierarchy, keeping the results.
+    """
+
+    def __init__(
+        self,
+        connection: "Connection",
+        hierarchy: Union[str, Hierarchy],
+        metrics: Sequence[str],
+        filters: Iterable[str] = (),
+        table: str = "super",
+        prefetch: bool = True,
+        timeout: Optional[float] = None,
+    ):
+        semantic_layer = connection.semantic_layer
+        if isinstance(hierarchy, str):
+            hierarchy = semantic_layer.hierarchies[hierarchy]
+        if not hierarchy.dimensions:
+            raise ValueError(f"Hierarchy {hierarchy.key} has no levels")
+
+        self.connection = connection
+        self.hierarchy = hierarchy
+        self.metrics = list(metrics)
+        # named filters applied to every level
+        self.filters = list(filters)
+        self.table = table
+        self.prefetch = prefetch
+        self.timeout = timeout
+
+        index = semantic_layer.get_expression_index()
+        self._reaggregates = [reaggregate(index.expressions.get(k)) for k in metrics]
+        # results by level, as rows or as background queries in flight
+        self._rows: Dict[int, List[Row]] = {}
+        self._futures: Dict[int, "Future[Cursor]"] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def levels(self) -> List[str]:
+        return self.hierarchy.dimensions
+
+    @property
+    def can_roll_up(self) -> bool:
+        """
+        Whether coarser levels can be computed from finer ones.
+        """
+        return all(f is not None for f in self._reaggregates)
+
+    def columns(self, level: int) -> List[str]:
+        return self.levels[: level + 1] + self.metrics
+
+    def sql(self, level: int) -> str:
+        dimensions = self.levels[: level + 1]
+        columns = ", ".join(f'"{key}"' for key in dimensions + self.metrics)
+        positions = ", ".join(str(i) for i in range(1, len(dimensions) + 1))
+        sql = f"SELECT {columns} FROM {self.table}"
+        if self.filters:
+            sql += " WHERE " + " AND ".join(f'"{key}"' for key in self.filters)
+        return f"{sql} GROUP BY {positions} ORDER BY {positions}"
+
+    def query(self, level: int, path: Sequence[Any] = ()) -> DrillResult:
+        """
+        The metrics at a level, optionally within the members of the coarser
+        levels given by ``path``, e.g. ``["US", "CA"]`` for cities in
+        California.
+        """
+        if not 0 <= level < len(self.levels):
+            raise ValueError(
+                f"Level {level} is out of range for hierarchy {self.hierarchy.key}"
+            )
+        if len(path) > level:
+            raise ValueError("A path can only go down to the previous level")
+
+        rows, source = self._get_rows(level)
+        if path:
+            rows = [row for row in rows if tuple(row[: len(path)]) == tuple(path)]
+        if self.prefetch and level + 1 < len(self.levels):
+            self._prefetch(level + 1)
+        return DrillResult(self.columns(level), rows, source)
+
+    def _get_rows(self, level: int) -> Tuple[List[Row], str]:
+        with self._lock:
+            if level in self._rows:
+                return self._rows[level], "cache"
+            future = self._futures.get(level)
+        if future is not None:
+            try:
+                return self._store(level, self._fetch(future.result())), "prefetch"
+            except Exception:  # pylint: disable=broad-except
+                # queried again below, to raise the error where it belongs
+                with self._lock:
+                    self._futures.pop(level, None)
+
+        finer = self._finest_fetched(level)
+        if finer is not None:
+            return self._store(level, self.roll_up(finer, level)), "rollup"
+
+        cursor = self.connection.execute(self.sql(level), timeout=self.timeout)
+        return self._store(level, self._fetch(cursor)), "query"
+
+    def _finest_fetched(self, level: int) -> Optional[int]:
+        """
+        The closest finer level already in memory, if coarser levels can be
+        computed from it.
+        """
+        if not self.can_roll_up:
+            return None
+        with self._lock:
+            finer = [k for k in self._rows if k > level]
+        return min(finer) if finer else None
+
+    def _prefetch(self, level: int) -> None:
+        with self._lock:
+            if level in self._rows or level in self._futures:
+                return
+            self._futures[level] = self.connection.submit(
+                self.sql(level),
+                priority=PREFETCH_PRIORITY,
+                timeout=self.timeout,
+            )
+
+    @staticmethod
+    def _fetch(cursor: "Cursor") -> List[Row]:
+        try:
+            return [tuple(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _store(self, level: int, rows: List[Row]) -> List[Row]:
+        with self._lock:
+            self._futures.pop(level, None)
+            return self._rows.setdefault(level, rows)
+
+    def roll_up(self, level: int, to_level: int) -> List[Row]:
+        """
+        Compute a coarser level from the rows of a finer one, in memory.
+        """
+        width = level + 1
+        prefix = to_level + 1
+        groups: Dict[Row, List[List[Any]]] = {}
+        for row in self._rows[level]:
+            values = groups.setdefault(row[:prefix], [[] for _ in self.metrics])
+            for i, value in enumerate(row[width:]):
+                if value is not None:
+                    values[i].append(value)
+
+        return [
+            key
+            + tuple(
+                f(values) if values else None
+                for f, values in zip(self._reaggregates, metric_values)
+            )
+            for key, metric_values in groups.items()
+        ]
+
+    def clear(self) -> None:
+        """
+        Forget all results, e.g. after the data or the semantic layer changed.
+
+        Prefetches still waiting are cancelled, and the cursors of those
+        running or done are closed.
+        """
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+            self._rows.clear()
+        for future in futures:
+            if not future.cancel():
+                future.add_done_callback(_close_cursor)
+
+    def close(self) -> None:
+        self.clear()
+
+    def __enter__(self) -> "DrillDown":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _close_cursor(future: "Future[Cursor]") -> None:
+    if future.cancelled() or future.exception() is not None:
+        return
+    cursor = future.result()
+    if not cursor.closed:
+        cursor.close()
+
+
+def reaggregate(
+    tree: Optional[exp.Expression],
+) -> Optional[Callable[[List[Any]], Any]]:
+    """
+    How a metric is computed from finer grained values of itself, if it can
+    be: only metrics that are a single additive aggregate, not e.g. ratios
+    or distinct counts.
+    """
+    while isinstance(tree, exp.Paren):
+        tree = tree.this
+    if type(tree) not in REAGGREGATES or isinstance(tree.this, exp.Distinct):
+        return None
+    return REAGGREGATES[type(tree)]
@@ -0,0 +1,456 @@
+"""
+Metadata tables, answered from the semantic layer in memory.
+
+The ``⭐`` schema exposes the semantic layer's collections as tables, so that
+BI tools can browse the catalog with plain SQL:
+
+    SELECT ⭐ FROM ⭐.metrics WHERE folder_key = 'sales' ORDER BY key LIMIT 10
+
+Queries on these tables never reach the database. Projections (``*`` or
+``⭐`` for all columns), ``WHERE`` (comparisons, ``AND``/``OR``/``NOT``,
+``[NOT] LIKE``, ``IN``, ``IS [NOT] NULL``), ``COUNT``, ``ORDER BY``, ``LIMIT``
+and ``OFFSET`` are evaluated locally; joins and ``GROUP BY`` are not supported.
+"""
+
+import functools
+import operator
+import re
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from sqlglot import exp, parse_one
+
+from allstars.sql.dbapi.exceptions import ProgrammingError
+from allstars.sql.dbapi.typing import ColumnType, Description
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+
+METADATA_SCHEMA = "⭐"
+
+Row = Dict[str, Any]
+
+
+@dataclass
+class MetadataTable:
+    columns: List[Tuple[str, ColumnType]]
+    rows: Callable[["SemanticLayer"], Iterable[Tuple[Any, ...]]]
+
+
+_MENU_COLUMNS = [
+    ("key", ColumnType.STR),
+    ("label", ColumnType.STR),
+    ("description", ColumnType.STR),
+]
+
+_EXPRESSION_COLUMNS = _MENU_COLUMNS + [
+    ("expression", ColumnType.STR),
+    ("relation_keys", ColumnType.STR),
+    ("folder_key", ColumnType.STR),
+]
+
+
+def _expression_rows(collection: str):
+    def rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+        for o in getattr(semantic_layer, collection):
+            yield (
+                o.key,
+                o.label,
+                o.description,
+                o.expression,
+                ",".join(o.relation_keys),
+                o.folder_key,
+            )
+
+    return rows
+
+
+def _folder_rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+    for folder in semantic_layer.folders:
+        yield folder.key, folder.label, folder.description, folder.parent_folder_key
+
+
+def _hierarchy_rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+    for hierarchy in semantic_layer.hierarchies:
+        for level, dimension_key in enumerate(hierarchy.dimensions):
+            yield hierarchy.key, level, dimension_key
+
+
+def _table_rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+    for relation in semantic_layer.relations:
+        yield (
+            relation.key,
+            relation.database_schema,
+            relation.reference,
+            relation.relation_type,
+            len(relation.columns),
+            semantic_layer.get_row_count(relation.key),
+        )
+
+
+def _column_rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+    for relation in semantic_layer.relations:
+        for column in relation.columns:
+            yield relation.key, column.key, column.name, column.data_type
+
+
+def _join_rows(semantic_layer: "SemanticLayer") -> Iterator[Tuple[Any, ...]]:
+    for join in semantic_layer.joins:
+        yield (
+            join.key,
+            join.left_relation_key,
+            join.right_relation_key,
+            join.join_criteria,
+            join.cardinality,
+            join.join_term,
+        )
+
+
+def _query_context_rows(
+    semantic_layer: "SemanticLayer",
+) -> Iterator[Tuple[Any, ...]]:
+    for query_context in semantic_layer.query_contexts:
+        yield (
+            query_context.key,
+            query_context.label,
+            query_context.description,
+            ",".join(query_context.relation_keys),
+        )
+
+
+METADATA_TABLES: Dict[str, MetadataTable] = {
+    "metrics": MetadataTable(_EXPRESSION_COLUMNS, _expression_rows("metrics")),
+    "dimensions": MetadataTable(_EXPRESSION_COLUMNS, _expression_rows("dimensions")),
+    "filters": MetadataTable(_EXPRESSION_COLUMNS, _expression_rows("filters")),
+    "folders": MetadataTable(
+        _MENU_COLUMNS + [("parent_folder_key", ColumnType.STR)],
+        _folder_rows,
+    ),
+    "hierarchies": MetadataTable(
+        [
+            ("key", ColumnType.STR),
+            ("level", ColumnType.INT),
+            ("dimension_key", ColumnType.STR),
+        ],
+        _hierarchy_rows,
+    ),
+    "tables": MetadataTable(
+        [
+            ("key", ColumnType.STR),
+            ("database_schema", ColumnType.STR),
+            ("reference", ColumnType.STR),
+            ("relation_type", ColumnType.STR),
+            ("column_count", ColumnType.INT),
+            ("row_count", ColumnType.INT),
+        ],
+        _table_rows,
+    ),
+    "columns": MetadataTable(
+        [
+            ("relation_key", ColumnType.STR),
+            ("key", ColumnType.STR),
+            ("name", ColumnType.STR),
+            ("data_type", ColumnType.STR),
+        ],
+        _column_rows,
+    ),
+    "joins": MetadataTable(
+        [
+            ("key", ColumnType.STR),
+            ("left_relation_key", ColumnType.STR),
+            ("right_relation_key", ColumnType.STR),
+            ("join_criteria", ColumnType.STR),
+            ("cardinality", ColumnType.STR),
+            ("join_term", ColumnType.STR),
+        ],
+        _join_rows,
+    ),
+    "query_contexts": MetadataTable(
+        _MENU_COLUMNS + [("relation_keys", ColumnType.STR)],
+        _query_context_rows,
+    ),
+}
+
+# a cheap check, so that other queries aren't parsed twice
+_FROM_METADATA = re.compile(
+    rf'\bFROM\s+"?{METADATA_SCHEMA}"?\s*\.',
+    re.IGNORECASE,
+)
+
+_COMPARISONS = {
+    exp.EQ: operator.eq,
+    exp.NEQ: operator.ne,
+    exp.GT: operator.gt,
+    exp.GTE: operator.ge,
+    exp.LT: operator.lt,
+    exp.LTE: operator.le,
+}
+
+
+def get_metadata_table(statement: exp.Expression) -> Optional[str]:
+    """
+    Return the metadata table a statement reads from, if it does.
+    """
+    if not isinstance(statement, exp.Select) or not statement.args.get("from"):
+        return None
+    table = statement.args["from"].this
+    if not isinstance(table, exp.Table) or table.db != METADATA_SCHEMA:
+        return None
+    return table.name
+
+
+def query_metadata(
+    query: str,
+    semantic_layer: Optional["SemanticLayer"],
+) -> Optional[Tuple[Description, List[Tuple[Any, ...]]]]:
+    """
+    Answer a query on a metadata table, or return ``None`` for other queries.
+    """
+    if not _FROM_METADATA.search(query):
+        return None
+    statement = parse_one(query)
+    name = get_metadata_table(statement)
+    if name is None:
+        return None
+    if name not in METADATA_TABLES:
+        raise ProgrammingError(
+            f"Unknown metadata table {METADATA_SCHEMA}.{name}, available tables are "
+            f"{', '.join(sorted(METADATA_TABLES))}"
+        )
+    for arg in ("joins", "group", "having"):
+        if statement.args.get(arg):
+            raise ProgrammingError(
+                f"{arg.upper()} is not supported on metadata tables"
+            )
+
+    table = METADATA_TABLES[name]
+    names = [column for column, _ in table.columns]
+    rows: List[Row] = []
+    if semantic_layer is not None:
+        rows = [dict(zip(names, values)) for values in table.rows(semantic_layer)]
+
+    columns = _get_projection(statement, table)
+    # aliases of the output columns can only be sorted by
+    aliases = {
+        e.alias.lower() for e in statement.expressions if isinstance(e, exp.Alias)
+    }
+    for column in statement.find_all(exp.Column):
+        if column.is_star or column.name == METADATA_SCHEMA:
+            continue
+        column_name = column.name.lower()
+        if column_name in aliases and column.find_ancestor(exp.Order):
+            continue
+        if column_name not in names:
+            raise ProgrammingError(
+                f"Unknown column {column.name} in {METADATA_SCHEMA}.{name}"
+            )
+
+    where = statement.args.get("where")
+    if where:
+        rows = [row for row in rows if evaluate(where.this, row)]
+
+    if any(expression.find(exp.Count) for _, expression, _ in columns):
+        results = [
+            tuple(_aggregate(expression, rows) for _, expression, _ in columns)
+        ]
+    else:
+        _sort(statement, rows, columns)
+        results = [
+            tuple(evaluate(expression, row) for _, expression, _ in columns)
+            for row in rows
+        ]
+
+    offset = _get_int(statement, "offset")
+    limit = _get_int(statement, "limit")
+    end = None if limit is None else offset + limit
+    results = results[offset:end]
+
+    description: Description = [
+        (name, type_, None, None, None, None, True) for name, _, type_ in columns
+    ]
+    return description, results
+
+
+def _get_projection(
+    statement: exp.Select,
+    table: MetadataTable,
+) -> List[Tuple[str, exp.Expression, ColumnType]]:
+    """
+    The output columns of a statement, as name, expression and type.
+    """
+    types = dict(table.columns)
+    columns = []
+    for expression in statement.expressions:
+        if isinstance(expression, exp.Star) or (
+            isinstance(expression, exp.Column)
+            and (
+                isinstance(expression.this, exp.Star)
+                or expression.name == METADATA_SCHEMA
+            )
+        ):
+            columns.extend(
+                (name, exp.column(name), type_) for name, type_ in table.columns
+            )
+            continue
+
+        this = expression.unalias()
+        name = expression.alias_or_name
+        if isinstance(this, exp.Column):
+            type_ = types.get(this.name.lower(), ColumnType.STR)
+        elif this.find(exp.Count):
+            type_ = ColumnType.INT
+            # like PostgreSQL, rather than ``*``
+            name = expression.alias or "count"
+        else:
+            type_ = ColumnType.STR
+        columns.append((name, this, type_))
+    return columns
+
+
+def _sort(
+    statement: exp.Select,
+    rows: List[Row],
+    columns: List[Tuple[str, exp.Expression, ColumnType]],
+) -> None:
+    order = statement.args.get("order")
+    if not order:
+        return
+
+    aliases = {name: expression for name, expression, _ in columns}
+    # stable sorts, from the last key to the first
+    for ordered in reversed(order.expressions):
+        expression = ordered.this
+        if isinstance(expression, exp.Literal) and not expression.is_string:
+            # ORDER BY 2
+            position = evaluate(expression, {})
+            if not isinstance(position, int) or not 1 <= position <= len(columns):
+                raise ProgrammingError(
+                    f"ORDER BY position {expression.name} is not in the select list"
+                )
+            expression = columns[position - 1][1]
+        elif isinstance(expression, exp.Column) and expression.name in aliases:
+            expression = aliases[expression.name]
+
+        def key(row: Row, expression=expression) -> Tuple[bool, Any]:
+            value = evaluate(expression, row)
+            return value is not None, value
+
+        rows.sort(key=key, reverse=bool(ordered.args.get("desc")))
+
+
+def _get_int(statement: exp.Select, arg: str) -> Optional[int]:
+    clause = statement.args.get(arg)
+    if not clause:
+        return 0 if arg == "offset" else None
+    value = evaluate(clause.expression, {})
+    if not isinstance(value, int) or value < 0:
+        raise ProgrammingError(f"Invalid {arg.upper()}: {clause.expression.sql()}")
+    return value
+
+
+def _aggregate(expression: exp.Expression, rows: List[Row]) -> Any:
+    if not isinstance(expression, exp.Count):
+        raise ProgrammingError(
+            "Only COUNT is supported on metadata tables, without other columns"
+        )
+    argument = expression.this
+    if isinstance(argument, exp.Star):
+        return len(rows)
+    return sum(evaluate(argument, row) is not None for row in rows)
+
+
+def evaluate(expression: exp.Expression, row: Row) -> Any:
+    """
+    Evaluate an expression on a row, with SQL semantics for ``NULL``.
+    """
+    if isinstance(expression, exp.Column):
+        return row.get(expression.name.lower())
+    if isinstance(expression, exp.Literal):
+        if expression.is_string:
+            return expression.name
+        number = float(expression.name)
+        return int(number) if number.is_integer() else number
+    if isinstance(expression, exp.Boolean):
+        return expression.this
+    if isinstance(expression, exp.Null):
+        return None
+    if isinstance(expression, exp.Paren):
+        return evaluate(expression.this, row)
+    if isinstance(expression, exp.Neg):
+        value = evaluate(expression.this, row)
+        return None if value is None else -value
+
+    if isinstance(expression, exp.And):
+        left = evaluate(expression.this, row)
+        if left is False:
+            return False
+        right = evaluate(expression.expression, row)
+        if right is False:
+            return False
+        return None if left is None or right is None else True
+    if isinstance(expression, exp.Or):
+        left = evaluate(expression.this, row)
+        if left:
+            return True
+        right = evaluate(expression.expression, row)
+        if right:
+            return True
+        return None if left is None or right is None else False
+    if isinstance(expression, exp.Not):
+        value = evaluate(expression.this, row)
+        return None if value is None else not value
+
+    if isinstance(expression, exp.Is):
+        value = evaluate(expression.this, row)
+        other = evaluate(expression.expression, row)
+        return value is other
+    if isinstance(expression, exp.In):
+        value = evaluate(expression.this, row)
+        if value is None:
+            return None
+        return value in [evaluate(e, row) for e in expression.expressions]
+    if isinstance(expression, (exp.Like, exp.ILike)):
+        value = evaluate(expression.this, row)
+        pattern = evaluate(expression.expression, row)
+        if value is None or pattern is None:
+            return None
+        regex = _like_to_regex(pattern, isinstance(expression, exp.ILike))
+        return regex.fullmatch(str(value)) is not None
+    if isinstance(expression, (exp.Lower, exp.Upper)):
+        value = evaluate(expression.this, row)
+        if value is None:
+            return None
+        return value.lower() if isinstance(expression, exp.Lower) else value.upper()
+    if type(expression) in _COMPARISONS:
+        left = evaluate(expression.this, row)
+        right = evaluate(expression.expression, row)
+        if left is None or right is None:
+            return None
+        try:
+            return _COMPARISONS[type(expression)](left, right)
+        except TypeError as ex:
+            raise ProgrammingError(f"Cannot compare {expression.sql()}") from ex
+
+    raise ProgrammingError(
+        f"{expression.sql()} is not supported on metadata tables"
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _like_to_regex(pattern: str, case_insensitive: bool) -> "re.Pattern[str]":
+    regex = "".join(
+        ".*" if char == "%" else "." if char == "_" else re.escape(char)
+        for char in pattern
+    )
+    flags = re.DOTALL | (re.IGNORECASE if case_insensitive else 0)
+    return re.compile(regex, flags)
@@ -0,0 +1,140 @@
+"""
+Streaming of query results to a file, batch by batch.
+
+Only one batch of rows is held in memory at a time, so results larger than
+memory can be written out, e.g. by ``allstars sql``.
+"""
+
+import csv
+import json
+from typing import IO, Any, Callable, Dict, Iterator, List, Tuple
+
+DEFAULT_BATCH_SIZE = 1000
+
+Batches = Iterator[List[Tuple[Any, ...]]]
+
+
+def iter_batches(cursor: Any, batch_size: int = DEFAULT_BATCH_SIZE) -> Batches:
+    """
+    Fetch the results of an executed cursor in batches.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv(names: List[str], batches: Batches, file: IO) -> None:
+    writer = csv.writer(file)
+    writer.writerow(names)
+    for rows in batches:
+        writer.writerows(rows)
+
+
+def write_jsonl(names: List[str], batches: Batches, file: IO) -> None:
+    for rows in batches:
+        file.write(
+            "".join(
+                json.dumps(dict(zip(names, row)), default=str) + "\n" for row in rows
+            )
+        )
+
+
+def write_arrow(names: List[str], batches: Batches, file: IO) -> None:
+    """
+    Write an Arrow IPC stream, batch by batch.
+
+    A stream has a single schema, taken from the first batch, see
+    ``arrow_schema``. Later batches are cast to it, raising a ``ValueError``
+    when their values don't fit.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError as ex:
+        raise ImportError(
+            "Arrow output requires pyarrow, install allstars[arrow]"
+        ) from ex
+
+    sink = getattr(file, "buffer", file)
+    writer = None
+    try:
+        for rows in batches:
+            if writer is None:
+                batch = record_batch(names, rows)
+                schema = arrow_schema(batch)
+                writer = pa.ipc.new_stream(sink, schema)
+            writer.write_batch(record_batch(names, rows, schema))
+        if writer is None:
+            schema = pa.schema([pa.field(name, pa.null()) for name in names])
+            writer = pa.ipc.new_stream(sink, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def record_batch(names: List[str], rows: List[Tuple[Any, ...]], schema=None):
+    """
+    Build an Arrow record batch from rows, inferring the type of each column
+    or casting it to the type it has in a schema.
+
+    Raises a ``ValueError`` when the values of a column don't fit one type,
+    e.g. strings and integers, or the type of the schema without losing
+    precision, e.g. ``2.5`` in an integer column.
+    """
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [() for _ in names]
+    arrays = []
+    for i, (name, values) in enumerate(zip(names, columns)):
+        try:
+            array = pa.array(values)
+            if schema is not None and array.type != schema.field(i).type:
+                array = array.cast(schema.field(i).type)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as ex:
+            expected = f" as {schema.field(i).type}" if schema is not None else ""
+            raise ValueError(f"Column {name} can't be converted{expected}: {ex}") from ex
+        arrays.append(array)
+    if schema is not None:
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+    return pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def arrow_schema(batch):
+    """
+    The schema of results starting with a batch: columns keep the type of
+    their values in it, and are nullable. Columns only NULL in the batch are
+    strings, which any later value can be written as.
+    """
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            pa.field(
+                field.name,
+                pa.string() if pa.types.is_null(field.type) else field.type,
+                nullable=True,
+            )
+            for field in batch.schema
+        ]
+    )
+
+
+FORMATS: Dict[str, Callable[[List[str], Batches, IO], None]] = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "arrow": write_arrow,
+}
+
+
+def write_results(
+    cursor: Any,
+    file: IO,
+    output_format: str = "csv",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> None:
+    """
+    Write the results of an executed cursor in one of the ``FORMATS``.
+    """
+    names = [column[0] for column in cursor.description or []]
+    FORMATS[output_format](names, iter_batches(cursor, batch_size), file)
@@ -0,0 +1,90 @@
+"""
+Capture of semantic queries, to replay a workload with ``allstars replay``.
+
+Each query is written as a line of JSON, once its results are exhausted:
+
+    {"ts": 1700000000.0, "query": "...", "parameters": {...}, "sql": "...",
+     "phases": {"parse": 0.0012, ...}, "rows": 10, "bytes": 120}
+
+Logs ending in ``.gz`` are compressed. Set ``ALLSTARS_QUERY_LOG`` to a file
+name to capture every query run through ``allstars.sql.dbapi``.
+"""
+
+import gzip
+import json
+import threading
+import time
+from typing import IO, Any, Dict, Iterator, Optional
+
+from allstars.sql import stats as query_stats
+
+_logs: Dict[str, "QueryLog"] = {}
+_logs_lock = threading.Lock()
+
+
+def _open(filename: str, mode: str) -> IO[str]:
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode + "t", encoding="utf-8")  # type: ignore
+    return open(filename, mode, encoding="utf-8")
+
+
+class QueryLog:
+    """
+    A stats hook appending every query to a file.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def __call__(self, stats: query_stats.QueryStats) -> None:
+        entry = {
+            "ts": round(time.time(), 3),
+            "query": stats.query,
+            "parameters": stats.parameters,
+            "sql": stats.sql,
+            "phases": {k: round(v, 6) for k, v in stats.phases.items()},
+            "rows": stats.rows,
+            "bytes": stats.bytes,
+        }
+        line = json.dumps(entry, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = _open(self.filename, "a")
+            self._file.write(line)
+            self._file.flush()
+
+    def start(self) -> "QueryLog":
+        query_stats.register_hook(self)
+        return self
+
+    def stop(self) -> None:
+        query_stats.unregister_hook(self)
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "QueryLog":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def enable(filename: str) -> QueryLog:
+    """
+    Start capturing queries to a file, once per process.
+    """
+    with _logs_lock:
+        if filename not in _logs:
+            _logs[filename] = QueryLog(filename).start()
+        return _logs[filename]
+
+
+def read_log(filename: str) -> Iterator[Dict[str, Any]]:
+    with _open(filename, "r") as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,171 @@
+"""
+Replay of a captured workload, see ``allstars.sql.querylog``.
+
+Queries are re-run against any SQLAlchemy URL, e.g. a SQLite stand-in of the
+warehouse, reporting throughput and latency percentiles per query shape.
+"""
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from sqlglot import exp, parse_one
+from sqlglot.errors import ParseError
+
+from allstars.sql.dbapi.connection import connect
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+
+
+def query_shape(query: str) -> str:
+    """
+    Normalize a query, so that queries differing only by literals match.
+    """
+    try:
+        tree = parse_one(query)
+    except ParseError:
+        return " ".join(query.split())
+    for literal in list(tree.find_all(exp.Literal)):
+        literal.replace(exp.Placeholder())
+    return tree.sql()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """
+    Nearest-rank percentile of a list of values.
+    """
+    if not values:
+        return math.nan
+    values = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+@dataclass
+class ShapeReport:
+    shape: str
+    # latencies of successful runs, in seconds
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def p50(self) -> float:
+        return percentile(self.latencies, 50)
+
+    @property
+    def p95(self) -> float:
+        return percentile(self.latencies, 95)
+
+    @property
+    def p99(self) -> float:
+        return percentile(self.latencies, 99)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "shape": self.shape,
+            "count": self.count,
+            "errors": self.errors,
+            "p50": self.p50,
+            "p95": self.p95,
+            "p99": self.p99,
+        }
+
+
+@dataclass
+class ReplayReport:
+    shapes: Dict[str, ShapeReport] = field(default_factory=dict)
+    # wall clock time for the whole replay, in seconds
+    elapsed: float = 0.0
+    concurrency: int = 1
+
+    @property
+    def queries(self) -> int:
+        return sum(shape.count for shape in self.shapes.values())
+
+    @property
+    def errors(self) -> int:
+        return sum(shape.errors for shape in self.shapes.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.queries / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "concurrency": self.concurrency,
+            "throughput": self.throughput,
+            "shapes": [shape.to_dict() for shape in self.shapes.values()],
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"Replayed {self.queries} queries ({self.errors} errors) in "
+            f"{self.elapsed:.3f}s with concurrency {self.concurrency}: "
+            f"{self.throughput:.1f} queries/s",
+        ]
+        shapes = sorted(
+            self.shapes.values(),
+            key=lambda s: s.p95 if s.latencies else -1.0,
+            reverse=True,
+        )
+        for shape in shapes:
+            lines.append(
+                f"{shape.count:>6} {shape.p50 * 1000:>9.2f}ms "
+                f"{shape.p95 * 1000:>9.2f}ms {shape.p99 * 1000:>9.2f}ms  "
+                f"{shape.shape}"
+            )
+        return "\n".join(lines)
+
+
+def replay(
+    entries: Iterable[Dict[str, Any]],
+    database_url: str,
+    semantic_layer: Optional["SemanticLayer"] = None,
+    concurrency: int = 1,
+    repeat: int = 1,
+) -> ReplayReport:
+    """
+    Re-run logged queries, ``concurrency`` at a time.
+
+    Latencies cover transpiling, running and fetching each query, not the
+    time spent waiting for a free worker.
+    """
+    entries = list(entries) * repeat
+    report = ReplayReport(concurrency=concurrency)
+
+    connection = connect(
+        database_url,
+        semantic_layer=semantic_layer,
+        max_concurrency=concurrency,
+        collect_stats=True,
+    )
+    try:
+        start = time.perf_counter()
+        futures = [
+            connection.submit(entry["query"], entry.get("parameters"))
+            for entry in entries
+        ]
+        for entry, future in zip(entries, futures):
+            shape = query_shape(entry["query"])
+            shape_report = report.shapes.setdefault(shape, ShapeReport(shape))
+            try:
+                cursor = future.result()
+            except Exception:  # pylint: disable=broad-except
+                shape_report.errors += 1
+                continue
+            shape_report.latencies.append(cursor.stats.total)
+            cursor.close()
+        report.elapsed = time.perf_counter() - start
+    finally:
+        connection.close()
+
+    return report
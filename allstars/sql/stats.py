@@ -0,0 +1,98 @@
+"""
+Per-phase instrumentation of semantic queries.
+
+Collecting stats is off by default. When enabled on a connection, or when a
+hook is registered, every ``execute`` records how long each phase took:
+
+- ``cache``: looking up an already transpiled query, replacing the phases
+  below up to ``generate`` when found;
+- ``parse``: parsing the semantic query and unaliasing columns;
+- ``resolve``: resolving metrics, dimensions and columns to relations;
+- ``plan``: planning joins with the semantic layer;
+- ``inspect``: inspecting foreign keys in the database, when planning falls
+  back to them;
+- ``rewrite``: replacing the virtual table, pushing filters down and
+  approximating;
+- ``generate``: generating SQL for the backend;
+- ``execute``: running the query in the backend;
+- ``fetch``: fetching rows, until the results are exhausted.
+
+along with the number of rows and (approximate) bytes fetched. Stats are
+available from ``cursor.stats``, and passed to every registered hook once
+the results are exhausted.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+Hook = Callable[["QueryStats"], None]
+
+_hooks: List[Hook] = []
+
+
+@dataclass
+class QueryStats:
+    """
+    Durations, in seconds, and counters for a single query.
+    """
+
+    query: str
+    parameters: Optional[Dict[str, Any]] = None
+    sql: Optional[str] = None
+    phases: Dict[str, float] = field(default_factory=dict)
+    rows: int = 0
+    bytes: int = 0
+    _mark: float = field(
+        default_factory=time.perf_counter, init=False, repr=False, compare=False
+    )
+
+    def lap(self, phase: str) -> None:
+        """
+        Add the time elapsed since the previous lap to a phase.
+        """
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    def add_row(self, row: Tuple[Any, ...]) -> None:
+        self.rows += 1
+        self.bytes += sum(
+            len(value) if isinstance(value, (str, bytes, bytearray)) else 8
+            for value in row
+            if value is not None
+        )
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+
+def register_hook(hook: Hook) -> None:
+    """
+    Call a function with the stats of every query, e.g. to export them to a
+    tracing or metrics system. Registering a hook turns on stats collection.
+    """
+    _hooks.append(hook)
+
+
+def unregister_hook(hook: Hook) -> None:
+    _hooks.remove(hook)
+
+
+def has_hooks() -> bool:
+    return bool(_hooks)
+
+
+def notify(stats: QueryStats) -> None:
+    """
+    Pass stats to the registered hooks; failing hooks don't fail the query.
+    """
+    for hook in list(_hooks):
+        try:
+            hook(stats)
+        except Exception:  # pylint: disable=broad-except
+            _logger.exception("Query stats hook %r failed", hook)
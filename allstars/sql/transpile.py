@@ -1,35 +1,138 @@
 import copy
 import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 from sqlalchemy import inspect
 from sqlalchemy.engine import Engine
 from sqlglot import exp, parse, parse_one
 from sqlglot.dialects.dialect import Dialect
 
+from allstars.core.expression_index import inline
+from allstars.sql.approximate import ErrorBound, approximate, extract_hint
 from allstars.sql.dbapi.exceptions import ProgrammingError
+from allstars.sql.metadata import METADATA_SCHEMA
+
+if TYPE_CHECKING:
+    from allstars.core.semantic_layer import SemanticLayer
+    from allstars.sql.cache import QueryCache
+    from allstars.sql.stats import QueryStats
 
 _logger = logging.getLogger(__name__)
 
+# SQLAlchemy dialect names that differ from their sqlglot counterpart
+SQLGLOT_DIALECTS = {
+    "postgresql": "postgres",
+    "mssql": "tsql",
+}
+
+
+@dataclass
+class CompiledQuery:
+    """
+    A semantic layer query transpiled into a query against the actual database.
+    """
+
+    sql: str
+    # approximated output columns, when running in approximate mode
+    error_bounds: Dict[str, ErrorBound] = field(default_factory=dict)
+    # keys of the semantic layer objects the query was transpiled from
+    dependencies: Set[str] = field(default_factory=set)
 
-def transpile(engine: Engine, query: str) -> str:
+
+def get_sqlglot_dialect(engine: Engine) -> str:
+    """
+    Return the sqlglot dialect matching the engine's backend.
+    """
+    name = SQLGLOT_DIALECTS.get(engine.dialect.name, engine.dialect.name)
+    try:
+        Dialect.get_or_raise(name)
+    except ValueError:
+        return "sqlite"
+    return name
+
+
+def transpile(engine: Engine, query: str, **kwargs) -> str:
     """
     Transpile a semantic layer query.
     """
-    inspector = inspect(engine)
+    return compile_query(engine, query, **kwargs).sql
+
+
+def compile_query(
+    engine: Engine,
+    query: str,
+    semantic_layer: Optional["SemanticLayer"] = None,
+    approximate_mode: bool = False,
+    sample_percent: Optional[float] = None,
+    stats: Optional["QueryStats"] = None,
+    cache: Optional["QueryCache"] = None,
+) -> CompiledQuery:
+    """
+    Transpile a semantic layer query, keeping track of how it was transpiled.
+
+    When a semantic layer is given, metric and dimension keys referenced in
+    the query are resolved through its index of pre-parsed expressions;
+    anything else is treated as a physical ``table.column`` reference.
+
+    In approximate mode, either turned on by the caller or through a
+    ``/*+ APPROXIMATE */`` hint in the query, exact aggregations are replaced
+    by cheaper approximate ones where the backend supports it.
+
+    When given stats, the time spent in each phase is added to them. When
+    given a cache, transpiled queries are reused from it, for the same
+    semantic layer only.
+    """
+    dialect = get_sqlglot_dialect(engine)
+    identity = semantic_layer.get_identity() if semantic_layer is not None else None
+    cache_key = (identity, dialect, query, approximate_mode, sample_percent)
+    if cache is not None:
+        compiled = cache.get(cache_key)
+        if compiled is not None:
+            if stats:
+                stats.sql = compiled.sql
+                stats.lap("cache")
+            return compiled
+
+    query, hinted, hinted_sample_percent = extract_hint(query)
+    if hinted:
+        approximate_mode = True
+        sample_percent = hinted_sample_percent or sample_percent
+
+    error_bounds: Dict[str, ErrorBound] = {}
+    dependencies: Set[str] = set()
+    index = semantic_layer.get_expression_index() if semantic_layer else None
+
+    inspector = None
     tree = parse(query)
 
     # analyze tables
+    query_contexts = semantic_layer.query_contexts if semantic_layer else {}
+    virtual_tables = {"super"} | set(query_contexts.keys())
     tables = set()
     for statement in tree:
         for table in statement.find_all(exp.Table):
+            if table.db == METADATA_SCHEMA:
+                raise ProgrammingError(
+                    f"{METADATA_SCHEMA}.{table.name} is a metadata table, answered "
+                    "in memory by the cursor without any SQL"
+                )
             tables.add(table.name)
 
-    if not tables & {"super", "main.super"}:
-        raise ProgrammingError("Only the 'super' table is supported")
+    if not tables & virtual_tables:
+        raise ProgrammingError(
+            f"Only the {', '.join(repr(t) for t in sorted(virtual_tables))} "
+            "tables are supported"
+        )
+    if stats:
+        stats.lap("parse")
 
     # fetch all column references
     statements = []
     for statement in tree:
+        virtual_table = statement.find(exp.Table).name
+        query_context = query_contexts.get(virtual_table)
+
         # unalias columns
         aliases = copy.deepcopy(
             {alias.alias: alias.this for alias in statement.find_all(exp.Alias)}
@@ -40,24 +143,113 @@ def transpile(engine: Engine, query: str) -> str:
 
         # XXX
         statement = parse(str(statement))[0]
+        if stats:
+            stats.lap("parse")
 
-        # extract all columns referenced
+        # extract all columns referenced, splicing in metrics and dimensions
         columns = set()
-        for column in statement.find_all(exp.Column):
-            columns.add(column.name)
-            column.replace(parse_one(column.name, into=exp.Column))
+        relation_keys = set()
+        metric_relation_keys = set()
+        filters = []
+        for column in list(statement.find_all(exp.Column)):
+            if index and column.name in index.errors:
+                raise ProgrammingError(
+                    f"Invalid expression for {column.name}: "
+                    f"{index.errors[column.name]}"
+                )
+            resolved = index.resolve(column.name) if index else None
+            if resolved:
+                expression, keys = resolved
+                dependencies.add(column.name)
+                dependencies |= index.dependencies[column.name]
+                inline(column, expression)
+                relation_keys.update(keys)
+                if column.name in index.metric_keys:
+                    metric_relation_keys.update(keys)
+                if column.name in index.filter_keys and len(keys) == 1:
+                    filters.append((expression, keys[0]))
+            else:
+                columns.add(column.name)
+                column.replace(parse_one(column.name, into=exp.Column))
 
-        # collect all referenced tables
-        tables = {table.split(".")[0] for table in columns}
+        # collect all referenced tables, along with their schema when known
+        schemas: Dict[str, Optional[str]] = {
+            column.split(".")[0]: None for column in columns
+        }
+        for relation_key in relation_keys:
+            relation = semantic_layer.relations.get(relation_key)
+            if relation:
+                schemas[relation.reference] = relation.database_schema
+            else:
+                schema, _, reference = relation_key.rpartition(".")
+                schemas[reference] = schema or None
+        tables = set(schemas)
+
+        if semantic_layer:
+            relation_keys |= {
+                index.references[table] for table in tables if table in index.references
+            }
+        dependencies |= relation_keys
+        if query_context:
+            dependencies.add(query_context.key)
+            outside = relation_keys - set(query_context.relation_keys)
+            if outside:
+                raise ProgrammingError(
+                    f"{', '.join(sorted(outside))} not in query context "
+                    f"{query_context.key}"
+                )
+        if stats:
+            stats.lap("resolve")
+
+        # plan joins with the semantic layer, within the query context if any;
+        # pairs of tables it can't join fall back to the foreign keys
+        plan = None
+        if semantic_layer and len(tables) > 1 and len(relation_keys) == len(tables):
+            # join from the largest relation, the facts, when statistics say
+            row_counts = {}
+            for key in relation_keys:
+                row_count = semantic_layer.get_row_count(key)
+                if row_count is not None:
+                    row_counts[key] = row_count
+            root = min(
+                metric_relation_keys or relation_keys,
+                key=lambda key: (-row_counts.get(key, 0), key),
+            )
+            graph = semantic_layer.get_join_graph(
+                query_context.key if query_context else None
+            )
+            try:
+                plan = graph.plan(root, relation_keys, row_counts)
+            except ValueError as ex:
+                if query_context or len(tables) != 2:
+                    raise ProgrammingError(str(ex)) from ex
 
         # figure out how to join tables
         if len(tables) == 1:
-            replacement = parse_one(tables.pop(), into=exp.Table)
+            table = tables.pop()
+            replacement = exp.table_(table, db=schemas[table])
+        elif plan is not None:
+            root_relation = semantic_layer.relations[root]
+            replacement = exp.table_(
+                root_relation.reference, db=root_relation.database_schema
+            )
+            for relation_key, join_term, join in plan:
+                relation = semantic_layer.relations[relation_key]
+                statement = statement.join(
+                    exp.table_(relation.reference, db=relation.database_schema),
+                    on=graph.condition(join),
+                    join_type=join_term[: -len("JOIN")].strip() or None,
+                    copy=False,
+                )
         elif len(tables) == 2:
+            # only connect to inspect the database when actually needed
+            inspector = inspector or inspect(engine)
             for table in tables:
                 fks = [
                     fk
-                    for fk in inspector.get_foreign_keys(table_name=table)
+                    for fk in inspector.get_foreign_keys(
+                        table_name=table, schema=schemas[table]
+                    )
                     if fk["referred_table"] in tables and fk["referred_table"] != table
                 ]
                 if not fks:
@@ -69,7 +261,7 @@ def transpile(engine: Engine, query: str) -> str:
                 referred_table = fk["referred_table"]
                 referred_columns = fk["referred_columns"]
 
-                replacement = parse_one(table, into=exp.Table)
+                replacement = exp.table_(table, db=schemas[table])
                 statement = statement.join(
                     referred_table,
                     on=" AND ".join(
@@ -78,21 +270,155 @@ def transpile(engine: Engine, query: str) -> str:
                             constrained_columns, referred_columns
                         )
                     ),
+                    copy=False,
                 )
                 break
             else:
                 raise NotImplementedError(f"Can't join between tables: {tables}")
+            if stats:
+                stats.lap("inspect")
         else:
             raise NotImplementedError("Only one or two tables are supported")
+        if stats:
+            stats.lap("plan")
 
         super = statement.find(exp.Table)
         super.replace(replacement)
 
+        # filters on a single relation are applied before joining it
+        if filters and len(tables) > 1:
+            replacement = push_down_filters(
+                statement, filters, semantic_layer, replacement
+            )
+
+        if approximate_mode:
+            row_count = None
+            if semantic_layer and replacement.db:
+                row_count = semantic_layer.get_row_count(
+                    f"{replacement.db}.{replacement.name}"
+                )
+            error_bounds.update(
+                approximate(statement, dialect, replacement, sample_percent, row_count)
+            )
+
         statements.append(statement)
+        if stats:
+            stats.lap("rewrite")
 
     query = ";\n".join(
-        Dialect.get_or_raise("sqlite")().generate(statement) for statement in statements
+        Dialect.get_or_raise(dialect)().generate(statement) for statement in statements
     )
     _logger.info("Transpiled query:\n%s", query)
+    if stats:
+        stats.sql = query
+        stats.lap("generate")
+
+    compiled = CompiledQuery(query, error_bounds, dependencies)
+    if cache is not None:
+        cache.set(cache_key, compiled, dependencies)
+
+    return compiled
+
+
+def push_down_filters(
+    statement: exp.Select,
+    filters: List[Tuple[exp.Expression, str]],
+    semantic_layer: "SemanticLayer",
+    fact_table: exp.Table,
+) -> exp.Table:
+    """
+    Move named filters from the ``WHERE`` clause into the relation they apply to.
+
+    Each relation with filters is replaced by a derived table that applies
+    them, so the rows are pruned before the joins. Only filters that are
+    top-level conjuncts of the ``WHERE`` clause are moved, and never into the
+    null-extended side of an outer join, where it would change the results.
+    Returns the fact table, which may have been moved inside a derived table.
+    """
+    where = statement.args.get("where")
+    if not where:
+        return fact_table
+
+    if isinstance(where.this, exp.And):
+        conjuncts = list(where.this.flatten())
+    else:
+        conjuncts = [where.this]
+
+    sides = {join.side for join in statement.args.get("joins") or []}
+    predicates: Dict[str, List[exp.Expression]] = {}
+    tables: Dict[str, List[exp.Table]] = {}
+    for predicate, relation_key in filters:
+        relation = semantic_layer.relations.get(relation_key)
+        if relation is None:
+            continue
+        if relation_key not in tables:
+            tables[relation_key] = [
+                table
+                for table in statement.find_all(exp.Table)
+                if table.name == relation.reference
+                and table.db in ("", relation.database_schema)
+            ]
+            if not all(_can_push_down(table, sides) for table in tables[relation_key]):
+                tables[relation_key] = []
+        if not tables[relation_key]:
+            continue
+
+        node = predicate
+        while isinstance(node.parent, exp.Paren):
+            node = node.parent
+        if any(node is conjunct for conjunct in conjuncts):
+            conjuncts = [conjunct for conjunct in conjuncts if conjunct is not node]
+            predicates.setdefault(relation_key, []).append(predicate)
+
+    if not predicates:
+        return fact_table
+    if conjuncts:
+        where.set("this", exp.and_(*conjuncts))
+    else:
+        statement.set("where", None)
+
+    for relation_key, relation_predicates in predicates.items():
+        relation = semantic_layer.relations[relation_key]
+        for table in tables[relation_key]:
+            inner = table.copy()
+            subquery = (
+                exp.select("*")
+                .from_(inner)
+                .where(exp.and_(*relation_predicates))
+                .subquery(relation.reference)
+            )
+            table.replace(subquery)
+            if table is fact_table:
+                fact_table = inner
+
+        # references to the relation now go through the derived table's alias
+        for column in statement.find_all(exp.Column):
+            if (
+                column.table == relation.reference
+                and column.text("db") == relation.database_schema
+                and not any(
+                    isinstance(p, exp.Subquery) for p in _ancestors(column, statement)
+                )
+            ):
+                column.set("db", None)
+
+    return fact_table
+
+
+def _can_push_down(table: exp.Table, sides: Set[str]) -> bool:
+    """
+    Return if filtering a table before the joins keeps the same results.
+    """
+    if isinstance(table.parent, exp.Join):
+        return table.parent.side not in {"LEFT", "FULL"}
+    if isinstance(table.parent, exp.From):
+        return not sides & {"RIGHT", "FULL"}
+    return False
+
 
-    return query
+def _ancestors(node: exp.Expression, root: exp.Expression) -> List[exp.Expression]:
+    ancestors = []
+    while node.parent is not None and node is not root:
+        node = node.parent
+        ancestors.append(node)
+    return ancestors
@@ -0,0 +1,3 @@
+"""
+Benchmarks, see ``python -m benchmarks.pipeline --help``.
+"""
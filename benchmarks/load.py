@@ -0,0 +1,114 @@
+"""
+Load test of ``allstars serve``.
+
+Starts a server on the small synthetic schema (see ``benchmarks.schema``) and
+sends the benchmark queries from concurrent clients over HTTP:
+
+    python -m benchmarks.load --clients 8 --requests 200
+
+Reports throughput and latency percentiles, with and without the result cache.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import click
+
+from allstars.core.project import Project
+from allstars.server import Server
+from allstars.sql.replay import percentile
+
+from benchmarks.pipeline import quiet
+from benchmarks.schema import SCALES, create_schema, enrich, queries
+
+
+def create_project(folder: str, scale_name: str) -> Project:
+    from allstars.core.semantic_layer import SemanticLayer
+    from allstars.database_interface import DatabaseInterface
+
+    scale = SCALES[scale_name]
+    url = create_schema(os.path.join(folder, f"{scale.name}.db"), scale)
+    semantic_layer = SemanticLayer()
+    with quiet():
+        semantic_layer.load_relations_from_schema("main", DatabaseInterface(url))
+    enrich(semantic_layer, scale)
+
+    project = Project(folder, url)
+    project.semantic_layer = semantic_layer
+    return project
+
+
+def run_load(
+    server: Server,
+    payloads: List[Dict[str, Any]],
+    clients: int,
+    requests: int,
+) -> Dict[str, float]:
+    http_server = server.make_http_server(port=0)
+    url = f"http://127.0.0.1:{http_server.server_port}/sql"
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+
+    def send(i: int) -> float:
+        data = json.dumps(payloads[i % len(payloads)]).encode()
+        start = time.perf_counter()
+        with urllib.request.urlopen(url, data) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as executor:
+            latencies = sorted(executor.map(send, range(requests)))
+        elapsed = time.perf_counter() - start
+    finally:
+        http_server.shutdown()
+        http_server.server_close()
+
+    return {
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+@click.command()
+@click.option("--scale", type=click.Choice(list(SCALES)), default="small")
+@click.option("--clients", type=int, default=8, help="Concurrent clients.")
+@click.option("--requests", type=int, default=200, help="Requests per run.")
+@click.option("--output", default=None, help="Write results as JSON.")
+def main(scale, clients, requests, output):
+    results: Dict[str, Optional[Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as folder:
+        project = create_project(folder, scale)
+        payloads = [{"query": query} for query in queries(SCALES[scale])]
+
+        for name, result_ttl in [("no_result_cache", None), ("result_cache", 60.0)]:
+            server = Server(project, result_ttl=result_ttl)
+            server.warm()
+            results[name] = run_load(server, payloads, clients, requests)
+            server.close()
+
+    for name, result in results.items():
+        click.echo(
+            f"{name:<16} {result['requests_per_second']:>8.1f} req/s  "
+            f"p50 {result['p50'] * 1000:>7.2f}ms  "
+            f"p95 {result['p95'] * 1000:>7.2f}ms  "
+            f"p99 {result['p99'] * 1000:>7.2f}ms"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"results": {"load": results}}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Benchmarks of the semantic layer pipeline.
+
+Measures, for each scale of synthetic schema (see ``benchmarks.schema``):
+
+- ``extract``: ``SemanticLayer.load_relations_from_schema``;
+- ``infer_joins``: ``SemanticLayer.infer_joins``;
+- ``compile_to_files``: writing the project folder;
+- ``from_folder``: loading the project folder;
+- ``transpile_cold``: the first transpile, building the expression index;
+- ``transpile[N]``: transpiling each benchmark query;
+- ``cursor``: executing and fetching the queries through the DB API driver,
+  reported as queries per second.
+
+Usage:
+
+    python -m benchmarks.pipeline --scale small --output results.json
+    python -m benchmarks.pipeline --compare baseline.json
+
+Results are written as JSON, so that runs on different commits can be
+compared; ``--compare`` exits with an error when a timing regressed by more
+than ``--threshold``.
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import click
+import sqlglot
+
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.database_interface import DatabaseInterface
+from allstars.sql.dbapi import connect
+from allstars.sql.transpile import compile_query
+
+from benchmarks.schema import SCALES, Scale, create_schema, enrich, queries
+
+
+def measure(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    Time a function, returning the min and median of its runs in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "runs": repeat,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Silence the progress messages printed while loading projects.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            yield
+
+
+def run_scale(
+    scale: Scale,
+    workdir: str,
+    repeat: int = 5,
+    iterations: int = 100,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Run all benchmarks against one scale, in a working directory.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    url = create_schema(os.path.join(workdir, f"{scale.name}.db"), scale)
+    db = DatabaseInterface(url)
+
+    def extract() -> SemanticLayer:
+        # inspectors cache what they reflect
+        db._inspector = None
+        semantic_layer = SemanticLayer()
+        with quiet():
+            semantic_layer.load_relations_from_schema("main", db)
+        return semantic_layer
+
+    results["extract"] = measure(extract, repeat)
+    semantic_layer = extract()
+    results["infer_joins"] = measure(semantic_layer.infer_joins, repeat)
+    semantic_layer.infer_joins()
+    enrich(semantic_layer, scale)
+
+    folder = os.path.join(workdir, scale.name)
+    results["compile_to_files"] = measure(
+        lambda: semantic_layer.compile_to_files(folder), repeat
+    )
+
+    def load() -> SemanticLayer:
+        with quiet():
+            return SemanticLayer.from_folder(folder)
+
+    results["from_folder"] = measure(load, repeat)
+
+    engine = db.engine
+    benchmark_queries = queries(scale)
+
+    def transpile_cold() -> None:
+        semantic_layer._expression_index = None
+        semantic_layer._join_graphs = None
+        compile_query(engine, benchmark_queries[0], semantic_layer=semantic_layer)
+
+    results["transpile_cold"] = measure(transpile_cold, repeat)
+
+    for i, query in enumerate(benchmark_queries):
+
+        def transpile(query: str = query) -> None:
+            for _ in range(iterations):
+                compile_query(engine, query, semantic_layer=semantic_layer)
+
+        timing = measure(transpile, repeat)
+        results[f"transpile[{i}]"] = {
+            **{k: v / iterations for k, v in timing.items() if k != "runs"},
+            "runs": repeat * iterations,
+        }
+
+    connection = connect(url, semantic_layer=semantic_layer)
+
+    def run_queries() -> None:
+        for query in benchmark_queries:
+            cursor = connection.execute(query)
+            cursor.fetchall()
+            cursor.close()
+
+    timing = measure(run_queries, repeat)
+    results["cursor"] = {
+        **timing,
+        "queries_per_second": len(benchmark_queries) / timing["median"],
+    }
+    connection.close()
+    db.engine.dispose()
+
+    return results
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[str]:
+    """
+    Return the timings that regressed by more than ``threshold`` (e.g. 0.2
+    for 20%) compared to a baseline, using medians.
+    """
+    regressions = []
+    for scale, benchmarks in results["results"].items():
+        for name, timing in benchmarks.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before or not before.get("median"):
+                continue
+            ratio = timing["median"] / before["median"]
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{scale}/{name}: {before['median'] * 1000:.3f}ms -> "
+                    f"{timing['median'] * 1000:.3f}ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--scale",
+    "scales",
+    type=click.Choice(list(SCALES)),
+    multiple=True,
+    help="Scales to run, defaults to all.",
+)
+@click.option("--repeat", type=int, default=5, help="Runs per benchmark.")
+@click.option("--output", default=None, help="Write results as JSON.")
+@click.option("--compare", "baseline_file", default=None, help="Baseline JSON.")
+@click.option("--threshold", type=float, default=0.2, help="Allowed slowdown.")
+def main(scales, repeat, output, baseline_file, threshold):
+    results = {
+        "commit": get_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "sqlglot": sqlglot.__version__,
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in scales or SCALES:
+            click.echo(f"Running {name}...", err=True)
+            results["results"][name] = run_scale(SCALES[name], workdir, repeat)
+
+    for name, benchmarks in results["results"].items():
+        for benchmark, timing in benchmarks.items():
+            click.echo(
+                f"{name:<8} {benchmark:<18} median {timing['median'] * 1000:>10.3f}ms "
+                f"min {timing['min'] * 1000:>10.3f}ms"
+            )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if baseline_file:
+        with open(baseline_file) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, threshold)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory used by many projects on top of the same warehouse.
+
+Loads the same number of projects (50 by default) twice: each with its own
+database interface, the way separate ``Project`` instances do, then through
+a ``ProjectRegistry``. The projects share the schema of ``benchmarks.schema``,
+and each has a metric of its own:
+
+    python -m benchmarks.registry --projects 50 --scale medium
+"""
+
+import gc
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, List
+
+import click
+import yaml
+
+from allstars.core.project import Project
+from allstars.core.registry import ProjectRegistry
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.database_interface import DatabaseInterface
+
+from benchmarks.pipeline import quiet
+from benchmarks.schema import SCALES, create_schema, enrich
+
+
+def create_projects(workdir: str, scale_name: str, count: int) -> List[str]:
+    scale = SCALES[scale_name]
+    url = create_schema(os.path.join(workdir, f"{scale.name}.db"), scale)
+    semantic_layer = SemanticLayer()
+    with quiet():
+        semantic_layer.load_relations_from_schema("main", DatabaseInterface(url))
+    enrich(semantic_layer, scale)
+
+    template = os.path.join(workdir, "template")
+    semantic_layer.compile_to_files(template)
+
+    folders = []
+    for i in range(count):
+        folder = os.path.join(workdir, f"unit_{i}")
+        shutil.copytree(template, folder)
+        filename = os.path.join(folder, "metrics.yaml")
+        with open(filename) as file:
+            data = yaml.safe_load(file)
+        data["metrics"][0]["expression"] += f" + {i}"
+        with open(filename, "w") as file:
+            yaml.dump(data, file, sort_keys=False)
+        folders.append(folder)
+    return folders
+
+
+def measure_memory(load: Callable[[], object]) -> int:
+    """
+    Bytes allocated by ``load`` and still held by what it returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    with quiet():
+        loaded = load()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return size
+
+
+def load_separately(folders: List[str], url: str) -> List[Project]:
+    projects = []
+    for folder in folders:
+        project = Project(folder, url)
+        project.load()
+        project.db.engine.connect().close()
+        projects.append(project)
+    return projects
+
+
+def load_registry(folders: List[str], url: str) -> ProjectRegistry:
+    registry = ProjectRegistry()
+    for i, folder in enumerate(folders):
+        project = registry.register(f"unit_{i}", folder, url)
+        project.db.engine.connect().close()
+    return registry
+
+
+@click.command()
+@click.option("--projects", "count", type=int, default=50, help="Projects.")
+@click.option("--scale", type=click.Choice(list(SCALES)), default="medium")
+@click.option("--output", default=None, help="Write results as JSON.")
+def main(count, scale, output):
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        folders = create_projects(workdir, scale, count)
+        url = f"sqlite:///{os.path.join(workdir, f'{scale}.db')}"
+        for name, load in [
+            ("separate", lambda: load_separately(folders, url)),
+            ("registry", lambda: load_registry(folders, url)),
+        ]:
+            size = measure_memory(load)
+            results[name] = {"bytes": size, "bytes_per_project": size / count}
+
+    for name, result in results.items():
+        click.echo(
+            f"{name:<10} {result['bytes'] / 2**20:>8.1f}MB total  "
+            f"{result['bytes_per_project'] / 2**20:>6.2f}MB per project"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"results": {"registry": results}}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
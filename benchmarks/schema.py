@@ -0,0 +1,191 @@
+"""
+Synthetic star and snowflake schemas in SQLite.
+
+Each star has a fact table referencing a customer dimension shared by all
+stars, and a product dimension snowflaked into a category dimension:
+
+    fact_N -> dim_customer
+    fact_N -> dim_product_N -> dim_category_N
+
+Facts get extra attribute columns, to grow the metadata along with the data.
+"""
+
+import os
+import random
+from dataclasses import dataclass
+from typing import List
+
+from sqlalchemy import create_engine, text
+
+from allstars.core.join import Join
+from allstars.core.metric import Metric
+
+
+@dataclass
+class Scale:
+    name: str
+    stars: int
+    # extra attribute columns per fact table
+    attributes: int
+    rows: int
+    customers: int = 100
+    products: int = 50
+    categories: int = 10
+
+
+SCALES = {
+    "small": Scale("small", stars=2, attributes=5, rows=1000),
+    "medium": Scale("medium", stars=10, attributes=20, rows=10000),
+    "large": Scale("large", stars=25, attributes=50, rows=20000),
+}
+
+
+def create_schema(filename: str, scale: Scale, seed: int = 42) -> str:
+    """
+    Create (or recreate) a SQLite database, returning its URL.
+    """
+    if os.path.exists(filename):
+        os.unlink(filename)
+    url = f"sqlite:///{filename}"
+    engine = create_engine(url)
+    rng = random.Random(seed)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE dim_customer ("
+                "customer_id INTEGER PRIMARY KEY, customer_name TEXT, "
+                "country TEXT, segment TEXT)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO dim_customer VALUES (:id, :name, :country, :segment)"),
+            [
+                {
+                    "id": i,
+                    "name": f"customer {i}",
+                    "country": rng.choice(["US", "CA", "FR", "BR", "JP"]),
+                    "segment": rng.choice(["smb", "mid", "enterprise"]),
+                }
+                for i in range(scale.customers)
+            ],
+        )
+
+        for star in range(scale.stars):
+            create_star(connection, star, scale, rng)
+
+    engine.dispose()
+    return url
+
+
+def create_star(connection, star: int, scale: Scale, rng: random.Random) -> None:
+    connection.execute(
+        text(
+            f"CREATE TABLE dim_category_{star} ("
+            f"category_{star}_id INTEGER PRIMARY KEY, category_{star}_name TEXT)"
+        )
+    )
+    connection.execute(
+        text(f"INSERT INTO dim_category_{star} VALUES (:id, :name)"),
+        [{"id": i, "name": f"category {i}"} for i in range(scale.categories)],
+    )
+
+    connection.execute(
+        text(
+            f"CREATE TABLE dim_product_{star} ("
+            f"product_{star}_id INTEGER PRIMARY KEY, product_{star}_name TEXT, "
+            f"category_{star}_id INTEGER "
+            f"REFERENCES dim_category_{star}(category_{star}_id))"
+        )
+    )
+    connection.execute(
+        text(f"INSERT INTO dim_product_{star} VALUES (:id, :name, :category)"),
+        [
+            {
+                "id": i,
+                "name": f"product {i}",
+                "category": rng.randrange(scale.categories),
+            }
+            for i in range(scale.products)
+        ],
+    )
+
+    attributes = [f"attribute_{i}" for i in range(scale.attributes)]
+    columns = ", ".join(f"{a} INTEGER" for a in attributes)
+    connection.execute(
+        text(
+            f"CREATE TABLE fact_{star} ("
+            "id INTEGER PRIMARY KEY, "
+            "customer_id INTEGER REFERENCES dim_customer(customer_id), "
+            f"product_{star}_id INTEGER "
+            f"REFERENCES dim_product_{star}(product_{star}_id), "
+            f"amount REAL, quantity INTEGER{', ' + columns if columns else ''})"
+        )
+    )
+    names = ["id", "customer_id", "product_id", "amount", "quantity"] + attributes
+    connection.execute(
+        text(
+            f"INSERT INTO fact_{star} VALUES "
+            f"({', '.join(':' + name for name in names)})"
+        ),
+        [
+            {
+                "id": i,
+                "customer_id": rng.randrange(scale.customers),
+                "product_id": rng.randrange(scale.products),
+                "amount": round(rng.uniform(1, 500), 2),
+                "quantity": rng.randint(1, 10),
+                **{a: rng.randrange(1000) for a in attributes},
+            }
+            for i in range(scale.rows)
+        ],
+    )
+
+
+def enrich(semantic_layer, scale: Scale) -> None:
+    """
+    Add what extraction can't infer: snowflake joins and additive metrics.
+    """
+    for star in range(scale.stars):
+        fact = f"main.fact_{star}"
+        product = f"main.dim_product_{star}"
+        category = f"main.dim_category_{star}"
+        semantic_layer.joins.append(
+            Join(
+                left_relation_key=fact,
+                right_relation_key=product,
+                join_criteria=f"{fact}.product_{star}_id = {product}.product_{star}_id",
+                cardinality="many_to_one",
+                join_term="JOIN",
+            )
+        )
+        semantic_layer.joins.append(
+            Join(
+                left_relation_key=product,
+                right_relation_key=category,
+                join_criteria=(
+                    f"{product}.category_{star}_id = {category}.category_{star}_id"
+                ),
+                cardinality="many_to_one",
+                join_term="JOIN",
+            )
+        )
+        semantic_layer.metrics.append(
+            Metric(key=f"revenue_{star}", expression="SUM(amount)", relation_key=fact)
+        )
+    semantic_layer._expression_index = None
+    semantic_layer._join_graphs = None
+
+
+def queries(scale: Scale) -> List[str]:
+    """
+    Semantic queries of increasing complexity, against the last star.
+    """
+    star = scale.stars - 1
+    return [
+        f'SELECT "revenue_{star}" FROM super',
+        f'SELECT "main.dim_customer.country", "revenue_{star}" '
+        "FROM super GROUP BY 1",
+        f'SELECT "main.dim_category_{star}.category_{star}_name", '
+        f'"revenue_{star}", "main.fact_{star}.count" FROM super GROUP BY 1',
+    ]
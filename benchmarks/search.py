@@ -0,0 +1,81 @@
+"""
+Latency of searching the menu of a large semantic layer.
+
+Indexes a number of synthetic dimensions (200k by default), named the way
+extracted ones are, ``schema.table.column``, and times searches:
+
+    python -m benchmarks.search --dimensions 200000
+"""
+
+import json
+import random
+from typing import Dict
+
+import click
+
+from allstars.core.dimension import Dimension
+from allstars.core.search_index import SearchIndex
+
+from benchmarks.pipeline import measure
+
+WORDS = [
+    "sales",
+    "order",
+    "customer",
+    "price",
+    "amount",
+    "date",
+    "region",
+    "product",
+    "user",
+    "country",
+    "revenue",
+    "store",
+    "unit",
+    "discount",
+    "shipping",
+    "status",
+]
+
+SEARCHES = ["s", "sal", "sales", "sales pri", "rev reg", "t123", "nope"]
+
+
+def create_index(count: int, seed: int = 42) -> SearchIndex:
+    rng = random.Random(seed)
+    index = SearchIndex()
+    for i in range(count):
+        table = f"t{i // 50}_{rng.choice(WORDS)}"
+        column = "_".join(rng.sample(WORDS, 2)) + str(i % 50)
+        key = f"main.{table}.{column}"
+        relation_key = f"main.{table}"
+        index.add(
+            "dimension",
+            Dimension(key=key, expression=key, relation_key=relation_key),
+        )
+    return index
+
+
+@click.command()
+@click.option("--dimensions", type=int, default=200000, help="Objects indexed.")
+@click.option("--repeat", type=int, default=100, help="Runs per search.")
+@click.option("--output", default=None, help="Write results as JSON.")
+def main(dimensions, repeat, output):
+    results: Dict[str, Dict[str, float]] = {}
+    results["build"] = measure(lambda: create_index(dimensions), 1)
+    index = create_index(dimensions)
+    for text in SEARCHES:
+        results[f"search[{text}]"] = measure(lambda: index.search(text), repeat)
+
+    for name, timing in results.items():
+        click.echo(
+            f"{name:<18} median {timing['median'] * 1000:>10.3f}ms "
+            f"min {timing['min'] * 1000:>10.3f}ms"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"results": {"search": results}}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
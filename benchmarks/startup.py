@@ -0,0 +1,107 @@
+"""
+Startup time of the CLI.
+
+Each command runs in a fresh interpreter, timing the whole process and
+listing which heavy modules it ended up importing:
+
+    python -m benchmarks.startup --repeat 10 --output startup.json
+
+``python`` (an empty interpreter) is the floor the other timings compare to.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import click
+
+# modules that are slow to import, and shouldn't be unless needed
+HEAVY_MODULES = ["sqlalchemy", "sqlglot", "yaml", "pandas", "pyarrow"]
+
+WRAPPER = f"""
+import atexit, sys
+atexit.register(
+    lambda: sys.stderr.write(
+        "MODULES " + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules)
+    )
+)
+from allstars.cli import cli
+cli()
+"""
+
+COMMANDS: Dict[str, List[str]] = {
+    "python": ["-c", "pass"],
+    "import": ["-c", "import allstars.cli"],
+    "--help": ["-c", WRAPPER, "--help"],
+    "read": ["-c", WRAPPER, "read"],
+}
+
+
+def create_project(folder: str) -> None:
+    """
+    A small project, so that ``read`` has something to load.
+    """
+    from benchmarks.schema import SCALES, create_schema, enrich
+    from allstars.core.semantic_layer import SemanticLayer
+    from allstars.database_interface import DatabaseInterface
+
+    scale = SCALES["small"]
+    url = create_schema(os.path.join(folder, "startup.db"), scale)
+    semantic_layer = SemanticLayer()
+    semantic_layer.load_relations_from_schema("main", DatabaseInterface(url))
+    enrich(semantic_layer, scale)
+    semantic_layer.compile_to_files(folder)
+
+
+def run_command(arguments: List[str], env: Dict[str, str], repeat: int):
+    timings = []
+    modules = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, *arguments],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(time.perf_counter() - start)
+        _, _, modules = process.stderr.rpartition("MODULES ")
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "runs": repeat,
+        "modules": [m for m in modules.strip().split(",") if m],
+    }
+
+
+@click.command()
+@click.option("--repeat", type=int, default=10, help="Runs per command.")
+@click.option("--output", default=None, help="Write results as JSON.")
+def main(repeat, output):
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        create_project(folder)
+        env = {**os.environ, "ALLSTARS_FOLDER": folder}
+        for name, arguments in COMMANDS.items():
+            results[name] = run_command(arguments, env, repeat)
+
+    for name, timing in results.items():
+        click.echo(
+            f"{name:<8} median {timing['median'] * 1000:>8.1f}ms "
+            f"min {timing['min'] * 1000:>8.1f}ms  "
+            f"imports: {', '.join(timing['modules']) or '-'}"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"results": {"startup": results}}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Time to validate a large semantic layer.
+
+Builds a semantic layer with a number of synthetic metrics (100k by
+default), spread over relations of 50 columns, and times validating it cold,
+without a parse cache, then again with the cache written by the first run:
+
+    python -m benchmarks.validation --metrics 100000
+"""
+
+import json
+import os
+import tempfile
+from typing import Dict
+
+import click
+
+from allstars.core import validation
+from allstars.core.base import SerializableCollection
+from allstars.core.metric import Metric
+from allstars.core.relation import Column, Relation
+from allstars.core.semantic_layer import SemanticLayer
+
+from benchmarks.pipeline import measure
+
+COLUMNS = 50
+AGGREGATES = ["SUM", "MIN", "MAX", "AVG", "COUNT"]
+
+
+def create_semantic_layer(count: int) -> SemanticLayer:
+    """
+    A semantic layer with ``count`` metrics, all of them distinct.
+    """
+    relations = [
+        Relation(
+            database_schema="main",
+            reference=f"t{i}",
+            relation_type="table",
+            columns=SerializableCollection(
+                [
+                    Column(key=f"c{j}", name=f"c{j}", data_type="INTEGER")
+                    for j in range(COLUMNS)
+                ]
+            ),
+        )
+        for i in range(count // (COLUMNS * len(AGGREGATES)) + 1)
+    ]
+    metrics = []
+    for i in range(count):
+        table, column = divmod(i, COLUMNS)
+        aggregate = AGGREGATES[table % len(AGGREGATES)]
+        relation = relations[table // len(AGGREGATES)]
+        metrics.append(
+            Metric(
+                key=f"metric_{i}",
+                expression=f"{aggregate}(c{column}) + {table}",
+                relation_key=relation.key,
+            )
+        )
+    return SemanticLayer(
+        relations=SerializableCollection(relations),
+        metrics=SerializableCollection(metrics),
+    )
+
+
+def run(count: int, processes=None) -> Dict[str, Dict[str, float]]:
+    semantic_layer = create_semantic_layer(count)
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = os.path.join(workdir, "cache.json")
+        reports = []
+
+        def validate():
+            reports.append(
+                validation.validate(semantic_layer, cache_file, processes)
+            )
+
+        results["cold"] = measure(validate, 1)
+        results["cached"] = measure(validate, 1)
+
+    for name, report in zip(results, reports):
+        if not report.ok:
+            raise RuntimeError(f"Unexpected errors: {report.errors[:5]}")
+        results[name].update(parsed=report.parsed, cached=report.cached)
+    return results
+
+
+@click.command()
+@click.option("--metrics", type=int, default=100000, help="Metrics validated.")
+@click.option("--processes", type=int, default=None, help="Parsing processes.")
+@click.option("--output", default=None, help="Write results as JSON.")
+def main(metrics, processes, output):
+    results = run(metrics, processes)
+    for name, timing in results.items():
+        click.echo(
+            f"{name:<8} {timing['median']:>8.3f}s "
+            f"({timing['parsed']} parsed, {timing['cached']} cached)"
+        )
+
+    if output:
+        with open(output, "w") as file:
+            json.dump({"results": {"validation": results}}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from benchmarks.pipeline import compare, run_scale
+from benchmarks.schema import Scale
+from benchmarks.validation import run as run_validation
+
+
+def test_run_scale(tmp_path: Path) -> None:
+    """
+    The benchmarks run against a tiny schema.
+    """
+    scale = Scale("tiny", stars=1, attributes=1, rows=10)
+    results = run_scale(scale, str(tmp_path), repeat=1, iterations=1)
+
+    assert set(results) == {
+        "extract",
+        "infer_joins",
+        "compile_to_files",
+        "from_folder",
+        "transpile_cold",
+        "transpile[0]",
+        "transpile[1]",
+        "transpile[2]",
+        "cursor",
+    }
+    assert results["cursor"]["queries_per_second"] > 0
+
+
+def test_compare() -> None:
+    """
+    Timings slower than the baseline by more than the threshold are reported.
+    """
+    baseline = {"results": {"small": {"a": {"median": 1.0}, "b": {"median": 1.0}}}}
+    results = {
+        "results": {
+            "small": {"a": {"median": 1.1}, "b": {"median": 1.5}, "c": {"median": 9}}
+        }
+    }
+
+    assert compare(results, baseline, 0.2) == [
+        "small/b: 1000.000ms -> 1500.000ms (1.50x)"
+    ]
+
+
+def test_run_validation() -> None:
+    """
+    The validation benchmark parses cold, then only hits the cache.
+    """
+    results = run_validation(300, processes=1)
+
+    assert (results["cold"]["parsed"], results["cold"]["cached"]) == (300, 0)
+    assert (results["cached"]["parsed"], results["cached"]["cached"]) == (0, 300)
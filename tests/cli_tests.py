@@ -0,0 +1,231 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy.engine import Engine
+
+from allstars import config
+from allstars.cli import cli
+from allstars.core.semantic_layer import SemanticLayer
+
+
+@pytest.fixture
+def project(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    database_url: str,
+) -> Path:
+    """
+    A project folder on top of the test DB.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+    monkeypatch.setattr(config, "ALLSTARS_FOLDER", str(tmp_path))
+    monkeypatch.setattr(config, "ALLSTARS_SQLA_CONN", database_url)
+    return tmp_path
+
+
+QUERY = """
+SELECT "main.dim_user.name" AS name, "revenue" AS revenue
+FROM super
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+def test_sql_csv(project: Path) -> None:
+    """
+    Results are written as CSV by default.
+    """
+    result = CliRunner().invoke(cli, ["sql", QUERY, "--batch-size", "1"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout.splitlines() == [
+        "name,revenue",
+        "Alice,42",
+        "Bob,100",
+    ]
+
+
+def test_sql_jsonl(project: Path) -> None:
+    """
+    Results can be written as JSON Lines.
+    """
+    result = CliRunner().invoke(cli, ["sql", QUERY, "--format", "jsonl"])
+
+    assert result.exit_code == 0, result.output
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [
+        {"name": "Alice", "revenue": 42},
+        {"name": "Bob", "revenue": 100},
+    ]
+
+
+def test_sql_arrow(project: Path) -> None:
+    """
+    Results can be written as an Arrow IPC stream.
+    """
+    pa = pytest.importorskip("pyarrow")
+    result = CliRunner().invoke(
+        cli,
+        ["sql", QUERY, "--format", "arrow", "--batch-size", "1"],
+    )
+
+    assert result.exit_code == 0
+    table = pa.ipc.open_stream(result.stdout_bytes).read_all()
+    assert table.to_pylist() == [
+        {"name": "Alice", "revenue": 42},
+        {"name": "Bob", "revenue": 100},
+    ]
+
+
+def test_sql_explain(project: Path) -> None:
+    """
+    ``--explain`` prints the transpiled query without running it.
+    """
+    result = CliRunner().invoke(cli, ["sql", 'SELECT "revenue" FROM super', "--explain"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "SELECT SUM(main.sales.price) FROM main.sales\n"
+
+
+def test_sql_timing(project: Path) -> None:
+    """
+    ``--timing`` reports phase timings on stderr.
+    """
+    result = CliRunner().invoke(cli, ["sql", QUERY, "--timing"])
+
+    assert result.exit_code == 0, result.stderr
+    assert result.stdout.splitlines()[0] == "name,revenue"
+    lines = [
+        line for line in result.stderr.splitlines() if not line.startswith("Loading")
+    ]
+    assert lines[0].startswith("parse: ")
+    assert lines[-1].endswith("2 rows, 24 bytes")
+
+
+def test_lazy_imports(project: Path, database_url: str) -> None:
+    """
+    Starting the CLI, or reading the project, doesn't import the heavy
+    dependencies.
+    """
+    code = (
+        "import sys; import allstars.cli; "
+        "print(sorted({'sqlalchemy', 'sqlglot', 'yaml', 'pandas'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+    code = (
+        "import sys; from allstars.cli import read; "
+        "read.main(['--key', 'main.sales'], standalone_mode=False); "
+        "print(sorted({'sqlalchemy', 'sqlglot'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={
+            **os.environ,
+            "ALLSTARS_FOLDER": str(project),
+            "ALLSTARS_SQLA_CONN": database_url,
+        },
+    )
+    assert "main.sales" in result.stdout
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_validate(project: Path) -> None:
+    """
+    Projects loaded from their folder are validated.
+    """
+    result = CliRunner().invoke(cli, ["validate", "--no-cache"])
+
+    assert result.exit_code == 0, result.output
+    assert "Validated 12 objects, 0 error(s)" in result.stdout
+
+    with open(project / "metrics.yaml", "a") as file:
+        file.write(
+            "- key: typo\n"
+            "  expression: SUM(prize)\n"
+            "  relation_keys: [main.sales]\n"
+        )
+    result = CliRunner().invoke(cli, ["validate", "--no-cache"])
+    assert result.exit_code == 1
+    assert "prize" in result.stdout
+
+
+def test_search(project: Path) -> None:
+    """
+    The menu can be searched.
+    """
+    result = CliRunner().invoke(cli, ["search", "rev", "--kind", "metric"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout.splitlines() == [
+        "metric     revenue",
+        "metric     revenue_per_sale",
+    ]
+
+
+def test_statistics(project: Path) -> None:
+    """
+    Statistics are collected, written along with the project, and refreshed.
+    """
+    result = CliRunner().invoke(cli, ["statistics"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout.splitlines() == [
+        "main.dim_user: 2 rows",
+        "main.sales: 2 rows",
+        "Refreshed statistics of 2 relation(s)",
+    ]
+    loaded = SemanticLayer.from_folder(str(project))
+    assert loaded.get_row_count("main.sales") == 2
+
+    result = CliRunner().invoke(cli, ["statistics", "--max-age", "24"])
+    assert result.stdout.splitlines() == ["Refreshed statistics of 0 relation(s)"]
+
+
+def test_recommend(project: Path) -> None:
+    """
+    Recommended rollups are added to the existing ones, left as edited.
+    """
+    log_file = project / "queries.jsonl"
+    entry = {
+        "query": 'SELECT "main.dim_user.country", "revenue" FROM super GROUP BY 1',
+        "parameters": None,
+        "phases": {"execute": 1.0, "fetch": 1.0},
+    }
+    log_file.write_text("\n".join(json.dumps(entry) for _ in range(2)))
+
+    result = CliRunner().invoke(cli, ["recommend", str(log_file)])
+    assert result.exit_code == 0, result.output
+    assert "Recommended 1 rollup(s), 1 new" in result.stdout
+    loaded = SemanticLayer.from_folder(str(project))
+    (rollup,) = loaded.rollups
+
+    # edited by hand, then recommended again
+    rollup.label = "Revenue by country"
+    loaded.rollups.to_yaml_file(str(project / "rollups.yaml"), wrap_under="rollups")
+    modified = (project / "rollups.yaml").stat().st_mtime_ns
+    result = CliRunner().invoke(cli, ["recommend", str(log_file)])
+    assert result.exit_code == 0, result.output
+    assert "Recommended 1 rollup(s), 0 new" in result.stdout
+    assert "already defined" in result.stdout
+    assert (project / "rollups.yaml").stat().st_mtime_ns == modified
+
+    result = CliRunner().invoke(cli, ["recommend", str(log_file), "--write"])
+    assert result.exit_code == 0, result.output
+    loaded = SemanticLayer.from_folder(str(project))
+    assert loaded.rollups[rollup.key].label == "Revenue by country"
@@ -1,17 +1,35 @@
-import os
+from pathlib import Path
 
 import pytest
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
 
+from allstars.core.base import SerializableCollection
+from allstars.core.metric import Metric
+from allstars.core.relation import Column, Relation
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql import transpile
+
+ENDLESS_QUERY = """
+WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c)
+SELECT COUNT(*) FROM c
+"""
+
 
 @pytest.fixture
-def engine() -> Engine:
+def database_url(tmp_path: Path) -> str:
+    """
+    The URL of the test DB, in a temporary directory.
+    """
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+@pytest.fixture
+def engine(database_url: str) -> Engine:
     """
     Create an SQL All ⭐ Stars DB on top of SQLite.
     """
-    os.unlink("test.db")
-    engine = create_engine("sqlite:///test.db")
+    engine = create_engine(database_url)
     connection = engine.connect()
     connection.execute(
         text(
@@ -41,3 +59,63 @@ def engine() -> Engine:
     connection.commit()
 
     return engine
+
+
+@pytest.fixture
+def semantic_layer() -> SemanticLayer:
+    """
+    A semantic layer on top of the test DB.
+    """
+    relations = [
+        Relation(
+            database_schema="main",
+            reference="dim_user",
+            relation_type="table",
+            columns=SerializableCollection(
+                [
+                    Column(key="id", name="id", data_type="INTEGER"),
+                    Column(key="name", name="name", data_type="TEXT"),
+                    Column(key="country", name="country", data_type="TEXT"),
+                ]
+            ),
+        ),
+        Relation(
+            database_schema="main",
+            reference="sales",
+            relation_type="table",
+            columns=SerializableCollection(
+                [
+                    Column(key="id", name="id", data_type="INTEGER"),
+                    Column(key="user_id", name="user_id", data_type="INTEGER"),
+                    Column(key="price", name="price", data_type="INTEGER"),
+                ]
+            ),
+        ),
+    ]
+    semantic_layer = SemanticLayer(relations=SerializableCollection(relations))
+    semantic_layer.infer_metrics()
+    semantic_layer.infer_dimensions()
+    semantic_layer.metrics.append(
+        Metric(key="revenue", expression="SUM(price)", relation_key="main.sales")
+    )
+    semantic_layer.metrics.append(
+        Metric(
+            key="revenue_per_sale",
+            expression='"revenue" / "main.sales.count"',
+            relation_key="main.sales",
+        )
+    )
+
+    return semantic_layer
+
+
+@pytest.fixture
+def endless_query(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Make every semantic query transpile into a query that never ends.
+    """
+    monkeypatch.setattr(
+        transpile,
+        "compile_query",
+        lambda *args, **kwargs: transpile.CompiledQuery(ENDLESS_QUERY),
+    )
@@ -0,0 +1,93 @@
+from allstars.core.base import SerializableCollection
+from allstars.core.dependency_index import find_identifiers
+from allstars.core.folder import Folder
+from allstars.core.metric import Metric
+from allstars.core.relation import Column, Relation
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_find_identifiers() -> None:
+    """
+    Identifiers are found outside of strings, quoted or not.
+    """
+    assert find_identifiers(
+        """SUM(price) FILTER (WHERE country = 'it''s "x"') / "main.sales.count\""""
+    ) == {"SUM", "price", "FILTER", "WHERE", "country", "main.sales.count"}
+
+
+def test_dependencies(semantic_layer: SemanticLayer) -> None:
+    """
+    Objects depend on their relations, the columns and objects they reference.
+    """
+    semantic_layer.folders.append(Folder(key="finance"))
+    semantic_layer.metrics["revenue"].folder_key = "finance"
+    index = semantic_layer.get_dependency_index()
+
+    assert index.dependencies("metric", "revenue") == {
+        ("relation", "main.sales"),
+        ("column", "main.sales.price"),
+        ("folder", "finance"),
+    }
+    assert index.dependencies("metric", "revenue_per_sale") == {
+        ("relation", "main.sales"),
+        ("metric", "revenue"),
+        ("metric", "main.sales.count"),
+    }
+    assert index.dependents("column", "main.sales.price") == {
+        ("metric", "revenue"),
+        ("dimension", "main.sales.price"),
+    }
+    assert index.dependents("folder", "finance") == {("metric", "revenue")}
+    assert index.get_relation_keys([("metric", "revenue")]) == {"main.sales"}
+
+
+def test_impact(semantic_layer: SemanticLayer) -> None:
+    """
+    Impact analysis follows dependencies transitively.
+    """
+    index = semantic_layer.get_dependency_index()
+
+    assert index.impact([("column", "main.sales.price")]) == {
+        ("metric", "revenue"),
+        ("metric", "revenue_per_sale"),
+        ("dimension", "main.sales.price"),
+    }
+    assert index.impact_keys(["revenue"]) == {"revenue", "revenue_per_sale"}
+
+
+def test_maintained(semantic_layer: SemanticLayer) -> None:
+    """
+    The index is kept up to date by updates and upserts.
+    """
+    index = semantic_layer.get_dependency_index()
+
+    semantic_layer.update(
+        "metrics",
+        [Metric(key="revenue", expression="SUM(id)", relation_key="main.sales")],
+    )
+    assert ("column", "main.sales.id") in index.dependencies("metric", "revenue")
+    assert ("metric", "revenue") not in index.dependents(
+        "column", "main.sales.price"
+    )
+
+    semantic_layer.update("metrics", removed=["revenue_per_sale"])
+    assert index.dependents("metric", "revenue") == set()
+
+    # a column disappearing from its relation
+    other = SemanticLayer(
+        relations=SerializableCollection(
+            [
+                Relation(
+                    database_schema="main",
+                    reference="sales",
+                    relation_type="table",
+                    columns=SerializableCollection(
+                        [Column(key="price", name="price", data_type="INTEGER")]
+                    ),
+                )
+            ]
+        )
+    )
+    semantic_layer.upsert(other)
+    assert index.dependencies("column", "main.sales.id") == set()
+    assert index.dependencies("metric", "revenue") == {("relation", "main.sales")}
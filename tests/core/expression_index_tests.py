@@ -0,0 +1,93 @@
+from allstars.core.metric import Metric
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_expression_index(semantic_layer: SemanticLayer) -> None:
+    """
+    Expressions are parsed once, qualified and nested metrics inlined.
+    """
+    index = semantic_layer.get_expression_index()
+
+    assert index is semantic_layer.get_expression_index()
+    assert len(index) == len(semantic_layer.metrics) + len(semantic_layer.dimensions)
+
+    expression, relation_keys = index.resolve("revenue_per_sale")
+    assert expression.sql() == "SUM(main.sales.price) / COUNT(*)"
+    assert relation_keys == ["main.sales"]
+
+    # resolving returns a copy that can be spliced safely
+    expression.set("this", None)
+    assert index.resolve("revenue_per_sale")[0].sql() == (
+        "SUM(main.sales.price) / COUNT(*)"
+    )
+
+    assert index.resolve("nope") is None
+
+
+def test_expression_index_precedence(semantic_layer: SemanticLayer) -> None:
+    """
+    Inlined metrics keep their grouping in the expressions using them.
+    """
+    for key, expression in [
+        ("net", '"revenue" - 1'),
+        ("ratio", '"net" / "revenue_per_sale"'),
+        ("flag", '"net" > 0 AND "revenue" > 1'),
+    ]:
+        semantic_layer.metrics.append(
+            Metric(key=key, expression=expression, relation_key="main.sales")
+        )
+    index = semantic_layer.get_expression_index()
+
+    assert index.expressions["ratio"].sql() == (
+        "(SUM(main.sales.price) - 1) / (SUM(main.sales.price) / COUNT(*))"
+    )
+    assert index.expressions["flag"].sql() == (
+        "SUM(main.sales.price) - 1 > 0 AND SUM(main.sales.price) > 1"
+    )
+
+
+def test_expression_index_upsert(semantic_layer: SemanticLayer) -> None:
+    """
+    The index is rebuilt after the semantic layer changes.
+    """
+    index = semantic_layer.get_expression_index()
+    semantic_layer.upsert(SemanticLayer())
+
+    assert semantic_layer.get_expression_index() is not index
+
+
+def test_expression_index_forward_reference(semantic_layer: SemanticLayer) -> None:
+    """
+    Expressions referencing a key added later are resolved once it's added.
+    """
+    semantic_layer.metrics.append(
+        Metric(key="margin", expression='"profit" / "revenue"', relation_key="main.sales")
+    )
+    index = semantic_layer.get_expression_index()
+    assert index.dependencies["margin"] == {"revenue"}
+
+    semantic_layer.update(
+        "metrics",
+        [Metric(key="profit", expression="SUM(price) - 1", relation_key="main.sales")],
+    )
+    index = semantic_layer.get_expression_index()
+    assert index.dependencies["margin"] == {"profit", "revenue"}
+    assert index.expressions["margin"].sql() == (
+        "(SUM(main.sales.price) - 1) / SUM(main.sales.price)"
+    )
+
+
+def test_expression_index_errors(semantic_layer: SemanticLayer) -> None:
+    """
+    Invalid expressions are recorded instead of failing the whole load.
+    """
+    semantic_layer.metrics.append(
+        Metric(key="broken", expression="SUM(price", relation_key="main.sales")
+    )
+    semantic_layer.metrics.append(
+        Metric(key="uses_broken", expression='"broken" * 2', relation_key="main.sales")
+    )
+    index = semantic_layer.get_expression_index()
+
+    assert "broken" not in index
+    assert index.errors["uses_broken"] == "references invalid expression broken"
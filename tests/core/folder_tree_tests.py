@@ -0,0 +1,156 @@
+import pytest
+
+from allstars.core import validation
+from allstars.core.dimension import Dimension
+from allstars.core.folder import Folder
+from allstars.core.folder_tree import FolderTree
+from allstars.core.metric import Metric
+from allstars.core.semantic_layer import SemanticLayer
+
+
+@pytest.fixture
+def semantic_layer_with_folders(semantic_layer: SemanticLayer) -> SemanticLayer:
+    for key, parent in [
+        ("finance", None),
+        ("billing", "finance"),
+        ("invoices", "billing"),
+        ("marketing", None),
+    ]:
+        semantic_layer.folders.append(Folder(key=key, parent_folder_key=parent))
+    semantic_layer.metrics["revenue"].folder_key = "finance"
+    semantic_layer.dimensions.append(
+        Dimension(
+            key="invoice_date",
+            expression="date",
+            relation_key="main.sales",
+            folder_key="invoices",
+        )
+    )
+    return semantic_layer
+
+
+def test_folder_tree(semantic_layer_with_folders: SemanticLayer) -> None:
+    """
+    Children, paths and items are indexed.
+    """
+    tree = semantic_layer_with_folders.get_folder_tree()
+
+    assert tree.roots() == ["finance", "marketing"]
+    assert tree.children("finance") == ["billing"]
+    assert tree.children("marketing") == []
+    assert tree.path("invoices") == ["finance", "billing", "invoices"]
+    assert tree.ancestors("invoices") == ["billing", "finance"]
+    assert tree.depth("invoices") == 2
+    assert tree.is_ancestor("finance", "invoices")
+    assert not tree.is_ancestor("invoices", "finance")
+    assert list(tree.subtree("finance")) == ["finance", "billing", "invoices"]
+
+    assert tree.items("finance") == [("metric", "revenue")]
+    assert tree.items("finance", recursive=True) == [
+        ("metric", "revenue"),
+        ("dimension", "invoice_date"),
+    ]
+    assert tree.items("finance", recursive=True, kinds=["dimension"]) == [
+        ("dimension", "invoice_date"),
+    ]
+    assert tree.folder_of("dimension", "invoice_date") == "invoices"
+
+
+def test_folder_tree_edits() -> None:
+    """
+    Folders can be added in any order, moved and removed.
+    """
+    tree = FolderTree([Folder(key="child", parent_folder_key="parent")])
+    assert tree.roots() == ["child"]
+    assert tree.path("child") == ["child"]
+
+    tree.add(Folder(key="parent"))
+    assert tree.roots() == ["parent"]
+    assert tree.path("child") == ["parent", "child"]
+
+    tree.add(Folder(key="other"))
+    tree.move("parent", "other")
+    assert tree.path("child") == ["other", "parent", "child"]
+    with pytest.raises(ValueError):
+        tree.move("other", "child")
+
+    tree.remove("parent")
+    assert tree.roots() == ["other", "child"]
+    assert tree.path("child") == ["child"]
+    assert "parent" not in tree
+    assert len(tree) == 2
+
+
+def test_folder_tree_maintained(semantic_layer_with_folders: SemanticLayer) -> None:
+    """
+    The tree is kept up to date by updates, and shared with search.
+    """
+    sl = semantic_layer_with_folders
+    tree = sl.get_folder_tree()
+    index = sl.get_search_index()
+
+    sl.update("folders", [Folder(key="billing", parent_folder_key="marketing")])
+    assert tree.path("invoices") == ["marketing", "billing", "invoices"]
+    assert [r.key for r in index.search("invoice", folder_key="marketing")] == [
+        "invoice_date"
+    ]
+
+    sl.update(
+        "metrics",
+        [
+            Metric(
+                key="profit",
+                expression="SUM(price)",
+                relation_key="main.sales",
+                folder_key="billing",
+            )
+        ],
+        removed=["revenue"],
+    )
+    assert tree.items("finance") == []
+    assert tree.items("billing") == [("metric", "profit")]
+
+
+def test_flatten_deep_folders() -> None:
+    """
+    Nested folders are flattened depth first, however deep.
+    """
+    nested = {"key": "f0", "folders": []}
+    current = nested
+    for i in range(1, 2000):
+        child = {"key": f"f{i}", "folders": []}
+        current["folders"].append(child)
+        current = child
+
+    folders = []
+    Folder.from_dict(nested).flatten(folders)
+    tree = FolderTree(folders)
+    assert len(tree) == 2000
+    assert tree.depth("f1999") == 1999
+
+
+def test_folder_cycles(semantic_layer: SemanticLayer) -> None:
+    """
+    Folders whose parent makes a cycle are listed with the roots, reported by
+    validation, and moved back under their parent once the cycle is broken.
+    """
+    semantic_layer.folders.append(Folder(key="a", parent_folder_key="b"))
+    semantic_layer.folders.append(Folder(key="b", parent_folder_key="a"))
+    semantic_layer.metrics["revenue"].folder_key = "a"
+
+    index = semantic_layer.get_search_index()
+    tree = semantic_layer.get_folder_tree()
+    assert tree.roots() == ["b"]
+    assert tree.path("a") == ["b", "a"]
+    assert tree.cycles() == {"b": "a"}
+    assert [r.key for r in index.search("revenue", folder_key="b")] == ["revenue"]
+
+    report = validation.validate(semantic_layer)
+    assert [(e.object_type, e.key, e.code, e.reference) for e in report.errors] == [
+        ("folders", "b", "folder_cycle", "a")
+    ]
+
+    semantic_layer.update("folders", [Folder(key="a")])
+    assert tree.cycles() == {}
+    assert tree.roots() == ["a"]
+    assert tree.path("b") == ["a", "b"]
@@ -0,0 +1,52 @@
+import pytest
+
+from allstars.core.join import Join
+from allstars.core.join_graph import JoinGraph
+
+
+def make_join(left: str, right: str) -> Join:
+    return Join(
+        left_relation_key=left,
+        right_relation_key=right,
+        join_criteria=f"{left}.{right}_id = {right}.id",
+        cardinality="many_to_one",
+        join_term="LEFT JOIN",
+    )
+
+
+def test_plan() -> None:
+    """
+    Only the joins on the paths to the requested relations are followed.
+    """
+    graph = JoinGraph(
+        [
+            make_join("orders", "customers"),
+            make_join("customers", "regions"),
+            make_join("orders", "products"),
+            make_join("returns", "orders"),
+        ]
+    )
+
+    plan = graph.plan("orders", {"orders", "regions"})
+    assert [(k, term) for k, term, _ in plan] == [
+        ("customers", "LEFT JOIN"),
+        ("regions", "LEFT JOIN"),
+    ]
+
+    plan = graph.plan("orders", {"returns"})
+    assert [(k, term) for k, term, _ in plan] == [("returns", "RIGHT JOIN")]
+
+    condition = graph.condition(plan[0][2])
+    assert condition.sql() == "returns.orders_id = orders.id"
+    assert condition is not graph.condition(plan[0][2])
+
+
+def test_plan_unreachable() -> None:
+    """
+    Relations outside the graph can't be joined.
+    """
+    graph = JoinGraph([make_join("orders", "customers")])
+
+    with pytest.raises(ValueError) as excinfo:
+        graph.plan("orders", {"customers", "inventory"})
+    assert str(excinfo.value) == "inventory cannot be joined with orders"
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from allstars.core.project import Project
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_deferred_database(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Loading a project from its folder doesn't touch the database.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+
+    # the driver isn't even installed
+    project = Project(folder=str(tmp_path), sqla_conn="mysql://")
+    project.load(build_index=False)
+
+    assert project._db is None
+    assert project.semantic_layer._expression_index is None
+    assert "revenue" in project.semantic_layer.metrics
+
+
+def test_load_builds_index(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Projects about to be queried parse their expressions up front.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+
+    project = Project(folder=str(tmp_path), sqla_conn="sqlite://")
+    project.load()
+
+    assert "revenue" in project.semantic_layer.get_expression_index()
+    assert project.db.engine.dialect.name == "sqlite"
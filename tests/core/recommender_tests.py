@@ -0,0 +1,96 @@
+from pathlib import Path
+from typing import Any, Dict, List
+
+from allstars.core.filter import Filter
+from allstars.core.metric import Metric
+from allstars.core.recommender import RollupRecommender
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def entry(query: str, seconds: float = 1.0, **parameters: Any) -> Dict[str, Any]:
+    return {
+        "query": query,
+        "parameters": parameters or None,
+        "phases": {"parse": 0.001, "execute": seconds / 2, "fetch": seconds / 2},
+    }
+
+
+def test_recommend(semantic_layer: SemanticLayer) -> None:
+    """
+    Queries answerable by the same rollup are grouped under it.
+    """
+    entries: List[Dict[str, Any]] = [
+        entry('SELECT "main.dim_user.country", "revenue" FROM super GROUP BY 1'),
+        entry('SELECT "main.dim_user.country", "revenue" FROM super GROUP BY 1'),
+        entry(
+            'SELECT "main.dim_user.country", "main.dim_user.name", "revenue", '
+            '"main.sales.count" FROM super GROUP BY 1, 2'
+        ),
+        entry('SELECT "revenue" AS r FROM super ORDER BY r'),
+        # ad-hoc columns can't be rolled up
+        entry('SELECT SUM("sales.price") FROM super'),
+        entry("SELECT %(x)s FROM", x=1),
+    ]
+    recommender = RollupRecommender(semantic_layer)
+    recommender.add_all(entries)
+    rollups = list(recommender.recommend())
+
+    assert recommender.skipped == 2
+    assert len(rollups) == 1
+    rollup = rollups[0]
+    assert rollup.relation_key == "main.sales"
+    assert rollup.dimensions == ["main.dim_user.country", "main.dim_user.name"]
+    assert rollup.metrics == ["main.sales.count", "revenue"]
+    assert rollup.filters == []
+    assert rollup.queries == 4
+    assert rollup.estimated_savings == 4.0
+
+
+def test_recommend_non_additive(semantic_layer: SemanticLayer) -> None:
+    """
+    Metrics that can't be re-aggregated are only served at their own grain,
+    and rollups are restricted by the filters of the queries they serve.
+    """
+    semantic_layer.metrics.append(
+        Metric(
+            key="buyers",
+            expression="COUNT(DISTINCT user_id)",
+            relation_key="main.sales",
+        )
+    )
+    semantic_layer.filters.append(
+        Filter(key="big_sales", expression="price > 50", relation_key="main.sales")
+    )
+    entries = [
+        entry('SELECT "main.dim_user.country", "buyers" FROM super GROUP BY 1', 3),
+        entry('SELECT "main.dim_user.country", "buyers" FROM super GROUP BY 1', 3),
+        entry('SELECT "buyers" FROM super', 1),
+        entry('SELECT "buyers" FROM super', 1),
+        entry('SELECT "revenue" FROM super WHERE "big_sales"', 0.5),
+        entry('SELECT "revenue" FROM super WHERE "big_sales"', 0.5),
+        entry('SELECT "revenue" FROM super', 5),
+    ]
+    recommender = RollupRecommender(semantic_layer)
+    recommender.add_all(entries)
+    rollups = list(recommender.recommend(min_queries=2))
+
+    assert [(r.dimensions, r.metrics, r.filters, r.queries) for r in rollups] == [
+        (["main.dim_user.country"], ["buyers"], [], 2),
+        ([], ["buyers"], [], 2),
+        ([], ["revenue"], ["big_sales"], 2),
+    ]
+    assert len(list(recommender.recommend(limit=1))) == 1
+
+
+def test_rollups_round_trip(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Recommended rollups are written and loaded along with the project.
+    """
+    recommender = RollupRecommender(semantic_layer)
+    recommender.add_all([entry('SELECT "revenue" FROM super')] * 2)
+    semantic_layer.rollups.upsert(recommender.recommend())
+    semantic_layer.compile_to_files(str(tmp_path))
+
+    assert (tmp_path / "rollups.yaml").exists()
+    loaded = SemanticLayer.from_folder(str(tmp_path))
+    assert list(loaded.rollups) == list(semantic_layer.rollups)
@@ -0,0 +1,93 @@
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from allstars.core.registry import ProjectRegistry
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_registry(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    database_url: str,
+) -> None:
+    """
+    Projects on the same database share its interface and their relations.
+    """
+    for name in ("finance", "sales"):
+        semantic_layer.compile_to_files(str(tmp_path / name))
+
+    registry = ProjectRegistry()
+    finance = registry.register("finance", str(tmp_path / "finance"), database_url)
+    sales = registry.register("sales", str(tmp_path / "sales"), database_url)
+
+    assert list(registry) == ["finance", "sales"]
+    assert finance.db is sales.db
+    finance_relations = finance.semantic_layer.relations
+    sales_relations = sales.semantic_layer.relations
+    for key in ("main.dim_user", "main.sales"):
+        assert finance_relations[key] is sales_relations[key]
+    finance_user = finance.semantic_layer.relations["main.dim_user"]
+    sales_table = sales.semantic_layer.relations["main.sales"]
+    assert finance_user.columns["id"] is sales_table.columns["id"]
+
+    finance_index = finance.semantic_layer.get_expression_index()
+    sales_index = sales.semantic_layer.get_expression_index()
+    for key in ("main.dim_user.name", "revenue_per_sale"):
+        assert finance_index.expressions[key] is sales_index.expressions[key]
+
+    connection = registry.connect("sales")
+    cursor = connection.execute('SELECT "revenue" FROM super')
+    assert cursor.fetchall() == [(142,)]
+    connection.close()
+
+    # the shared engine outlives connections
+    connection = registry.connect("finance")
+    assert connection.execute('SELECT "revenue" FROM super').fetchall() == [(142,)]
+    connection.close()
+    registry.close()
+
+
+def test_registry_unqualified(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    database_url: str,
+) -> None:
+    """
+    Expressions are only shared when qualified the same way.
+    """
+    for name in ("finance", "sales"):
+        semantic_layer.compile_to_files(str(tmp_path / name))
+    (tmp_path / "sales" / "relations" / "main.sales.yaml").unlink()
+
+    registry = ProjectRegistry()
+    finance = registry.register("finance", str(tmp_path / "finance"), database_url)
+    sales = registry.register("sales", str(tmp_path / "sales"), database_url)
+
+    finance_index = finance.semantic_layer.get_expression_index()
+    sales_index = sales.semantic_layer.get_expression_index()
+    assert finance_index.expressions["revenue"].sql() == "SUM(main.sales.price)"
+    assert sales_index.expressions["revenue"].sql() == "SUM(price)"
+    registry.close()
+
+
+def test_compact(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Relations no project uses anymore can be dropped.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+    registry = ProjectRegistry()
+    registry.register("finance", str(tmp_path), "sqlite://", build_index=False)
+    registry.register("sales", str(tmp_path), "sqlite://", build_index=False)
+    assert len(registry._relations) == 2
+
+    registry.remove("finance")
+    registry.compact()
+    assert len(registry._relations) == 2
+
+    registry.remove("sales")
+    registry.compact()
+    assert registry._relations == {}
+    assert registry._columns == {}
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+import yaml
+from sqlalchemy.engine import Engine
+
+from allstars.core.reload import FolderWatcher
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.cache import QueryCache
+from allstars.sql.transpile import compile_query
+
+
+@pytest.fixture
+def live(semantic_layer: SemanticLayer, tmp_path: Path) -> SemanticLayer:
+    """
+    A semantic layer loaded from a folder, ready to be queried.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+    live = SemanticLayer.from_folder(str(tmp_path))
+    live.get_expression_index()
+    return live
+
+
+def edit_metrics(folder: Path, **expressions: str) -> None:
+    filename = folder / "metrics.yaml"
+    data = yaml.safe_load(filename.read_text())
+    for metric in data["metrics"]:
+        if metric["key"] in expressions:
+            metric["expression"] = expressions[metric["key"]]
+    filename.write_text(yaml.dump(data, sort_keys=False))
+
+
+def test_reload_metrics(live: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Only changed expressions, and those inlining them, are parsed again.
+    """
+    watcher = FolderWatcher(live, str(tmp_path))
+    assert watcher.poll() == set()
+
+    before = live.get_expression_index()
+    edit_metrics(tmp_path, revenue="SUM(price) * 2")
+    assert watcher.poll() == {"revenue"}
+
+    index = live.get_expression_index()
+    assert index is not before
+    assert live.metrics["revenue"].expression == "SUM(price) * 2"
+    assert "* 2" in index.expressions["revenue_per_sale"].sql()
+    assert "* 2" not in before.expressions["revenue_per_sale"].sql()
+    assert index.expressions["main.sales.count"] is before.expressions[
+        "main.sales.count"
+    ]
+
+
+def test_reload_invalidates_dependents(
+    engine: Engine,
+    live: SemanticLayer,
+    tmp_path: Path,
+) -> None:
+    """
+    Cached queries depending on changed objects are invalidated, others kept.
+    """
+    cache = QueryCache()
+    revenue = 'SELECT "main.dim_user.name", "revenue" FROM super GROUP BY 1'
+    count = 'SELECT "main.sales.count" FROM super'
+    for query in (revenue, count):
+        compile_query(engine, query, semantic_layer=live, cache=cache)
+
+    watcher = FolderWatcher(live, str(tmp_path), on_change=cache.invalidate)
+    edit_metrics(tmp_path, revenue="SUM(price) * 2")
+    watcher.poll()
+
+    assert len(cache) == 1
+    compiled = compile_query(engine, revenue, semantic_layer=live, cache=cache)
+    assert "* 2" in compiled.sql
+
+
+def test_reload_relations(live: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Relation files can be removed, and added back.
+    """
+    watcher = FolderWatcher(live, str(tmp_path))
+    filename = tmp_path / "relations" / "main.dim_user.yaml"
+    contents = filename.read_text()
+
+    filename.unlink()
+    assert watcher.poll() == {"main.dim_user"}
+    assert "main.dim_user" not in live.relations
+
+    filename.write_text(contents)
+    assert watcher.poll() == {"main.dim_user"}
+    assert "main.dim_user" in live.relations
+
+
+def test_reload_invalid_file(live: SemanticLayer, tmp_path: Path) -> None:
+    """
+    A file that can't be parsed leaves the semantic layer as it was.
+    """
+    watcher = FolderWatcher(live, str(tmp_path))
+    (tmp_path / "metrics.yaml").write_text("metrics: [")
+
+    assert watcher.poll() == set()
+    assert "revenue" in live.metrics
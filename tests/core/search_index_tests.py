@@ -0,0 +1,146 @@
+from allstars.core.dimension import Dimension
+from allstars.core.folder import Folder
+from allstars.core.metric import Metric
+from allstars.core.search_index import SearchIndex, tokenize
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_tokenize() -> None:
+    assert tokenize("main.sales.Unit_Price") == ["main", "sales", "unit", "price"]
+    assert tokenize(None) == []
+    assert tokenize("Café Straße 売上高") == ["café", "strasse", "売上高"]
+
+
+def test_search_unicode() -> None:
+    """
+    Labels and descriptions in any script can be searched.
+    """
+    index = SearchIndex()
+    index.add(
+        "metric",
+        Metric(
+            key="revenue",
+            expression="SUM(price)",
+            relation_key="main.sales",
+            label="Chiffre d'affaires du café",
+            description="売上高",
+        ),
+    )
+    for text in ("CAFÉ", "caf", "売上", "affaires"):
+        assert [r.key for r in index.search(text)] == ["revenue"], text
+
+
+def test_search(semantic_layer: SemanticLayer) -> None:
+    """
+    Words are prefixes of tokens; keys rank above labels and descriptions.
+    """
+    semantic_layer.metrics.append(
+        Metric(
+            key="arpu",
+            label="Average revenue per user",
+            expression='"revenue" / COUNT(DISTINCT user_id)',
+            relation_key="main.sales",
+        )
+    )
+    index = semantic_layer.get_search_index()
+
+    assert [r.key for r in index.search("rev")] == [
+        "revenue",
+        "revenue_per_sale",
+        "arpu",
+    ]
+    assert [r.key for r in index.search("revenue sale")] == ["revenue_per_sale"]
+    assert [r.key for r in index.search("user", kinds=["metric"])] == [
+        "main.dim_user.count",
+        "arpu",
+    ]
+    assert [r.key for r in index.search("main", limit=2)] == [
+        "main.sales.id",
+        "main.dim_user.id",
+    ]
+    assert index.search("nope") == []
+    assert index.search("") == []
+
+
+def test_search_folders() -> None:
+    """
+    Searches can be restricted to a folder and its subfolders.
+    """
+    semantic_layer = SemanticLayer()
+    semantic_layer.folders.append(Folder(key="finance"))
+    semantic_layer.folders.append(Folder(key="billing", parent_folder_key="finance"))
+    semantic_layer.folders.append(Folder(key="marketing"))
+    for key, folder_key in [("fees", "billing"), ("fee_campaigns", "marketing")]:
+        semantic_layer.dimensions.append(
+            Dimension(
+                key=key,
+                expression=key,
+                relation_key="main.sales",
+                folder_key=folder_key,
+            )
+        )
+    index = semantic_layer.get_search_index()
+
+    assert [r.key for r in index.search("fee", folder_key="finance")] == ["fees"]
+    assert [r.key for r in index.search("fee", folder_key="marketing")] == [
+        "fee_campaigns"
+    ]
+
+
+def test_maintained(semantic_layer: SemanticLayer) -> None:
+    """
+    The index is kept up to date by updates.
+    """
+    index = semantic_layer.get_search_index()
+    semantic_layer.update(
+        "metrics",
+        [Metric(key="profit", expression="SUM(price)", relation_key="main.sales")],
+        removed=["revenue"],
+    )
+
+    assert [r.key for r in index.search("profit")] == ["profit"]
+    assert [r.key for r in index.search("revenue")] == ["revenue_per_sale"]
+
+
+def test_ranking_stops_early() -> None:
+    """
+    Results are the same as scoring everything, however many objects match.
+    """
+    index = SearchIndex()
+    for i in range(1000):
+        index.add(
+            "dimension",
+            Dimension(key=f"t{i}.sales_{i % 7}", expression="1", relation_key="t"),
+        )
+
+    results = index.search("sales 3", limit=5)
+    assert [r.key for r in results] == [
+        "t3.sales_3",
+        "t10.sales_3",
+        "t17.sales_3",
+        "t24.sales_3",
+        "t31.sales_3",
+    ]
+    assert {r.score for r in results} == {12}
+
+
+def test_words_rarely_found_together() -> None:
+    """
+    Words found together in few objects are searched by intersecting matches.
+    """
+    index = SearchIndex()
+    for i in range(2000):
+        index.add(
+            "dimension",
+            Dimension(key=f"t{i}.sales", expression="1", relation_key="t"),
+        )
+        index.add(
+            "dimension",
+            Dimension(key=f"t{i}.price", expression="1", relation_key="t"),
+        )
+    index.add(
+        "metric",
+        Metric(key="t9999.sales_price", expression="1", relation_key="t"),
+    )
+
+    assert [r.key for r in index.search("sales price")] == ["t9999.sales_price"]
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from allstars.core.filter import Filter
+from allstars.core.hierarchy import Hierarchy
+from allstars.core.query_context import QueryContext
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_compile_and_load(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Relations, filters, query contexts and hierarchies survive a round trip
+    through the filesystem.
+    """
+    semantic_layer.filters.append(
+        Filter(key="big_sales", expression="price > 50", relation_key="main.sales")
+    )
+    semantic_layer.query_contexts.append(
+        QueryContext(key="sales", relation_keys=["main.sales", "main.dim_user"])
+    )
+    semantic_layer.hierarchies.append(
+        Hierarchy(key="geo", dimensions=["main.dim_user.country", "main.dim_user.name"])
+    )
+    semantic_layer.compile_to_files(str(tmp_path))
+
+    loaded = SemanticLayer.from_folder(str(tmp_path))
+
+    assert loaded.filters["big_sales"].to_dict() == (
+        semantic_layer.filters["big_sales"].to_dict()
+    )
+    assert loaded.query_contexts["sales"] == semantic_layer.query_contexts["sales"]
+    assert loaded.hierarchies["geo"] == semantic_layer.hierarchies["geo"]
+    assert "big_sales" in loaded.get_expression_index().filter_keys
+    assert loaded.relations["main.sales"] == semantic_layer.relations["main.sales"]
@@ -0,0 +1,179 @@
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from allstars.core.join import Join
+from allstars.core.join_graph import JoinGraph
+from allstars.core.recommender import QueryPattern, RollupRecommender
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.core.statistics import (
+    RelationStatistics,
+    StatisticsCollector,
+    estimate_distinct,
+)
+from allstars.database_interface import DatabaseInterface
+
+
+def test_estimate_distinct() -> None:
+    """
+    Full samples are counted, partial ones extrapolated from singletons.
+    """
+    assert estimate_distinct([1, 2, 2, None], 4) == 2
+    assert estimate_distinct([], 10) == 0
+    # every value seen once: most values were never sampled
+    assert estimate_distinct(list(range(100)), 10000) > 1000
+    # every value seen often: they were probably all sampled
+    assert estimate_distinct([1, 2, 3] * 30, 10000) == 3
+
+
+def test_collect(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    database_url: str,
+) -> None:
+    """
+    Row counts and column statistics are collected by sampling.
+    """
+    collector = StatisticsCollector(DatabaseInterface(database_url))
+    statistics = collector.collect(semantic_layer.relations["main.dim_user"])
+
+    assert statistics.key == "main.dim_user"
+    assert statistics.row_count == 2
+    assert statistics.sample_size == 2
+    assert statistics.distinct_count("country") == 2
+    assert statistics.null_fraction("name") == 0.0
+    assert statistics.distinct_count("unknown") is None
+
+
+def test_collect_sample(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    database_url: str,
+) -> None:
+    """
+    Relations larger than the sample are sampled randomly.
+    """
+    with engine.connect() as connection:
+        for i in range(3, 103):
+            connection.execute(
+                text(f"INSERT INTO dim_user VALUES ({i}, 'user{i}', 'US')")
+            )
+        connection.commit()
+    collector = StatisticsCollector(
+        DatabaseInterface(database_url),
+        sample_size=10,
+    )
+    relation = semantic_layer.relations["main.dim_user"]
+
+    assert "ORDER BY random()" in str(collector._sample(relation, ["id"], 102))
+    assert "ORDER BY" not in str(collector._sample(relation, ["id"], 5))
+    statistics = collector.collect(relation)
+    assert statistics.row_count == 102
+    assert statistics.sample_size == 10
+    # every name sampled once, most of them weren't
+    assert statistics.distinct_count("name") > 10
+
+
+def test_refresh(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    database_url: str,
+) -> None:
+    """
+    Relations are only sampled again when they changed enough.
+    """
+    collector = StatisticsCollector(DatabaseInterface(database_url))
+    assert collector.refresh(semantic_layer) == ["main.dim_user", "main.sales"]
+    assert semantic_layer.get_row_count("main.sales") == 2
+    collected_at = semantic_layer.statistics["main.dim_user"].collected_at
+
+    assert collector.refresh(semantic_layer) == []
+
+    with engine.connect() as connection:
+        connection.execute(text("INSERT INTO dim_user VALUES (3, 'Carol', 'US')"))
+        connection.commit()
+    assert collector.refresh(semantic_layer) == ["main.dim_user"]
+    statistics = semantic_layer.statistics["main.dim_user"]
+    assert statistics.row_count == 3
+    assert statistics.distinct_count("name") == 3
+    assert statistics.collected_at > collected_at
+
+    # below the threshold only the row count is updated
+    with engine.connect() as connection:
+        connection.execute(text("INSERT INTO dim_user VALUES (4, 'Dan', 'US')"))
+        connection.commit()
+    assert collector.refresh(semantic_layer, threshold=1.0) == ["main.dim_user"]
+    statistics = semantic_layer.statistics["main.dim_user"]
+    assert statistics.row_count == 4
+    assert statistics.distinct_count("name") == 3
+
+    assert collector.refresh(semantic_layer, ["main.sales"], force=True) == [
+        "main.sales"
+    ]
+
+    semantic_layer.compile_to_files(str(tmp_path))
+    loaded = SemanticLayer.from_folder(str(tmp_path))
+    assert loaded.statistics["main.dim_user"] == statistics
+    assert loaded.get_row_count("main.dim_user") == 4
+    assert loaded.get_row_count("main.unknown") is None
+
+
+def test_plan_row_counts() -> None:
+    """
+    At the same distance from the root, smaller relations are joined first.
+    """
+    graph = JoinGraph(
+        [
+            Join(
+                left_relation_key="orders",
+                right_relation_key=key,
+                join_criteria=f"orders.{key}_id = {key}.id",
+                cardinality="many_to_one",
+                join_term="LEFT JOIN",
+            )
+            for key in ("products", "customers")
+        ]
+    )
+    targets = {"products", "customers"}
+
+    plan = graph.plan("orders", targets)
+    assert [k for k, _, _ in plan] == ["customers", "products"]
+    plan = graph.plan("orders", targets, {"customers": 1000, "products": 10})
+    assert [k for k, _, _ in plan] == ["products", "customers"]
+
+
+def test_worth_building(semantic_layer: SemanticLayer) -> None:
+    """
+    Rollups about as large as their relation aren't recommended.
+    """
+    pattern = QueryPattern(
+        relation_key="main.sales",
+        dimensions=frozenset({"main.dim_user.country"}),
+        metrics=frozenset({"revenue"}),
+        filters=frozenset(),
+        additive=True,
+    )
+    recommender = RollupRecommender(semantic_layer)
+    assert recommender.estimate_rows(pattern) is None
+    assert recommender.worth_building(pattern)
+
+    semantic_layer.statistics.append(
+        RelationStatistics(relation_key="main.sales", row_count=1000)
+    )
+    semantic_layer.statistics.append(
+        RelationStatistics(
+            relation_key="main.dim_user",
+            row_count=200,
+            columns={"country": {"distinct_count": 20, "null_fraction": 0.0}},
+        )
+    )
+    assert recommender.estimate_rows(pattern) == 20
+    assert recommender.worth_building(pattern)
+
+    semantic_layer.statistics["main.dim_user"].columns["country"][
+        "distinct_count"
+    ] = 800
+    assert recommender.estimate_rows(pattern) == 800
+    assert not recommender.worth_building(pattern)
@@ -0,0 +1,91 @@
+from pathlib import Path
+
+import pytest
+
+from allstars.core import validation
+from allstars.core.metric import Metric
+from allstars.core.semantic_layer import SemanticLayer
+
+
+def test_validate(semantic_layer: SemanticLayer) -> None:
+    """
+    A healthy semantic layer has no errors.
+    """
+    report = validation.validate(semantic_layer)
+
+    assert report.ok
+    assert report.objects == 12
+    assert set(report.timings) == {"parse", "check"}
+
+
+def test_validate_from_folder(semantic_layer: SemanticLayer, tmp_path: Path) -> None:
+    """
+    Semantic layers are validated the same once written and loaded back.
+    """
+    semantic_layer.compile_to_files(str(tmp_path))
+    loaded = SemanticLayer.from_folder(str(tmp_path))
+    loaded.metrics.append(
+        Metric(key="typo", expression="SUM(prize)", relation_key="main.sales")
+    )
+
+    report = validation.validate(loaded)
+
+    assert [(e.key, e.code, e.reference) for e in report.errors] == [
+        ("typo", "unknown_column", "prize"),
+    ]
+
+
+def test_validate_errors(semantic_layer: SemanticLayer) -> None:
+    """
+    Bad expressions, relations, columns and joins are all reported.
+    """
+    semantic_layer.metrics.append(
+        Metric(key="broken", expression="SUM(price", relation_key="main.sales")
+    )
+    semantic_layer.metrics.append(
+        Metric(key="orphan", expression="COUNT(*)", relation_key="main.nope")
+    )
+    semantic_layer.metrics.append(
+        Metric(key="typo", expression="SUM(prize)", relation_key="main.sales")
+    )
+    semantic_layer.metrics.append(
+        Metric(
+            key="cross",
+            expression="SUM(main.sales.price) / COUNT(main.dim_user.id)",
+            relation_keys=["main.sales", "main.dim_user"],
+        )
+    )
+
+    report = validation.validate(semantic_layer)
+
+    assert [(e.key, e.code, e.reference) for e in report.errors] == [
+        ("broken", "syntax", None),
+        ("orphan", "unknown_relation", "main.nope"),
+        ("typo", "unknown_column", "prize"),
+        ("cross", "unjoinable", None),
+    ]
+
+
+@pytest.mark.parametrize("threshold", [validation.PARALLEL_THRESHOLD, 0])
+def test_validate_cache(
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    threshold: int,
+) -> None:
+    """
+    Parse results are cached by content, with or without a process pool.
+    """
+    monkeypatch.setattr(validation, "PARALLEL_THRESHOLD", threshold)
+    cache_file = str(tmp_path / "cache.json")
+
+    report = validation.validate(semantic_layer, cache_file, processes=2)
+    # one expression is shared by two objects, parsed once
+    assert (report.parsed, report.cached, report.duplicates) == (9, 0, 1)
+
+    semantic_layer.metrics.append(
+        Metric(key="new", expression="MAX(price)", relation_key="main.sales")
+    )
+    report = validation.validate(semantic_layer, cache_file, processes=2)
+    assert (report.parsed, report.cached, report.duplicates) == (1, 9, 1)
+    assert report.ok
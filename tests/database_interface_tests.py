@@ -0,0 +1,123 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from allstars.database_interface import DatabaseInterface
+
+pd = pytest.importorskip("pandas")
+
+
+@pytest.fixture
+def db(engine: Engine, database_url: str) -> DatabaseInterface:
+    """
+    A database interface to the test DB, with some NULLs.
+    """
+    with engine.connect() as connection:
+        connection.execute(text("INSERT INTO sales VALUES (3, NULL, NULL)"))
+        connection.commit()
+    return DatabaseInterface(database_url)
+
+
+def test_lazy_inspector(db: DatabaseInterface) -> None:
+    """
+    The database is only inspected when needed.
+    """
+    assert db._inspector is None
+    assert db.inspector.get_table_names() == ["dim_user", "sales"]
+
+
+def test_get_df(db: DatabaseInterface) -> None:
+    """
+    Results are returned as a single DataFrame by default.
+    """
+    df = db.get_df("SELECT id, user_id, price FROM sales ORDER BY id")
+
+    assert list(df.columns) == ["id", "user_id", "price"]
+    assert df["price"].dtype == "Int64"
+    assert df["price"].tolist() == [42, 100, pd.NA]
+
+
+def test_get_df_chunks(db: DatabaseInterface) -> None:
+    """
+    Results can be fetched in chunks, with consistent dtypes across chunks.
+    """
+    chunks = list(db.get_df("SELECT id, price FROM sales ORDER BY id", chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert [chunk["price"].dtype for chunk in chunks] == ["Int64", "Int64"]
+    assert chunks[1]["price"].isna().all()
+
+
+def test_get_df_empty(db: DatabaseInterface) -> None:
+    """
+    Empty results keep their columns.
+    """
+    df = db.get_df("SELECT id, price FROM sales WHERE id > 10")
+
+    assert list(df.columns) == ["id", "price"]
+    assert df.empty
+
+
+def test_get_df_arrow(db: DatabaseInterface) -> None:
+    """
+    Results can be returned as Arrow.
+    """
+    pytest.importorskip("pyarrow")
+    table = db.get_df("SELECT id, price FROM sales ORDER BY id", arrow=True)
+    assert table.to_pydict() == {"id": [1, 2, 3], "price": [42, 100, None]}
+
+    batches = list(
+        db.get_df("SELECT id, price FROM sales ORDER BY id", chunksize=2, arrow=True)
+    )
+    assert [batch.num_rows for batch in batches] == [2, 1]
+
+
+@pytest.fixture
+def mixed(db: DatabaseInterface) -> DatabaseInterface:
+    """
+    A table with a column NULL in its first rows, and one mixing types.
+    """
+    with db.engine.connect() as connection:
+        connection.execute(text("CREATE TABLE mixed (id INTEGER, a TEXT, b NUMERIC)"))
+        connection.execute(
+            text("INSERT INTO mixed VALUES (1, NULL, 1), (2, NULL, 2), (3, 'x', 2.5)")
+        )
+        connection.commit()
+    return db
+
+
+def test_get_df_mixed_types(mixed: DatabaseInterface) -> None:
+    """
+    Chunks share the dtypes of the first one, values that don't fit them are an
+    error.
+    """
+    sql = "SELECT a, b FROM mixed ORDER BY id"
+    df = mixed.get_df(sql)
+    assert df["b"].dtype == "float64"
+    assert df["b"].tolist() == [1.0, 2.0, 2.5]
+
+    chunks = list(mixed.get_df("SELECT id, a FROM mixed ORDER BY id", chunksize=2))
+    assert [chunk.dtypes.tolist() for chunk in chunks] == [["Int64", "object"]] * 2
+    assert chunks[0]["a"].isna().all()
+    assert chunks[1]["a"].tolist() == ["x"]
+
+    with pytest.raises(ValueError):
+        list(mixed.get_df(sql, chunksize=2))
+
+
+def test_get_df_arrow_mixed_types(mixed: DatabaseInterface) -> None:
+    """
+    Arrow batches share the schema of the first one, values that don't fit it
+    are an error.
+    """
+    pa = pytest.importorskip("pyarrow")
+    sql = "SELECT a, b FROM mixed ORDER BY id"
+    table = mixed.get_df(sql, arrow=True)
+    assert table.schema.types == [pa.string(), pa.float64()]
+    assert table.to_pydict() == {"a": [None, None, "x"], "b": [1.0, 2.0, 2.5]}
+
+    batches = list(mixed.get_df("SELECT id, a FROM mixed", chunksize=2, arrow=True))
+    assert [batch.schema.types for batch in batches] == [[pa.int64(), pa.string()]] * 2
+
+    with pytest.raises(ValueError):
+        list(mixed.get_df(sql, chunksize=2, arrow=True))
@@ -0,0 +1,177 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from typing import Any, Iterator, Optional, Tuple
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from allstars.core.folder import Folder
+from allstars.core.project import Project
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.server import Server
+
+QUERY = """
+SELECT "main.dim_user.name" AS name, "revenue" AS revenue
+FROM super
+GROUP BY 1
+ORDER BY 1
+"""
+
+
+@pytest.fixture
+def server(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    database_url: str,
+) -> Iterator[Server]:
+    """
+    A server on a random port, on top of the test DB.
+    """
+    project = Project(sqla_conn=database_url)
+    project.semantic_layer = semantic_layer
+    server = Server(project, result_ttl=60, max_rows=1)
+    server.warm()
+
+    http_server = server.make_http_server(port=0)
+    server.url = f"http://127.0.0.1:{http_server.server_port}"
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    http_server.shutdown()
+    http_server.server_close()
+    server.close()
+
+
+def request(
+    server: Server,
+    path: str,
+    payload: Optional[dict] = None,
+) -> Tuple[int, Any]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    try:
+        with urllib.request.urlopen(server.url + path, data) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as ex:
+        return ex.code, json.load(ex)
+
+
+def test_metadata(server: Server) -> None:
+    """
+    Metadata is served from memory.
+    """
+    assert request(server, "/health") == (200, {"status": "ok"})
+
+    status, counts = request(server, "/metadata")
+    assert status == 200
+    assert counts["metrics"] == len(server.semantic_layer.metrics)
+
+    status, metrics = request(server, "/metadata/metrics")
+    assert status == 200
+    assert [metric["key"] for metric in metrics] == list(
+        server.semantic_layer.metrics.keys()
+    )
+
+    status, metric = request(server, "/metadata/metrics/revenue")
+    assert status == 200
+    assert metric["key"] == "revenue"
+
+    assert request(server, "/metadata/metrics/nope")[0] == 404
+    assert request(server, "/metadata/nope")[0] == 404
+    assert request(server, "/nope")[0] == 404
+
+
+def test_search(server: Server) -> None:
+    """
+    The menu can be searched.
+    """
+    status, results = request(server, "/search?q=rev&kind=metric&limit=1")
+    assert status == 200
+    assert results == [
+        {
+            "kind": "metric",
+            "key": "revenue",
+            "label": None,
+            "folder_key": None,
+            "score": 3,
+        }
+    ]
+    assert request(server, "/search?q=rev&limit=x")[0] == 400
+    status, result = request(server, "/search?q=rev&kind=metrics")
+    assert status == 400
+    assert result["error"].startswith("Unknown kind metrics")
+
+
+def test_folders(server: Server) -> None:
+    """
+    The folder tree is served a level at a time.
+    """
+    server.semantic_layer.update(
+        "folders",
+        [Folder(key="finance"), Folder(key="billing", parent_folder_key="finance")],
+    )
+    assert request(server, "/folders") == (200, {"children": ["finance"]})
+    assert request(server, "/folders/billing") == (
+        200,
+        {
+            "key": "billing",
+            "path": ["finance", "billing"],
+            "children": [],
+            "items": [],
+        },
+    )
+    assert request(server, "/folders/nope")[0] == 404
+
+
+def test_sql(server: Server) -> None:
+    """
+    Queries are transpiled once, and results cached with their dependencies.
+    """
+    status, result = request(server, "/sql", {"query": QUERY})
+    assert status == 200
+    assert result == {
+        "columns": ["name", "revenue"],
+        "rows": [["Alice", 42]],
+        "truncated": True,
+    }
+    assert request(server, "/sql", {"query": QUERY}) == (200, result)
+    assert server.result_cache.hits == 1
+
+    status, transpiled = request(server, "/transpile", {"query": QUERY})
+    assert status == 200
+    assert "JOIN dim_user" in transpiled["sql"]
+    assert server.plan_cache.hits == 1
+
+    server.invalidate(["revenue"])
+    assert len(server.plan_cache) == 0
+    assert len(server.result_cache) == 0
+
+
+def test_errors(server: Server) -> None:
+    """
+    Bad requests return a 400.
+    """
+    assert request(server, "/sql", {})[0] == 400
+    status, result = request(server, "/sql", {"query": "SELECT FROM"})
+    assert status == 400
+    assert "error" in result
+
+
+def test_sql_metadata_tables(server: Server) -> None:
+    """
+    Metadata tables are answered in memory, and their results not cached.
+    """
+    status, result = request(
+        server, "/sql", {"query": "SELECT key FROM ⭐.tables ORDER BY key"}
+    )
+    assert status == 200
+    assert result == {
+        "columns": ["key"],
+        "rows": [["main.dim_user"]],
+        "truncated": True,
+    }
+    assert len(server.result_cache) == 0
+
+    status, result = request(server, "/transpile", {"query": "SELECT * FROM ⭐.metrics"})
+    assert status == 400
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from typing import List
+
+import pytest
+from sqlalchemy.dialects import registry
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql import aio, stats
+from allstars.sql.dbapi import OperationalError
+
+QUERY = """
+SELECT "dim_user.country", sum("sales.price")
+FROM super
+GROUP BY "dim_user.country"
+ORDER BY 1
+"""
+
+
+def async_url(database_url: str) -> str:
+    return database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+
+@pytest.mark.parametrize("driver", ["pysqlite", "aiosqlite"])
+def test_async_connection(engine: Engine, database_url: str, driver: str) -> None:
+    """
+    Queries run through the async driver or the thread pool alike.
+    """
+    if driver == "aiosqlite":
+        pytest.importorskip("aiosqlite")
+        database_url = async_url(database_url)
+
+    async def run():
+        async with await aio.connect(database_url) as connection:
+            cursor = await connection.execute(QUERY)
+            assert [column[0] for column in cursor.description] == [
+                "country",
+                "SUM(sales.price)",
+            ]
+            assert await cursor.fetchone() == ("CA", 100)
+            return [row async for row in cursor]
+
+    assert asyncio.run(run()) == [("US", 42)]
+
+
+def test_async_dialect(engine: Engine, database_url: str) -> None:
+    """
+    The async dialect works with SQLAlchemy's asyncio extension.
+    """
+    registry.register(
+        "allstars.async",
+        "allstars.sql.aio.dialect",
+        "allstarsAsyncDialect",
+    )
+
+    async def run():
+        async_engine = create_async_engine(
+            "allstars+async://",
+            database_uri=database_url,
+        )
+        async with async_engine.connect() as connection:
+            result = await connection.exec_driver_sql(QUERY)
+            rows = result.fetchall()
+        await async_engine.dispose()
+        return rows
+
+    assert asyncio.run(run()) == [("CA", 100), ("US", 42)]
+
+
+def test_async_driver_stats(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    database_url: str,
+) -> None:
+    """
+    Queries run through the async driver collect stats and call hooks, and
+    can query the metadata tables.
+    """
+    pytest.importorskip("aiosqlite")
+    collected: List[stats.QueryStats] = []
+
+    async def run():
+        async with await aio.connect(
+            async_url(database_url),
+            semantic_layer=semantic_layer,
+            collect_stats=True,
+        ) as connection:
+            cursor = await connection.execute(QUERY)
+            assert await cursor.fetchall() == [("CA", 100), ("US", 42)]
+            assert cursor.stats.rows == 2
+            assert {"parse", "execute", "fetch"} <= set(cursor.stats.phases)
+
+            cursor = await connection.execute("SELECT key FROM ⭐.tables ORDER BY 1")
+            assert await cursor.fetchmany(5) == [("main.dim_user",), ("main.sales",)]
+
+    stats.register_hook(collected.append)
+    try:
+        asyncio.run(run())
+    finally:
+        stats.unregister_hook(collected.append)
+    assert [s.rows for s in collected] == [2, 2]
+
+
+def test_async_driver_timeout(
+    engine: Engine,
+    endless_query: None,
+    database_url: str,
+) -> None:
+    """
+    Queries run through the async driver time out or are cancelled.
+    """
+    pytest.importorskip("aiosqlite")
+
+    async def run():
+        async with await aio.connect(async_url(database_url)) as connection:
+            cursor = connection.cursor()
+            start = time.monotonic()
+            with pytest.raises(OperationalError) as excinfo:
+                await cursor.execute("SELECT 1 FROM super", timeout=0.2)
+            assert str(excinfo.value) == "Query timed out after 0.2 seconds"
+            assert time.monotonic() - start < 5
+
+            asyncio.get_running_loop().call_later(0.2, cursor.cancel)
+            with pytest.raises(OperationalError) as excinfo:
+                await cursor.execute("SELECT 1 FROM super")
+            assert str(excinfo.value) == "Query was cancelled"
+
+    asyncio.run(run())
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy.engine import Engine
+from sqlglot import exp, parse_one
+
+from allstars.sql.approximate import (
+    ErrorBound,
+    approximate,
+    extract_hint,
+    sampling_error,
+)
+from allstars.sql.transpile import compile_query
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("SELECT 1", ("SELECT 1", False, None)),
+        ("/*+ APPROXIMATE */ SELECT 1", (" SELECT 1", True, None)),
+        ("SELECT /*+ approx(10) */ 1", ("SELECT  1", True, 10.0)),
+        ("/*+ APPROXIMATE( 2.5 ) */ SELECT 1", (" SELECT 1", True, 2.5)),
+    ],
+)
+def test_extract_hint(query: str, expected) -> None:
+    """
+    Approximate mode can be requested through a hint.
+    """
+    assert extract_hint(query) == expected
+
+
+def test_approximate_distinct() -> None:
+    """
+    ``COUNT(DISTINCT)`` is replaced by the backend's HLL function.
+    """
+    statement = parse_one(
+        "SELECT country, COUNT(DISTINCT user_id) AS users FROM sales GROUP BY country"
+    )
+    error_bounds = approximate(statement, "trino")
+
+    assert statement.sql("trino") == (
+        "SELECT country, APPROX_DISTINCT(user_id) AS users FROM sales GROUP BY country"
+    )
+    assert error_bounds == {"users": ErrorBound("hll", 0.023)}
+
+
+def test_approximate_sample() -> None:
+    """
+    Fact relations are sampled, and additive aggregates scaled.
+    """
+    statement = parse_one(
+        "SELECT SUM(price) AS revenue, COUNT(DISTINCT user_id) AS users FROM sales"
+    )
+    error_bounds = approximate(statement, "trino", statement.find(exp.Table), 10)
+
+    assert statement.sql("trino") == (
+        "SELECT SUM(price) * 10.0 AS revenue, APPROX_DISTINCT(user_id) AS users "
+        "FROM sales TABLESAMPLE BERNOULLI (10)"
+    )
+    assert error_bounds == {
+        "revenue": ErrorBound("sample", sample_percent=10),
+        "users": ErrorBound("hll+sample", sample_percent=10),
+    }
+
+
+def test_sampling_error() -> None:
+    """
+    Scaled up aggregates are less accurate on smaller samples.
+    """
+    # 100 rows sampled out of 1000
+    assert sampling_error(10, 1000) == pytest.approx(0.0948683)
+    assert sampling_error(50, 1000) == pytest.approx(0.0316228)
+    assert sampling_error(10, 0) is None
+
+
+def test_approximate_sample_error() -> None:
+    """
+    With a known row count, sampled columns get a relative error, compounded
+    with the HLL one for distinct counts.
+    """
+    statement = parse_one(
+        "SELECT SUM(price) AS revenue, COUNT(*) AS sales, "
+        "COUNT(DISTINCT user_id) AS users FROM sales"
+    )
+    error_bounds = approximate(statement, "trino", statement.find(exp.Table), 10, 1000)
+
+    assert error_bounds["revenue"].relative_error == pytest.approx(0.0948683)
+    assert error_bounds["sales"].relative_error == pytest.approx(0.0948683)
+    assert error_bounds["users"].relative_error == pytest.approx(0.0976166)
+    assert error_bounds["users"].method == "hll+sample"
+    assert error_bounds["users"].sample_percent == 10
+
+    # the error of BigQuery's HLL function isn't documented, so it's unknown
+    statement = parse_one("SELECT COUNT(DISTINCT user_id) AS users FROM sales")
+    error_bounds = approximate(statement, "bigquery", statement.find(exp.Table), 10, 1000)
+    assert error_bounds["users"].relative_error is None
+
+
+def test_approximate_unsupported_backend(engine: Engine) -> None:
+    """
+    Backends without approximate functions keep the exact computation.
+    """
+    compiled = compile_query(
+        engine,
+        '/*+ APPROXIMATE(10) */ SELECT COUNT(DISTINCT "sales.user_id") FROM super',
+    )
+
+    assert compiled.sql == "SELECT COUNT(DISTINCT sales.user_id) FROM sales"
+    assert compiled.error_bounds == {}
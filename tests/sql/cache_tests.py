@@ -0,0 +1,94 @@
+import time
+
+from sqlalchemy.engine import Engine
+
+from allstars.core.metric import Metric
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.cache import QueryCache
+from allstars.sql.transpile import compile_query
+
+
+def test_lru() -> None:
+    """
+    The least recently used entries are evicted first.
+    """
+    cache = QueryCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_ttl() -> None:
+    """
+    Entries expire after the TTL.
+    """
+    cache = QueryCache(ttl=0.01)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_invalidate() -> None:
+    """
+    Only entries depending on the given keys are invalidated.
+    """
+    cache = QueryCache()
+    cache.set("q1", 1, {"revenue", "sales.price"})
+    cache.set("q2", 2, {"main.dim_user.name"})
+
+    assert cache.invalidate(["revenue"]) == 1
+    assert "q1" not in cache
+    assert "q2" in cache
+
+    assert cache.invalidate(["revenue"]) == 0
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_compile_query_cache(engine: Engine, semantic_layer: SemanticLayer) -> None:
+    """
+    Transpiled queries are cached, along with what they depend on.
+    """
+    cache = QueryCache()
+    query = 'SELECT "main.dim_user.name", "revenue" FROM super GROUP BY 1'
+
+    compiled = compile_query(engine, query, semantic_layer=semantic_layer, cache=cache)
+    assert compile_query(engine, query, semantic_layer=semantic_layer, cache=cache) is (
+        compiled
+    )
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert {"main.dim_user.name", "revenue"} <= compiled.dependencies
+
+    assert cache.invalidate(["revenue"]) == 1
+    compile_query(engine, query, semantic_layer=semantic_layer, cache=cache)
+    assert cache.misses == 2
+
+
+def test_compile_query_cache_semantic_layers(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+) -> None:
+    """
+    Semantic layers sharing a cache don't get each other's queries.
+    """
+    cache = QueryCache()
+    query = 'SELECT "revenue" FROM super'
+    other = SemanticLayer(relations=semantic_layer.relations)
+    other.metrics.append(
+        Metric(key="revenue", expression="MAX(price)", relation_key="main.sales")
+    )
+
+    compiled = compile_query(engine, query, semantic_layer=semantic_layer, cache=cache)
+    assert "SUM(" in compiled.sql
+    compiled = compile_query(engine, query, semantic_layer=other, cache=cache)
+    assert "MAX(" in compiled.sql
+    assert (cache.hits, cache.misses) == (0, 2)
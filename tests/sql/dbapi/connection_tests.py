@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from allstars.sql.dbapi import connect
+from allstars.sql.dbapi import executor as executor_module
+from allstars.sql.dbapi.executor import QueryExecutor
+
+
+def test_submit_all(engine: Engine, database_url: str) -> None:
+    """
+    Independent queries run concurrently, returning futures in order.
+    """
+    connection = connect(database_url, max_concurrency=2)
+    futures = connection.submit_all(
+        [
+            'SELECT "dim_user.name" FROM super ORDER BY 1',
+            ('SELECT "sales.price" FROM super WHERE "sales.id" = %(id)s', {"id": 2}),
+            'SELECT COUNT("sales.id") FROM super',
+        ]
+    )
+
+    assert [future.result(timeout=10).fetchall() for future in futures] == [
+        [("Alice",), ("Bob",)],
+        [(100,)],
+        [(2,)],
+    ]
+    # rows are fetched, connections are back in the pool
+    assert connection.engine.pool.checkedout() == 0
+    connection.close()
+
+
+def test_executor_per_backend(engine: Engine, database_url: str) -> None:
+    """
+    Connections to a backend share one executor, shut down with the last one.
+    """
+    first = connect(database_url, max_concurrency=1)
+    second = connect(database_url, max_concurrency=4)
+    first.submit('SELECT COUNT("sales.id") FROM super').result(timeout=10)
+    second.submit('SELECT COUNT("sales.id") FROM super').result(timeout=10)
+
+    executor = first._executor
+    assert second._executor is executor
+    assert executor.max_workers == 1
+
+    first.close()
+    assert database_url in executor_module._executors
+    second.close()
+    assert database_url not in executor_module._executors
+    assert executor._workers == []
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
+def test_executor_priority() -> None:
+    """
+    Waiting queries are run by priority, then in submission order.
+    """
+    executor = QueryExecutor(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        release.wait()
+
+    executor.submit(block)
+    started.wait()
+    futures = [
+        executor.submit(order.append, "low", priority=-1),
+        executor.submit(order.append, "normal"),
+        executor.submit(order.append, "high", priority=10),
+        executor.submit(order.append, "normal again"),
+    ]
+    release.set()
+    for future in futures:
+        future.result(timeout=10)
+
+    assert order == ["high", "normal", "normal again", "low"]
@@ -0,0 +1,108 @@
+import gc
+import threading
+import time
+import tracemalloc
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from allstars.sql import transpile
+from allstars.sql.dbapi import OperationalError, connect
+
+
+def test_timeout(engine: Engine, endless_query: None, database_url: str) -> None:
+    """
+    Queries running for too long are cancelled.
+    """
+    connection = connect(database_url, timeout=10)
+    cursor = connection.cursor()
+
+    start = time.monotonic()
+    with pytest.raises(OperationalError) as excinfo:
+        cursor.execute("SELECT 1 FROM super", timeout=0.2)
+    assert str(excinfo.value) == "Query timed out after 0.2 seconds"
+    assert time.monotonic() - start < 5
+    assert cursor._driver_cursor is None
+    connection.close()
+
+
+def test_cancel(engine: Engine, endless_query: None, database_url: str) -> None:
+    """
+    Queries can be cancelled from another thread.
+    """
+    connection = connect(database_url)
+    cursor = connection.cursor()
+
+    threading.Timer(0.2, cursor.cancel).start()
+    with pytest.raises(OperationalError) as excinfo:
+        cursor.execute("SELECT 1 FROM super")
+    assert str(excinfo.value) == "Query was cancelled"
+    connection.close()
+
+
+def test_timeout_not_reached(engine: Engine, database_url: str) -> None:
+    """
+    Fast queries are not affected by the timeout.
+    """
+    connection = connect(database_url, timeout=5)
+    cursor = connection.execute('SELECT "sales.price" FROM super ORDER BY 1')
+
+    assert cursor.fetchall() == [(42,), (100,)]
+    assert cursor._timer is None
+    connection.close()
+
+
+def test_close_releases_connection(engine: Engine, database_url: str) -> None:
+    """
+    Closing a cursor returns its connection to the pool.
+    """
+    connection = connect(database_url)
+    cursor = connection.cursor()
+    assert connection.engine.pool.checkedout() == 0
+
+    cursor.execute('SELECT "sales.price" FROM super')
+    assert connection.engine.pool.checkedout() == 1
+
+    cursor.close()
+    assert connection.engine.pool.checkedout() == 0
+    assert cursor.dbapi_connection is None
+    connection.close()
+
+
+def test_no_leak(
+    engine: Engine,
+    monkeypatch: pytest.MonkeyPatch,
+    database_url: str,
+) -> None:
+    """
+    Opening and closing cursors in a loop doesn't leak connections or memory.
+    """
+    monkeypatch.setattr(
+        transpile,
+        "compile_query",
+        lambda *args, **kwargs: transpile.CompiledQuery("SELECT 1"),
+    )
+    connection = connect(database_url)
+
+    def run(n: int) -> None:
+        for _ in range(n):
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1 FROM super")
+            cursor.fetchall()
+            cursor.close()
+
+    run(1000)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        run(100_000)
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert connection.engine.pool.checkedout() == 0
+    assert len(connection.cursors) == 0
+    assert after - before < 1024 * 1024
+    connection.close()
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from allstars.core.query_context import QueryContext
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.dialect import allstarsDialect
+
+
+def test_query_context_tables(semantic_layer: SemanticLayer, database_url: str) -> None:
+    """
+    Each query context is exposed as a virtual table.
+    """
+    semantic_layer.query_contexts.append(
+        QueryContext(key="users", relation_keys=["main.dim_user"])
+    )
+    dialect = allstarsDialect(database_url, semantic_layer=semantic_layer)
+
+    assert dialect.get_table_names(None) == ["super", "users"]
+    assert dialect.has_table(None, "users")
+    assert not dialect.has_table(None, "sales")
+
+    columns = dialect.get_columns(None, "users")
+    assert [c["name"] for c in columns] == [
+        "dim_user.id",
+        "dim_user.name",
+        "dim_user.country",
+        "main.dim_user.count",
+        "main.dim_user.id",
+        "main.dim_user.name",
+        "main.dim_user.country",
+    ]
+    assert str(columns[0]["type"]) == "INTEGER"
+
+
+def test_query_context_tables_from_folder(
+    semantic_layer: SemanticLayer,
+    tmp_path: Path,
+    database_url: str,
+) -> None:
+    """
+    Query contexts of semantic layers loaded from files expose their columns.
+    """
+    semantic_layer.query_contexts.append(
+        QueryContext(key="users", relation_keys=["main.dim_user"])
+    )
+    semantic_layer.compile_to_files(str(tmp_path))
+    loaded = SemanticLayer.from_folder(str(tmp_path))
+    dialect = allstarsDialect(database_url, semantic_layer=loaded)
+
+    columns = dialect.get_columns(None, "users")
+    assert [(c["name"], str(c["type"])) for c in columns[:3]] == [
+        ("dim_user.id", "INTEGER"),
+        ("dim_user.name", "TEXT"),
+        ("dim_user.country", "TEXT"),
+    ]
+
+
+def test_metadata_tables(semantic_layer: SemanticLayer, database_url: str) -> None:
+    """
+    The metadata tables are listed under the ⭐ schema.
+    """
+    dialect = allstarsDialect(database_url, semantic_layer=semantic_layer)
+
+    assert dialect.get_schema_names(None) == ["main", "⭐"]
+    assert "metrics" in dialect.get_table_names(None, schema="⭐")
+    assert dialect.has_table(None, "dimensions", schema="⭐")
+    assert not dialect.has_table(None, "dimensions")
+
+    columns = dialect.get_columns(None, "tables", schema="⭐")
+    assert [c["name"] for c in columns] == [
+        "key",
+        "database_schema",
+        "reference",
+        "relation_type",
+        "column_count",
+        "row_count",
+    ]
+    assert str(columns[-1]["type"]) == "INTEGER"
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlglot import parse_one
+
+from allstars.core.hierarchy import Hierarchy
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.dbapi import connect
+from allstars.sql.drilldown import DrillDown, reaggregate
+
+
+@pytest.fixture
+def geo(engine: Engine, semantic_layer: SemanticLayer) -> SemanticLayer:
+    """
+    The test semantic layer with a country > name hierarchy, and a third user.
+    """
+    with engine.connect() as connection:
+        connection.execute(text("INSERT INTO dim_user VALUES (3, 'Carol', 'US')"))
+        connection.execute(text("INSERT INTO sales VALUES (3, 3, 8)"))
+        connection.commit()
+    semantic_layer.hierarchies.append(
+        Hierarchy(key="geo", dimensions=["main.dim_user.country", "main.dim_user.name"])
+    )
+    return semantic_layer
+
+
+def test_drill_down(geo: SemanticLayer, database_url: str) -> None:
+    """
+    The next level is prefetched, and members are filtered locally.
+    """
+    connection = connect(database_url, semantic_layer=geo)
+    drilldown = DrillDown(connection, "geo", metrics=["revenue"])
+
+    result = drilldown.query(0)
+    assert result.columns == ["main.dim_user.country", "revenue"]
+    assert result.rows == [("CA", 100), ("US", 50)]
+    assert result.source == "query"
+
+    result = drilldown.query(1, ["US"])
+    assert result.rows == [("US", "Alice", 42), ("US", "Carol", 8)]
+    assert result.source == "prefetch"
+    assert drilldown.query(1).source == "cache"
+    connection.close()
+
+
+def test_roll_up(geo: SemanticLayer, database_url: str) -> None:
+    """
+    Coarser levels are re-aggregated locally, for additive metrics only.
+    """
+    connection = connect(database_url, semantic_layer=geo)
+    drilldown = DrillDown(
+        connection,
+        "geo",
+        metrics=["revenue", "main.sales.count"],
+        prefetch=False,
+    )
+    assert drilldown.can_roll_up
+    drilldown.query(1)
+    result = drilldown.query(0)
+    assert result.rows == [("CA", 100, 1), ("US", 50, 2)]
+    assert result.source == "rollup"
+
+    drilldown = DrillDown(
+        connection, "geo", metrics=["revenue_per_sale"], prefetch=False
+    )
+    assert not drilldown.can_roll_up
+    drilldown.query(1)
+    assert drilldown.query(0).source == "query"
+    connection.close()
+
+
+def test_close(geo: SemanticLayer, database_url: str) -> None:
+    """
+    Closing closes the cursors of prefetched levels never queried.
+    """
+    connection = connect(database_url, semantic_layer=geo)
+    with DrillDown(connection, "geo", metrics=["revenue"]) as drilldown:
+        drilldown.query(0)
+        future = drilldown._futures[1]
+        cursor = future.result(timeout=10)
+        assert not cursor.closed
+
+    assert cursor.closed
+    assert drilldown._futures == {}
+    connection.close()
+
+
+def test_reaggregate() -> None:
+    assert reaggregate(parse_one("SUM(price)")) is sum
+    assert reaggregate(parse_one("(MAX(price))")) is max
+    assert reaggregate(parse_one("COUNT(DISTINCT user_id)")) is None
+    assert reaggregate(parse_one("SUM(price) / COUNT(*)")) is None
+    assert reaggregate(None) is None
@@ -0,0 +1,104 @@
+import pytest
+
+from allstars.core.hierarchy import Hierarchy
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.dbapi import connect
+from allstars.sql.dbapi.exceptions import ProgrammingError
+from allstars.sql.dbapi.typing import ColumnType
+from allstars.sql.metadata import query_metadata
+
+# no database behind it, metadata queries must never need one
+DATABASE_URL = "sqlite:////nonexistent/allstars.db"
+
+
+def test_metadata_tables(semantic_layer: SemanticLayer) -> None:
+    """
+    Metadata tables are answered from the semantic layer, without a database.
+    """
+    connection = connect(DATABASE_URL, semantic_layer=semantic_layer)
+    cursor = connection.execute("SELECT ⭐ FROM ⭐.metrics ORDER BY key")
+
+    assert [column[0] for column in cursor.description] == [
+        "key",
+        "label",
+        "description",
+        "expression",
+        "relation_keys",
+        "folder_key",
+    ]
+    rows = cursor.fetchall()
+    assert [row[0] for row in rows] == sorted(semantic_layer.metrics.keys())
+    assert ("revenue", None, None, "SUM(price)", "main.sales", None) in rows
+    assert cursor.compiled is None
+
+    cursor.execute("SELECT key, column_count FROM ⭐.tables ORDER BY 1 DESC")
+    assert cursor.fetchall() == [("main.sales", 3), ("main.dim_user", 3)]
+    assert cursor.description[1][1] == ColumnType.INT
+
+    cursor.execute('SELECT COUNT(*) FROM "⭐".tables')
+    assert cursor.fetchall() == [(2,)]
+    assert cursor.description[0][0] == "count"
+    connection.close()
+
+
+def test_metadata_filters(semantic_layer: SemanticLayer) -> None:
+    """
+    Filters, projections, sorting and limits are evaluated locally.
+    """
+
+    def query(sql: str):
+        _, rows = query_metadata(sql, semantic_layer)
+        return rows
+
+    assert query(
+        "SELECT key AS k FROM ⭐.dimensions WHERE key LIKE '%user.n%'"
+    ) == [("main.dim_user.name",)]
+    assert query(
+        "SELECT key FROM ⭐.metrics "
+        "WHERE relation_keys = 'main.sales' AND NOT key IN ('revenue') "
+        "ORDER BY key LIMIT 1 OFFSET 1"
+    ) == [("revenue_per_sale",)]
+    assert query(
+        "SELECT COUNT(*) FROM ⭐.metrics WHERE label IS NOT NULL OR key ILIKE 'REV%'"
+    ) == [(4,)]
+    assert query("SELECT key FROM ⭐.metrics WHERE label = 'x'") == []
+    assert query("SELECT key AS k FROM ⭐.tables ORDER BY k DESC") == [
+        ("main.sales",),
+        ("main.dim_user",),
+    ]
+    assert query(
+        "SELECT relation_key, name FROM ⭐.columns WHERE data_type <> 'INTEGER'"
+    ) == [("main.dim_user", "name"), ("main.dim_user", "country")]
+
+    semantic_layer.hierarchies.append(
+        Hierarchy(key="geo", dimensions=["main.dim_user.country", "main.dim_user.name"])
+    )
+    assert query("SELECT * FROM ⭐.hierarchies ORDER BY level DESC") == [
+        ("geo", 1, "main.dim_user.name"),
+        ("geo", 0, "main.dim_user.country"),
+    ]
+
+    # other queries are left to the transpiler
+    assert query_metadata('SELECT "revenue" FROM super', semantic_layer) is None
+
+
+def test_metadata_errors(semantic_layer: SemanticLayer) -> None:
+    """
+    Unknown tables and columns, and unsupported clauses, are rejected.
+    """
+    with pytest.raises(ProgrammingError, match="Unknown metadata table"):
+        query_metadata("SELECT * FROM ⭐.sales", semantic_layer)
+    with pytest.raises(ProgrammingError, match="Unknown column price"):
+        query_metadata("SELECT price FROM ⭐.metrics", semantic_layer)
+    # aliases can only be sorted by
+    with pytest.raises(ProgrammingError, match="Unknown column k"):
+        query_metadata("SELECT key AS k FROM ⭐.metrics WHERE k = 'a'", semantic_layer)
+    for position in (0, 2):
+        with pytest.raises(ProgrammingError, match="not in the select list"):
+            query_metadata(
+                f"SELECT key FROM ⭐.metrics ORDER BY {position}", semantic_layer
+            )
+    with pytest.raises(ProgrammingError, match="GROUP is not supported"):
+        query_metadata(
+            "SELECT folder_key, COUNT(*) FROM ⭐.metrics GROUP BY 1", semantic_layer
+        )
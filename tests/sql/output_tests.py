@@ -0,0 +1,59 @@
+import io
+
+import pytest
+
+from allstars.sql.output import write_arrow
+
+
+def test_write_arrow_types() -> None:
+    """
+    Batches are cast to the schema of the first one, with columns only NULL
+    in it written as strings.
+    """
+    pa = pytest.importorskip("pyarrow")
+    batches = [
+        [(1, None, 1.5)],
+        [(2, None, 2)],
+        [(2**60, "a", None)],
+    ]
+    file = io.BytesIO()
+    write_arrow(["id", "name", "price"], iter(batches), file)
+
+    table = pa.ipc.open_stream(file.getvalue()).read_all()
+    assert table.schema.types == [pa.int64(), pa.string(), pa.float64()]
+    assert all(field.nullable for field in table.schema)
+    assert table.to_pydict() == {
+        "id": [1, 2, 2**60],
+        "name": [None, None, "a"],
+        "price": [1.5, 2.0, None],
+    }
+
+
+def test_write_arrow_streaming() -> None:
+    """
+    Batches are written as they come, values that don't fit are an error.
+    """
+    pytest.importorskip("pyarrow")
+    file = io.BytesIO()
+
+    def batches():
+        yield [(1,)]
+        assert file.tell() > 0
+        yield [(2.5,)]
+
+    with pytest.raises(ValueError) as excinfo:
+        write_arrow(["id"], batches(), file)
+    assert str(excinfo.value).startswith("Column id can't be converted as int64")
+
+
+def test_write_arrow_empty() -> None:
+    """
+    Empty results keep their columns.
+    """
+    pa = pytest.importorskip("pyarrow")
+    file = io.BytesIO()
+    write_arrow(["id"], iter([]), file)
+
+    table = pa.ipc.open_stream(file.getvalue()).read_all()
+    assert table.column_names == ["id"]
+    assert table.num_rows == 0
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from allstars.sql import querylog, stats
+from allstars.sql.dbapi import connect
+
+
+@pytest.mark.parametrize("filename", ["queries.jsonl", "queries.jsonl.gz"])
+def test_query_log(
+    engine: Engine,
+    tmp_path: Path,
+    filename: str,
+    database_url: str,
+) -> None:
+    """
+    Queries are captured with their parameters, SQL and timings.
+    """
+    connection = connect(database_url)
+    with querylog.QueryLog(str(tmp_path / filename)):
+        cursor = connection.execute(
+            'SELECT "sales.price" FROM super WHERE "sales.price" > %(price)s',
+            {"price": 50},
+        )
+        cursor.fetchall()
+    assert not stats.has_hooks()
+
+    entries = list(querylog.read_log(str(tmp_path / filename)))
+    assert len(entries) == 1
+    entry = entries[0]
+    assert entry["query"] == (
+        'SELECT "sales.price" FROM super WHERE "sales.price" > %(price)s'
+    )
+    assert entry["parameters"] == {"price": 50}
+    assert entry["sql"] == "SELECT sales.price FROM sales WHERE sales.price > 50"
+    assert set(entry["phases"]) >= {"parse", "execute", "fetch"}
+    assert entry["rows"] == 1
+    connection.close()
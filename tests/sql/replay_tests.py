@@ -0,0 +1,56 @@
+from sqlalchemy.engine import Engine
+
+from allstars.sql.replay import percentile, query_shape, replay
+
+
+def test_query_shape() -> None:
+    """
+    Queries differing only by literals have the same shape.
+    """
+    assert query_shape("SELECT a FROM super WHERE b = 1") == query_shape(
+        "select a  from super where b = 42"
+    )
+    assert query_shape("SELECT a FROM super WHERE b = 'x'") == (
+        "SELECT a FROM super WHERE b = ?"
+    )
+
+
+def test_percentile() -> None:
+    """
+    Percentiles use the nearest rank.
+    """
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3
+
+
+def test_replay(engine: Engine, database_url: str) -> None:
+    """
+    Captured queries are replayed, grouping latencies by query shape.
+    """
+    entries = [
+        {
+            "query": 'SELECT "sales.price" FROM super WHERE "sales.price" > %(p)s',
+            "parameters": {"p": 10},
+        },
+        {
+            "query": 'SELECT "sales.price" FROM super WHERE "sales.price" > %(p)s',
+            "parameters": {"p": 50},
+        },
+        {"query": 'SELECT "dim_user.name" FROM super'},
+        {"query": "SELECT 1 FROM invalid"},
+    ]
+    report = replay(entries, database_url, concurrency=2, repeat=3)
+
+    assert report.queries == 12
+    assert report.errors == 3
+    assert report.throughput > 0
+    assert [(s.count, s.errors) for s in report.shapes.values()] == [
+        (6, 0),
+        (3, 0),
+        (3, 3),
+    ]
+    assert all(s.p50 <= s.p95 <= s.p99 for s in report.shapes.values() if s.latencies)
+    assert "Replayed 12 queries (3 errors)" in report.summary()
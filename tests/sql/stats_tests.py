@@ -0,0 +1,87 @@
+from typing import List
+
+from sqlalchemy.engine import Engine
+
+from allstars.sql import stats
+from allstars.sql.dbapi import connect
+
+
+def test_cursor_stats(engine: Engine, database_url: str) -> None:
+    """
+    Cursors record per-phase timings and counters when asked to.
+    """
+    connection = connect(database_url, collect_stats=True)
+    cursor = connection.execute(
+        'SELECT "sales.price", "dim_user.name" FROM super ORDER BY 1'
+    )
+    assert cursor.fetchall() == [(42, "Alice"), (100, "Bob")]
+
+    assert cursor.stats is not None
+    assert cursor.stats.sql == (
+        "SELECT sales.price, dim_user.name FROM sales "
+        "JOIN dim_user ON sales.user_id = dim_user.id ORDER BY 1"
+    )
+    assert list(cursor.stats.phases) == [
+        "parse",
+        "resolve",
+        "inspect",
+        "plan",
+        "rewrite",
+        "generate",
+        "execute",
+        "fetch",
+    ]
+    assert all(duration >= 0 for duration in cursor.stats.phases.values())
+    assert cursor.stats.total == sum(cursor.stats.phases.values())
+    assert cursor.stats.rows == 2
+    assert cursor.stats.bytes == 8 + 5 + 8 + 3
+    connection.close()
+
+
+def test_stats_disabled(engine: Engine, database_url: str) -> None:
+    """
+    No stats are collected by default.
+    """
+    connection = connect(database_url)
+    cursor = connection.execute('SELECT "sales.price" FROM super')
+    cursor.fetchall()
+
+    assert cursor.stats is None
+    connection.close()
+
+
+def test_hook(engine: Engine, database_url: str) -> None:
+    """
+    Hooks get the stats of every query once its results are exhausted.
+    """
+    collected: List[stats.QueryStats] = []
+
+    def failing_hook(query_stats: stats.QueryStats) -> None:
+        raise Exception("Exporter is down")
+
+    stats.register_hook(failing_hook)
+    stats.register_hook(collected.append)
+    try:
+        connection = connect(database_url)
+        cursor = connection.execute('SELECT "sales.price" FROM super')
+        assert not collected
+        assert cursor.fetchall() == [(42,), (100,)]
+    finally:
+        stats.unregister_hook(collected.append)
+        stats.unregister_hook(failing_hook)
+
+    assert collected == [cursor.stats]
+    assert collected[0].rows == 2
+    assert "fetch" in collected[0].phases
+    assert not stats.has_hooks()
+    connection.close()
+
+
+def test_stats_equality() -> None:
+    """
+    The timer isn't part of the stats: it's neither passed nor compared.
+    """
+    first = stats.QueryStats("SELECT 1", rows=1)
+    second = stats.QueryStats("SELECT 1", rows=1)
+    assert first == second
+    assert "_mark" not in repr(first)
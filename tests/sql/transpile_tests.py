@@ -1,6 +1,11 @@
 import pytest
 from sqlalchemy.engine import Engine
 
+from allstars.core.filter import Filter
+from allstars.core.join import Join
+from allstars.core.query_context import QueryContext
+from allstars.core.semantic_layer import SemanticLayer
+from allstars.sql.dbapi.exceptions import ProgrammingError
 from allstars.sql.transpile import transpile
 
 
@@ -42,3 +47,154 @@ def test_transpile(engine: Engine, semantic_query: str, actual_query: str) -> No
     Simple tests.
     """
     assert transpile(engine, semantic_query) == actual_query
+
+
+@pytest.mark.parametrize(
+    "semantic_query, actual_query",
+    [
+        (
+            'SELECT "main.sales.count", "revenue" FROM super',
+            "SELECT COUNT(*), SUM(main.sales.price) FROM main.sales",
+        ),
+        (
+            'SELECT "revenue_per_sale" * 2, 100 / "revenue_per_sale" FROM super',
+            "SELECT SUM(main.sales.price) / COUNT(*) * 2, "
+            "100 / (SUM(main.sales.price) / COUNT(*)) FROM main.sales",
+        ),
+        (
+            """
+SELECT "main.dim_user.country" AS country, "revenue_per_sale" AS rps
+FROM super
+GROUP BY country
+ORDER BY rps DESC
+            """,
+            (
+                "SELECT main.dim_user.country AS country, "
+                "SUM(main.sales.price) / COUNT(*) AS rps "
+                "FROM main.sales JOIN dim_user ON sales.user_id = dim_user.id "
+                "GROUP BY main.dim_user.country "
+                "ORDER BY SUM(main.sales.price) / COUNT(*) DESC"
+            ),
+        ),
+    ],
+)
+def test_transpile_semantic_layer(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+    semantic_query: str,
+    actual_query: str,
+) -> None:
+    """
+    Metrics and dimensions are resolved through the semantic layer.
+    """
+    assert transpile(engine, semantic_query, semantic_layer=semantic_layer) == (
+        actual_query
+    )
+
+
+def test_transpile_query_context(engine: Engine, semantic_layer: SemanticLayer) -> None:
+    """
+    Query contexts are virtual tables that only follow their own joins.
+    """
+    semantic_layer.joins.append(
+        Join(
+            left_relation_key="main.sales",
+            right_relation_key="main.dim_user",
+            join_criteria="main.sales.user_id = main.dim_user.id",
+            cardinality="many_to_one",
+            join_term="LEFT JOIN",
+        )
+    )
+    semantic_layer.query_contexts.append(
+        QueryContext(key="sales", relation_keys=["main.sales", "main.dim_user"])
+    )
+    semantic_layer.query_contexts.append(
+        QueryContext(key="users", relation_keys=["main.dim_user"])
+    )
+
+    assert transpile(
+        engine,
+        'SELECT "main.dim_user.country", "revenue" FROM sales',
+        semantic_layer=semantic_layer,
+    ) == (
+        "SELECT main.dim_user.country, SUM(main.sales.price) FROM main.sales "
+        "LEFT JOIN main.dim_user ON main.sales.user_id = main.dim_user.id"
+    )
+
+    with pytest.raises(ProgrammingError) as excinfo:
+        transpile(
+            engine,
+            'SELECT "main.dim_user.country", "revenue" FROM users',
+            semantic_layer=semantic_layer,
+        )
+    assert str(excinfo.value) == "main.sales not in query context users"
+
+
+def test_transpile_filters(engine: Engine, semantic_layer: SemanticLayer) -> None:
+    """
+    Named filters are pushed down into the relation they apply to.
+    """
+    semantic_layer.filters.append(
+        Filter(key="big_sales", expression="price > 50", relation_key="main.sales")
+    )
+    semantic_layer.filters.append(
+        Filter(key="in_us", expression="country = 'US'", relation_key="main.dim_user")
+    )
+
+    # single relation, nothing to push down
+    assert transpile(
+        engine,
+        'SELECT "revenue" FROM super WHERE "big_sales"',
+        semantic_layer=semantic_layer,
+    ) == ("SELECT SUM(main.sales.price) FROM main.sales WHERE main.sales.price > 50")
+
+    assert transpile(
+        engine,
+        """
+SELECT "main.dim_user.country", "revenue"
+FROM super
+WHERE "big_sales" AND "main.sales.id" > 0
+GROUP BY "main.dim_user.country"
+        """,
+        semantic_layer=semantic_layer,
+    ) == (
+        "SELECT main.dim_user.country, SUM(sales.price) "
+        "FROM (SELECT * FROM main.sales WHERE main.sales.price > 50) AS sales "
+        "JOIN dim_user ON sales.user_id = dim_user.id "
+        "WHERE sales.id > 0 GROUP BY main.dim_user.country"
+    )
+
+
+def test_transpile_filters_outer_join(
+    engine: Engine,
+    semantic_layer: SemanticLayer,
+) -> None:
+    """
+    Filters on the null-extended side of an outer join stay in the WHERE.
+    """
+    semantic_layer.filters.append(
+        Filter(key="big_sales", expression="price > 50", relation_key="main.sales")
+    )
+    semantic_layer.filters.append(
+        Filter(key="in_us", expression="country = 'US'", relation_key="main.dim_user")
+    )
+    semantic_layer.joins.append(
+        Join(
+            left_relation_key="main.sales",
+            right_relation_key="main.dim_user",
+            join_criteria="main.sales.user_id = main.dim_user.id",
+            cardinality="many_to_one",
+            join_term="LEFT JOIN",
+        )
+    )
+    assert transpile(
+        engine,
+        'SELECT "main.dim_user.country", "revenue" FROM super '
+        'WHERE "big_sales" AND "in_us"',
+        semantic_layer=semantic_layer,
+    ) == (
+        "SELECT main.dim_user.country, SUM(sales.price) "
+        "FROM (SELECT * FROM main.sales WHERE main.sales.price > 50) AS sales "
+        "LEFT JOIN main.dim_user ON sales.user_id = main.dim_user.id "
+        "WHERE main.dim_user.country = 'US'"
+    )